@@ -6,9 +6,33 @@ from aws_file_processing.stacks.processing_lambda_stack import ProcessingLambdaS
 from aws_file_processing.stacks.networking_stack import NetworkingStack
 from aws_file_processing.stacks.database_stack import DatabaseStack
 from aws_file_processing.stacks.backend_api_stack import BackendApiStack
+from aws_file_processing.stacks.cache_stack import CacheStack
+from aws_file_processing.profiles import get_profile, DEFAULT_PROFILE_NAME
 
 app = cdk.App()
 
+# Select throughput settings with: cdk deploy -c performance_profile=burst
+profile = get_profile(app.node.try_get_context("performance_profile") or DEFAULT_PROFILE_NAME)
+
+# Timestream record layout for file events, see DatabaseStack; switch with -c timestream_schema_version=2
+schema_version = str(app.node.try_get_context("timestream_schema_version") or "1")
+# Layouts the API and the rollup query read; after a switch, deploy with -c timestream_read_schema=both
+# until records of the old layout have aged out of retention (7 days), then drop it
+read_schema = app.node.try_get_context("timestream_read_schema")
+
+
+def context_flag(name):
+    # cdk.json holds booleans, while -c passes every value as a string
+    return str(app.node.try_get_context(name)).lower() == "true"
+
+
+# Optional processor work, off by default; enable with e.g. -c inspect_archives=true
+sniff_content = context_flag("sniff_content")
+inspect_archives = context_flag("inspect_archives")
+analyze_content = context_flag("analyze_content")
+# Log per-module import times of cold starts to CloudWatch, see tests/benchmark/profile_imports.py
+profile_imports = context_flag("profile_imports")
+
 # Define environment - this is crucial for cross-stack references to work
 env = cdk.Environment(
     account=os.environ.get("CDK_DEFAULT_ACCOUNT"),
@@ -18,12 +42,19 @@ env = cdk.Environment(
 # Create each stack separately but in the same environment
 networking_stack = NetworkingStack(app, "FileProcessingNetwork", env=env)
 
-storage_stack = StorageStack(app, "FileProcessingStorage", env=env)
+storage_stack = StorageStack(app, "FileProcessingStorage", profile=profile, env=env)
 
 database_stack = DatabaseStack(app, "FileProcessingDatabase",
                               vpc=networking_stack.vpc,
+                              schema_version=schema_version,
+                              read_schema=read_schema,
                               env=env)
 
+cache_stack = CacheStack(app, "FileProcessingCache",
+                         vpc=networking_stack.vpc,
+                         data_sg=networking_stack.data_sg,
+                         env=env)
+
 processing_lambda_stack = ProcessingLambdaStack(app, "FileProcessingCompute",
                                               bucket=storage_stack.bucket,
                                               queue=storage_stack.queue,
@@ -31,27 +62,43 @@ processing_lambda_stack = ProcessingLambdaStack(app, "FileProcessingCompute",
                                               lambda_sg=networking_stack.lambda_sg,
                                               timestream_db_name=database_stack.database_name,
                                               timestream_events_table_name=database_stack.events_table_name,
-                                              timestream_file_types_table_name=database_stack.file_types_table_name,
+                                              profile=profile,
+                                              redis_host=cache_stack.redis_host,
+                                              redis_port=cache_stack.redis_port,
+                                              schema_version=schema_version,
+                                              sniff_content=sniff_content,
+                                              inspect_archives=inspect_archives,
+                                              analyze_content=analyze_content,
+                                              profile_imports=profile_imports,
                                               env=env)
 
 api_stack = BackendApiStack(app, "FileProcessingBackendApi",
                           vpc=networking_stack.vpc,
                           timestream_db_name=database_stack.database_name,
                           timestream_events_table_name=database_stack.events_table_name,
-                          timestream_file_types_table_name=database_stack.file_types_table_name,
+                          timestream_rollup_table_name=database_stack.rollup_table_name,
+                          profile=profile,
+                          data_sg=networking_stack.data_sg,
+                          redis_host=cache_stack.redis_host,
+                          redis_port=cache_stack.redis_port,
+                          schema_version=schema_version,
+                          read_schema=database_stack.read_schema,
                           env=env)
 
 # Add explicit dependencies between stacks
 storage_stack.add_dependency(networking_stack)
 database_stack.add_dependency(networking_stack)
+cache_stack.add_dependency(networking_stack)
 processing_lambda_stack.add_dependency(storage_stack)
 processing_lambda_stack.add_dependency(database_stack)
 processing_lambda_stack.add_dependency(networking_stack)
+processing_lambda_stack.add_dependency(cache_stack)
 api_stack.add_dependency(networking_stack)
 api_stack.add_dependency(database_stack)
+api_stack.add_dependency(cache_stack)
 
 # Add tags to all stacks for better resource management
-for stack in [networking_stack, storage_stack, database_stack, processing_lambda_stack, api_stack]:
+for stack in [networking_stack, storage_stack, database_stack, cache_stack, processing_lambda_stack, api_stack]:
     cdk.Tags.of(stack).add("Project", "FileProcessing")
     cdk.Tags.of(stack).add("ManagedBy", "CDK")
 
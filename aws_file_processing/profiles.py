@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class PerformanceProfile:
+    """Throughput and sizing knobs shared by the storage, processing and API stacks."""
+
+    # SQS -> Lambda event source
+    sqs_batch_size: int = 10
+    sqs_max_batching_window_seconds: int = 0
+    # Caps concurrent invocations so Lambda scale-out can't outrun Timestream write limits
+    sqs_max_concurrency: Optional[int] = 10
+    queue_visibility_timeout_seconds: int = 300
+
+    # File processor Lambda
+    lambda_memory_mb: int = 128
+    lambda_timeout_seconds: int = 60
+    lambda_architecture: str = "x86_64"
+    lambda_runtime: str = "python3.9"
+    head_concurrency: int = 16
+    trust_event_metadata: bool = False
+    # Upper bound on concurrent WriteRecords calls per invocation (adapted down on throttling)
+    timestream_max_in_flight_writes: int = 4
+    # Bytes of one file scanned by content analysis; the scan also stops ahead of the timeout
+    analyze_max_mb: int = 32
+
+    # Backend API on Fargate
+    api_cpu: int = 256
+    api_memory_mib: int = 512
+    api_min_capacity: int = 1
+    api_max_capacity: int = 3
+    api_cpu_target_percent: int = 70
+    api_requests_per_target: Optional[int] = None
+    # gunicorn serving mode (see backend-api/gunicorn.conf.py)
+    api_worker_class: str = "gthread"
+    api_workers: int = 2
+    api_threads: int = 32
+
+    @property
+    def dedup_claim_seconds(self):
+        # An in-progress dedup claim must outlive the invocation holding it, but expire before SQS
+        # redelivers the messages of an invocation that timed out; otherwise the retry is dropped
+        return min(self.lambda_timeout_seconds + 30, self.queue_visibility_timeout_seconds - 1)
+
+
+PROFILES = {
+    # Matches the values the stacks used before profiles existed, plus a concurrency cap
+    "dev": PerformanceProfile(),
+
+    # Short upload spikes: large batches, wide fan-out, fast scale-out of the API
+    "burst": PerformanceProfile(
+        sqs_batch_size=100,
+        sqs_max_batching_window_seconds=5,
+        sqs_max_concurrency=50,
+        queue_visibility_timeout_seconds=900,
+        lambda_memory_mb=1024,
+        lambda_timeout_seconds=120,
+        lambda_architecture="arm64",
+        lambda_runtime="python3.12",
+        head_concurrency=32,
+        trust_event_metadata=True,
+        timestream_max_in_flight_writes=8,
+        analyze_max_mb=256,
+        api_cpu=512,
+        api_memory_mib=1024,
+        api_min_capacity=1,
+        api_max_capacity=10,
+        api_cpu_target_percent=60,
+        api_requests_per_target=500,
+        api_workers=3,
+        api_threads=64,
+    ),
+
+    # Sustained high ingest: bounded concurrency to stay under Timestream write limits
+    "steady-high": PerformanceProfile(
+        sqs_batch_size=50,
+        sqs_max_batching_window_seconds=10,
+        sqs_max_concurrency=20,
+        queue_visibility_timeout_seconds=600,
+        lambda_memory_mb=512,
+        lambda_timeout_seconds=90,
+        lambda_architecture="arm64",
+        lambda_runtime="python3.12",
+        head_concurrency=16,
+        analyze_max_mb=128,
+        api_cpu=512,
+        api_memory_mib=1024,
+        api_min_capacity=2,
+        api_max_capacity=6,
+        api_cpu_target_percent=70,
+        api_requests_per_target=1000,
+    ),
+}
+
+DEFAULT_PROFILE_NAME = "dev"
+
+
+def get_profile(name):
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown performance profile '{name}', expected one of: {', '.join(PROFILES)}")
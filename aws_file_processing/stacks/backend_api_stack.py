@@ -9,14 +9,19 @@ from aws_cdk import (
     aws_iam as iam,
 )
 from constructs import Construct
+from aws_file_processing.profiles import PROFILES, DEFAULT_PROFILE_NAME
 
 
 class BackendApiStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, *,
                  vpc, timestream_db_name, timestream_events_table_name,
-                 timestream_file_types_table_name, **kwargs) -> None:
+                 timestream_rollup_table_name,
+                 profile=None, data_sg=None,
+                 redis_host=None, redis_port=None, schema_version="1", read_schema=None, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        profile = profile or PROFILES[DEFAULT_PROFILE_NAME]
+
         # Create ECR Repository for API
         self.repository = ecr.Repository(self, "ApiRepository",
                                          repository_name="file-processing-api",
@@ -25,31 +30,41 @@ class BackendApiStack(Stack):
 
         # Create IAM task role with permissions
         task_role = self._create_task_role(timestream_db_name, timestream_events_table_name,
-                                           timestream_file_types_table_name)
+                                           timestream_rollup_table_name)
 
         # Create a Task Definition with a name we can reference
         self.task_definition = ecs.FargateTaskDefinition(self, "ApiTaskDefinition",
-                                                         memory_limit_mib=512,
-                                                         cpu=256,
+                                                         memory_limit_mib=profile.api_memory_mib,
+                                                         cpu=profile.api_cpu,
                                                          task_role=task_role
                                                          )
 
+        environment = {
+            "TIMESTREAM_DB_NAME": timestream_db_name,
+            "TIMESTREAM_EVENTS_TABLE": timestream_events_table_name,
+            "TIMESTREAM_ROLLUP_TABLE": timestream_rollup_table_name,
+            "TIMESTREAM_SCHEMA_VERSION": schema_version,
+            "TIMESTREAM_READ_SCHEMA": read_schema or schema_version,
+            "GUNICORN_WORKER_CLASS": profile.api_worker_class,
+            "GUNICORN_WORKERS": str(profile.api_workers),
+            "GUNICORN_THREADS": str(profile.api_threads),
+            "AWS_REGION": self.region
+        }
+        if redis_host:
+            environment["REDIS_HOST"] = redis_host
+            environment["REDIS_PORT"] = redis_port or "6379"
+
         # Add container to the task definition with placeholder image
         container = self.task_definition.add_container("ApiContainer",
-                                                       # Use placeholder image initially
-                                                       image=ecs.ContainerImage.from_registry(
-                                                           "amazon/amazon-ecs-sample"),
-                                                       environment={
-                                                           "TIMESTREAM_DB_NAME": timestream_db_name,
-                                                           "TIMESTREAM_EVENTS_TABLE": timestream_events_table_name,
-                                                           "TIMESTREAM_FILE_TYPES_TABLE": timestream_file_types_table_name,
-                                                           "AWS_REGION": self.region
-                                                       },
+                                                       # Build the API itself for the first deployment; CI
+                                                       # later pushes new images to the ECR repository
+                                                       image=ecs.ContainerImage.from_asset("backend-api"),
+                                                       environment=environment,
                                                        logging=ecs.LogDrivers.aws_logs(stream_prefix="api-container")
                                                        )
 
-        # Add port mapping
-        container.add_port_mappings(ecs.PortMapping(container_port=80))
+        # gunicorn binds 5000 (see backend-api/Dockerfile)
+        container.add_port_mappings(ecs.PortMapping(container_port=5000))
 
         # Create Fargate Service with this task definition
         self.fargate_service = ecs_patterns.ApplicationLoadBalancedFargateService(self, "ApiService",
@@ -59,22 +74,42 @@ class BackendApiStack(Stack):
                                                                                   public_load_balancer=True
                                                                                   )
 
-        # Configure health check for placeholder image
+        # Allow the API tasks to read from Redis. The rule lives in this stack so the
+        # networking stack doesn't have to reference the service's security group.
+        if data_sg is not None:
+            for index, service_sg in enumerate(self.fargate_service.service.connections.security_groups):
+                ec2.CfnSecurityGroupIngress(self, f"RedisIngress{index}",
+                                            group_id=data_sg.security_group_id,
+                                            source_security_group_id=service_sg.security_group_id,
+                                            ip_protocol="tcp",
+                                            from_port=6379,
+                                            to_port=6379,
+                                            description="Allow API tasks to connect to Redis"
+                                            )
+
+        # Probe the API's own health endpoint on the container port
         self.fargate_service.target_group.configure_health_check(
-            path="/",  # The sample image serves content at root
+            path="/api/health",
             healthy_http_codes="200"
         )
 
         # Add auto-scaling
         scaling = self.fargate_service.service.auto_scale_task_count(
-            max_capacity=3,
-            min_capacity=1
+            max_capacity=profile.api_max_capacity,
+            min_capacity=profile.api_min_capacity
         )
 
         scaling.scale_on_cpu_utilization("CpuScaling",
-                                         target_utilization_percent=70
+                                         target_utilization_percent=profile.api_cpu_target_percent
                                          )
 
+        # Requests are mostly waiting on Timestream, so CPU alone reacts late to load
+        if profile.api_requests_per_target:
+            scaling.scale_on_request_count("RequestCountScaling",
+                                           requests_per_target=profile.api_requests_per_target,
+                                           target_group=self.fargate_service.target_group
+                                           )
+
         # Output values needed for CI/CD
         CfnOutput(self, "ApiRepositoryName",
                   value=self.repository.repository_name,
@@ -106,7 +141,7 @@ class BackendApiStack(Stack):
                   export_name="ApiEndpoint"
                   )
 
-    def _create_task_role(self, timestream_db_name, timestream_events_table_name, timestream_file_types_table_name):
+    def _create_task_role(self, timestream_db_name, timestream_events_table_name, timestream_rollup_table_name):
         task_role = iam.Role(self, "ApiTaskRole",
                              assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com")
                              )
@@ -126,7 +161,7 @@ class BackendApiStack(Stack):
                 resources=[
                     f"arn:aws:timestream:{region}:{account}:database/{timestream_db_name}",
                     f"arn:aws:timestream:{region}:{account}:database/{timestream_db_name}/table/{timestream_events_table_name}",
-                    f"arn:aws:timestream:{region}:{account}:database/{timestream_db_name}/table/{timestream_file_types_table_name}"
+                    f"arn:aws:timestream:{region}:{account}:database/{timestream_db_name}/table/{timestream_rollup_table_name}"
                 ]
             )
         )
@@ -0,0 +1,39 @@
+from aws_cdk import (
+    Stack,
+    CfnOutput,
+    aws_ec2 as ec2,
+    aws_elasticache as elasticache,
+)
+from constructs import Construct
+
+
+class CacheStack(Stack):
+    def __init__(self, scope: Construct, construct_id: str, *,
+                 vpc, data_sg, node_type="cache.t4g.micro", **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        # Place Redis in the private subnets next to the Lambda and the API tasks
+        self.subnet_group = elasticache.CfnSubnetGroup(self, "RedisSubnetGroup",
+                                                       description="Subnets for the file processing Redis cache",
+                                                       subnet_ids=vpc.select_subnets(
+                                                           subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS
+                                                       ).subnet_ids
+                                                       )
+
+        # Create a single-node Redis cluster for live counters and the recent files list
+        self.redis_cluster = elasticache.CfnCacheCluster(self, "RedisCluster",
+                                                         engine="redis",
+                                                         cache_node_type=node_type,
+                                                         num_cache_nodes=1,
+                                                         cache_subnet_group_name=self.subnet_group.ref,
+                                                         vpc_security_group_ids=[data_sg.security_group_id]
+                                                         )
+        self.redis_cluster.add_dependency(self.subnet_group)
+
+        self.redis_host = self.redis_cluster.attr_redis_endpoint_address
+        self.redis_port = self.redis_cluster.attr_redis_endpoint_port
+
+        CfnOutput(self, "RedisEndpoint",
+                  value=self.redis_host,
+                  description="The endpoint address of the Redis cache"
+                  )
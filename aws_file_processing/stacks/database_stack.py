@@ -1,19 +1,36 @@
 from aws_cdk import (
     Stack,
+    RemovalPolicy,
     aws_timestream as timestream,
     aws_ec2 as ec2,
+    aws_iam as iam,
+    aws_s3 as s3,
+    aws_sns as sns,
 )
 from constructs import Construct
 
+READ_SCHEMAS = ("1", "2", "both")
+
 
 class DatabaseStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, *, vpc, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, *, vpc, schema_version="1", read_schema=None,
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # Define database and table names as class properties
         self.database_name = "file_metrics_db"
+        # "1": one single-measure record per file with key as a dimension
+        # "2": one multi-measure record per file with object_key, size and object_content_type as measures
+        self.schema_version = schema_version
+        # Layouts read back: "1", "2" or "both" while records of the previous layout are still
+        # within retention after a switch
+        self.read_schema = read_schema or schema_version
+        if self.read_schema not in READ_SCHEMAS:
+            raise ValueError(f"Unknown Timestream read schema '{self.read_schema}', "
+                             f"expected one of: {', '.join(READ_SCHEMAS)}")
         self.events_table_name = "file_events"
         self.file_types_table_name = "file_types"
+        self.rollup_table_name = "file_type_rollups"
 
         # Create Timestream database
         self.timestream_db = timestream.CfnDatabase(self, "FileMetricsDatabase",
@@ -30,7 +47,8 @@ class DatabaseStack(Stack):
                                                 }
                                                 )
 
-        # Create a table for file types
+        # Per-extension counts written by earlier processor versions; no longer written or read
+        # (counts come from the rollup table) and kept only so deploying doesn't delete its data
         self.file_types_table = timestream.CfnTable(self, "FileTypesTable",
                                                     database_name=self.database_name,
                                                     table_name=self.file_types_table_name,
@@ -40,6 +58,143 @@ class DatabaseStack(Stack):
                                                     }
                                                     )
 
+        # Create a table for pre-aggregated per-extension counts
+        self.rollup_table = timestream.CfnTable(self, "FileTypeRollupsTable",
+                                                database_name=self.database_name,
+                                                table_name=self.rollup_table_name,
+                                                retention_properties={
+                                                    "MemoryStoreRetentionPeriodInHours": "24",
+                                                    "MagneticStoreRetentionPeriodInDays": "7"
+                                                }
+                                                )
+
         # Add dependencies
         self.events_table.add_dependency(self.timestream_db)
-        self.file_types_table.add_dependency(self.timestream_db)
\ No newline at end of file
+        self.file_types_table.add_dependency(self.timestream_db)
+        self.rollup_table.add_dependency(self.timestream_db)
+
+        self.rollup_query = self._create_rollup_query()
+
+    def _create_rollup_query(self):
+        """Keep the rollup table up to date with a Timestream scheduled query.
+
+        Every run re-aggregates the last two hourly buckets of file events so late records
+        are picked up; scheduled query output is upserted, so re-written buckets replace
+        the previous values instead of adding to them.
+        """
+        notification_topic = sns.Topic(self, "RollupQueryNotifications")
+
+        error_bucket = s3.Bucket(self, "RollupQueryErrors",
+                                 encryption=s3.BucketEncryption.S3_MANAGED,
+                                 block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+                                 removal_policy=RemovalPolicy.DESTROY,
+                                 auto_delete_objects=True
+                                 )
+
+        role = iam.Role(self, "RollupQueryRole",
+                        assumed_by=iam.ServicePrincipal("timestream.amazonaws.com")
+                        )
+        region = self.region
+        account = self.account
+        role.add_to_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "timestream:Select",
+                    "timestream:WriteRecords",
+                    "timestream:DescribeTable",
+                    "timestream:DescribeDatabase"
+                ],
+                resources=[
+                    f"arn:aws:timestream:{region}:{account}:database/{self.database_name}",
+                    f"arn:aws:timestream:{region}:{account}:database/{self.database_name}/table/{self.events_table_name}",
+                    f"arn:aws:timestream:{region}:{account}:database/{self.database_name}/table/{self.rollup_table_name}"
+                ]
+            )
+        )
+        role.add_to_policy(
+            iam.PolicyStatement(
+                actions=["timestream:DescribeEndpoints"],
+                resources=["*"]
+            )
+        )
+        notification_topic.grant_publish(role)
+        error_bucket.grant_put(role)
+
+        rollup_query = timestream.CfnScheduledQuery(self, "FileTypeRollupQuery",
+                                                    scheduled_query_name="file-type-rollup",
+                                                    query_string=self.rollup_query_string(),
+                                                    schedule_configuration=timestream.CfnScheduledQuery.ScheduleConfigurationProperty(
+                                                        schedule_expression="rate(15 minutes)"
+                                                    ),
+                                                    notification_configuration=timestream.CfnScheduledQuery.NotificationConfigurationProperty(
+                                                        sns_configuration=timestream.CfnScheduledQuery.SnsConfigurationProperty(
+                                                            topic_arn=notification_topic.topic_arn
+                                                        )
+                                                    ),
+                                                    error_report_configuration=timestream.CfnScheduledQuery.ErrorReportConfigurationProperty(
+                                                        s3_configuration=timestream.CfnScheduledQuery.S3ConfigurationProperty(
+                                                            bucket_name=error_bucket.bucket_name
+                                                        )
+                                                    ),
+                                                    scheduled_query_execution_role_arn=role.role_arn,
+                                                    target_configuration=timestream.CfnScheduledQuery.TargetConfigurationProperty(
+                                                        timestream_configuration=timestream.CfnScheduledQuery.TimestreamConfigurationProperty(
+                                                            database_name=self.database_name,
+                                                            table_name=self.rollup_table_name,
+                                                            time_column="bucket_time",
+                                                            dimension_mappings=[
+                                                                timestream.CfnScheduledQuery.DimensionMappingProperty(
+                                                                    name="file_extension",
+                                                                    dimension_value_type="VARCHAR"
+                                                                )
+                                                            ],
+                                                            multi_measure_mappings=timestream.CfnScheduledQuery.MultiMeasureMappingsProperty(
+                                                                target_multi_measure_name="rollup",
+                                                                multi_measure_attribute_mappings=[
+                                                                    timestream.CfnScheduledQuery.MultiMeasureAttributeMappingProperty(
+                                                                        source_column="file_count",
+                                                                        measure_value_type="BIGINT"
+                                                                    ),
+                                                                    timestream.CfnScheduledQuery.MultiMeasureAttributeMappingProperty(
+                                                                        source_column="total_bytes",
+                                                                        measure_value_type="BIGINT"
+                                                                    ),
+                                                                    timestream.CfnScheduledQuery.MultiMeasureAttributeMappingProperty(
+                                                                        source_column="last_update",
+                                                                        measure_value_type="TIMESTAMP"
+                                                                    )
+                                                                ]
+                                                            )
+                                                        )
+                                                    )
+                                                    )
+        rollup_query.add_dependency(self.events_table)
+        rollup_query.add_dependency(self.rollup_table)
+        rollup_query.node.add_dependency(role)
+
+        return rollup_query
+
+    def rollup_query_string(self):
+        # Rollup rows keep the same layout for both schemas, so buckets written before a
+        # schema switch stay readable after it. Backfilled records are counted in the hour they
+        # were loaded, so the per-extension totals include objects from before notifications.
+        if self.read_schema == "both":
+            # The hour of the switch holds records of both layouts
+            measure_condition = "measure_name IN ('file_size', 'file_event')"
+            size_column = "CASE WHEN measure_name = 'file_event' THEN size ELSE measure_value::bigint END"
+        elif self.read_schema == "2":
+            measure_condition, size_column = "measure_name = 'file_event'", "size"
+        else:
+            measure_condition, size_column = "measure_name = 'file_size'", "measure_value::bigint"
+
+        return f"""
+            SELECT file_extension,
+                   bin(time, 1h) AS bucket_time,
+                   COUNT(*) AS file_count,
+                   SUM({size_column}) AS total_bytes,
+                   MAX(time) AS last_update
+            FROM "{self.database_name}"."{self.events_table_name}"
+            WHERE {measure_condition}
+              AND time BETWEEN bin(@scheduled_runtime, 1h) - 1h AND @scheduled_runtime
+            GROUP BY file_extension, bin(time, 1h)
+            """
\ No newline at end of file
@@ -1,20 +1,27 @@
 from aws_cdk import (
     Stack,
     Duration,
+    BundlingOptions,
     aws_lambda as lambda_,
     aws_iam as iam,
     aws_lambda_event_sources as lambda_events,
     aws_ec2 as ec2,
 )
 from constructs import Construct
+from aws_file_processing.profiles import PROFILES, DEFAULT_PROFILE_NAME
 
 
 class ProcessingLambdaStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, *,
                  bucket, queue, vpc, lambda_sg, timestream_db_name,
-                 timestream_events_table_name, timestream_file_types_table_name, **kwargs) -> None:
+                 timestream_events_table_name,
+                 profile=None, sniff_content=False, inspect_archives=False, analyze_content=False,
+                 profile_imports=False, redis_host=None, redis_port=None, schema_version="1",
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        profile = profile or PROFILES[DEFAULT_PROFILE_NAME]
+
         # Create IAM role for Lambda with fine-grained permissions
         lambda_role = iam.Role(self, "ProcessorLambdaRole",
                                assumed_by=iam.ServicePrincipal("lambda.amazonaws.com")
@@ -70,24 +77,46 @@ class ProcessingLambdaStack(Stack):
                 ],
                 resources=[
                     f"arn:aws:timestream:{region}:{account}:database/{timestream_db_name}",
-                    f"arn:aws:timestream:{region}:{account}:database/{timestream_db_name}/table/{timestream_events_table_name}",
-                    f"arn:aws:timestream:{region}:{account}:database/{timestream_db_name}/table/{timestream_file_types_table_name}"
+                    f"arn:aws:timestream:{region}:{account}:database/{timestream_db_name}/table/{timestream_events_table_name}"
                 ]
             )
         )
 
+        environment = {
+            "SQS_QUEUE_URL": queue.queue_url,
+            "BUCKET_NAME": bucket.bucket_name,
+            "TIMESTREAM_DB_NAME": timestream_db_name,
+            "TIMESTREAM_TABLE_NAME": timestream_events_table_name,
+            "TIMESTREAM_SCHEMA_VERSION": schema_version,
+            "TRUST_EVENT_METADATA": str(profile.trust_event_metadata).lower(),
+            "SNIFF_CONTENT": str(sniff_content).lower(),
+            "INSPECT_ARCHIVES": str(inspect_archives).lower(),
+            "ANALYZE_CONTENT": str(analyze_content).lower(),
+            "ANALYZE_MAX_BYTES": str(profile.analyze_max_mb * 1024 * 1024),
+            "HEAD_CONCURRENCY": str(profile.head_concurrency),
+            "TIMESTREAM_MAX_IN_FLIGHT": str(profile.timestream_max_in_flight_writes),
+            "DEDUP_CLAIM_SECONDS": str(profile.dedup_claim_seconds)
+        }
+        if redis_host:
+            environment["REDIS_HOST"] = redis_host
+            environment["REDIS_PORT"] = redis_port or "6379"
+        if profile_imports:
+            # Python writes per-module import times to stderr, which ends up in CloudWatch Logs
+            environment["PYTHONPROFILEIMPORTTIME"] = "1"
+
+        runtime = lambda_.Runtime(profile.lambda_runtime, lambda_.RuntimeFamily.PYTHON)
+
         # Create Lambda function to process SQS messages
         self.processor_lambda = lambda_.Function(self, "FileProcessorFunction",
-                                                 runtime=lambda_.Runtime.PYTHON_3_9,
-                                                 code=lambda_.Code.from_asset("src/lambda/file_processor"),
+                                                 runtime=runtime,
+                                                 architecture=lambda_.Architecture.ARM_64
+                                                 if profile.lambda_architecture == "arm64"
+                                                 else lambda_.Architecture.X86_64,
+                                                 memory_size=profile.lambda_memory_mb,
+                                                 code=self._processor_code(runtime),
                                                  handler="index.handler",
-                                                 timeout=Duration.seconds(60),
-                                                 environment={
-                                                     "SQS_QUEUE_URL": queue.queue_url,
-                                                     "BUCKET_NAME": bucket.bucket_name,
-                                                     "TIMESTREAM_DB_NAME": timestream_db_name,
-                                                     "TIMESTREAM_TABLE_NAME": timestream_events_table_name
-                                                 },
+                                                 timeout=Duration.seconds(profile.lambda_timeout_seconds),
+                                                 environment=environment,
                                                  role=lambda_role,
                                                  vpc=vpc,
                                                  security_groups=[lambda_sg],
@@ -96,7 +125,28 @@ class ProcessingLambdaStack(Stack):
                                                  )
                                                  )
 
-        # Add SQS as event source for Lambda
+        # Add SQS as event source for Lambda; the handler reports failed messages individually
         self.processor_lambda.add_event_source(
-            lambda_events.SqsEventSource(queue, batch_size=10)
-        )
\ No newline at end of file
+            lambda_events.SqsEventSource(queue,
+                                         batch_size=profile.sqs_batch_size,
+                                         max_batching_window=Duration.seconds(profile.sqs_max_batching_window_seconds)
+                                         if profile.sqs_max_batching_window_seconds else None,
+                                         max_concurrency=profile.sqs_max_concurrency,
+                                         report_batch_item_failures=True
+                                         )
+        )
+
+    @staticmethod
+    def _processor_code(runtime):
+        # Install requirements.txt (only the Redis client; boto3 comes with the runtime) next to the
+        # handler code
+        return lambda_.Code.from_asset("src/lambda/file_processor",
+                                       bundling=BundlingOptions(
+                                           image=runtime.bundling_image,
+                                           command=[
+                                               "bash", "-c",
+                                               "pip install -r requirements.txt -t /asset-output "
+                                               "&& cp -au . /asset-output"
+                                           ]
+                                       )
+                                       )
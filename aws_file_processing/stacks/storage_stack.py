@@ -7,12 +7,15 @@ from aws_cdk import (
     aws_s3_notifications as s3n,
 )
 from constructs import Construct
+from aws_file_processing.profiles import PROFILES, DEFAULT_PROFILE_NAME
 
 
 class StorageStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, *, profile=None, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        profile = profile or PROFILES[DEFAULT_PROFILE_NAME]
+
         # Create S3 Bucket
         self.bucket = s3.Bucket(self, "FileUploadBucket",
                                 versioned=True,
@@ -20,9 +23,18 @@ class StorageStack(Stack):
                                 block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
                                 removal_policy=RemovalPolicy.DESTROY)
 
+        # Create dead-letter queue for messages that keep failing
+        self.dead_letter_queue = sqs.Queue(self, "FileUploadDeadLetterQueue",
+                                           retention_period=Duration.days(14)
+                                           )
+
         # Create SQS Queue
         self.queue = sqs.Queue(self, "FileUploadQueue",
-                               visibility_timeout=Duration.seconds(300)
+                               visibility_timeout=Duration.seconds(profile.queue_visibility_timeout_seconds),
+                               dead_letter_queue=sqs.DeadLetterQueue(
+                                   max_receive_count=5,
+                                   queue=self.dead_letter_queue
+                               )
                                )
 
         # Configure S3 notifications to SQS
@@ -0,0 +1,56 @@
+"""gunicorn settings for the API container; every value can be overridden from the environment.
+
+Requests spend nearly all their time waiting on Timestream or Redis, so a worker serves many
+of them concurrently: with threads (gthread, the default) or with greenlets (gevent).
+"""
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+# Concurrent requests per gthread worker
+threads = int(os.environ.get('GUNICORN_THREADS', '32'))
+# Concurrent requests per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Every open /api/live-files stream occupies a gthread thread until the client goes away, so only
+# a quarter of the threads may stream; the rest stay free for queries and the ALB health check.
+# A gevent worker spends a greenlet per stream instead and can hold far more. The app reads the
+# limit at import, which happens after this file runs, in the master and in every worker.
+if worker_class == 'gevent':
+    live_feed_max_clients = worker_connections // 2
+elif worker_class == 'gthread':
+    live_feed_max_clients = threads // 4
+else:
+    live_feed_max_clients = 0
+os.environ.setdefault('LIVE_FEED_MAX_CLIENTS', str(live_feed_max_clients))
+
+# Workers write their query metrics to files here so /api/metrics on any worker reports the whole
+# task; created once by the master, so worker restarts keep adding to the same totals
+if 'QUERY_METRICS_DIR' not in os.environ:
+    os.environ['QUERY_METRICS_DIR'] = tempfile.mkdtemp(prefix='query-metrics-')
+
+# Import the app once in the master so workers fork with it loaded. gevent has to patch the
+# standard library before the app creates clients and locks, so it loads per worker instead.
+preload_app = os.environ.get('GUNICORN_PRELOAD', str(worker_class != 'gevent')).lower() == 'true'
+
+# Silent workers are restarted after `timeout`; on deploys, running requests get `graceful_timeout`
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+# Longer than the ALB idle timeout (60s), so the load balancer always closes idle connections
+# first and never sends a request on a connection gunicorn is closing
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '75'))
+
+# The ALB terminates client connections and sets X-Forwarded-*
+forwarded_allow_ips = '*'
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Clients created in the master share sockets with every other worker after the fork
+        from src.routes import reset_after_fork
+        reset_after_fork()
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+
+
+class BucketCache:
+    """Cache for time-bucketed aggregates.
+
+    A bucket is closed once it ended more than `settle_seconds` ago (late events still
+    arrive through the queue for a little while). Closed buckets never change, so they are
+    kept until evicted for space; only buckets that are missing or still open are queried.
+    """
+
+    def __init__(self, settle_seconds=120, max_series=64, max_buckets_per_series=10080):
+        self.settle_seconds = settle_seconds
+        self.max_series = max_series
+        self.max_buckets_per_series = max_buckets_per_series
+        self._lock = threading.Lock()
+        # series key -> {bucket start (epoch seconds): [rows]}
+        self._series = OrderedDict()
+        self._stats = {'cached_buckets': 0, 'queried_buckets': 0, 'queries': 0}
+
+    def get(self, series_key, bucket_seconds, start, end, loader, now=None):
+        """Return the rows of every bucket between the epoch seconds `start` and `end`.
+
+        `start` is rounded down to a bucket boundary. `loader(query_start, query_end)` must
+        return the rows for that range, each with a Timestream 'time' value naming its bucket.
+        """
+        now = time.time() if now is None else now
+        start = int(start) // bucket_seconds * bucket_seconds
+        end = min(end, now)
+        # Only whole buckets inside the requested range can be cached
+        closed_end = int(min(now - self.settle_seconds, end)) // bucket_seconds * bucket_seconds
+        closed_end = max(closed_end, start)
+
+        with self._lock:
+            series = self._series.setdefault(series_key, {})
+            self._series.move_to_end(series_key)
+            missing = [bucket for bucket in range(start, closed_end, bucket_seconds) if bucket not in series]
+            self._stats['cached_buckets'] += (closed_end - start) // bucket_seconds - len(missing)
+
+        query_start = missing[0] if missing else closed_end
+        fresh = defaultdict(list)
+        if query_start < end:
+            for row in loader(query_start, end):
+                fresh[bucket_start(row['time'])].append(row)
+
+        with self._lock:
+            self._stats['queries'] += 1 if query_start < end else 0
+            self._stats['queried_buckets'] += len(missing)
+            series = self._series.setdefault(series_key, {})
+            for bucket in missing:
+                series[bucket] = fresh.get(bucket, [])
+            self._evict(series)
+
+            rows = []
+            for bucket in range(start, closed_end, bucket_seconds):
+                rows.extend(series.get(bucket) or fresh.get(bucket, []))
+
+        for bucket in sorted(fresh):
+            if bucket >= closed_end:
+                rows.extend(fresh[bucket])
+        return rows
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, series=len(self._series),
+                        buckets=sum(len(series) for series in self._series.values()))
+
+    def _evict(self, series):
+        if len(series) > self.max_buckets_per_series:
+            for bucket in sorted(series)[:len(series) - self.max_buckets_per_series]:
+                del series[bucket]
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+
+
+def bucket_start(value):
+    """Epoch seconds of a Timestream timestamp such as '2024-01-01 12:00:00.000000000'."""
+    parsed = datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S')
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
@@ -0,0 +1,102 @@
+import gzip
+import hashlib
+import json
+import os
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # Without the module responses are only gzip-compressed
+    brotli = None
+
+# Smaller bodies aren't worth the CPU; they fit in one packet either way
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+ENCODING_SUFFIXES = {'gzip': '-gzip', 'br': '-br'}
+
+
+def json_response(data, max_age=0, headers=None):
+    """Serialize `data` with a strong ETag and answer If-None-Match with an empty 304.
+
+    `max_age` should match how long the underlying data is cached, so clients revalidate
+    about as often as it can change.
+    """
+    body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    # The tag of the representation compress_response will send, so a 304 confirms that one
+    etag = variant_etag('"' + hashlib.sha256(body).hexdigest()[:32] + '"', negotiate_encoding(len(body)))
+
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = f'max-age={int(max_age)}, must-revalidate' if max_age else 'no-cache'
+    response.vary.add('Accept-Encoding')
+    for name, value in (headers or {}).items():
+        response.headers[name] = value
+    return response
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # If-None-Match uses weak comparison
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def negotiate_encoding(size):
+    """Return the Content-Encoding compress_response gives a 200 body of `size` bytes, or None."""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def variant_etag(etag, encoding):
+    # Each encoding is a different representation, so its strong ETag must differ too
+    if not encoding or not etag.endswith('"') or etag.endswith(ENCODING_SUFFIXES[encoding] + '"'):
+        return etag
+    return etag[:-1] + ENCODING_SUFFIXES[encoding] + '"'
+
+
+def compress_response(response):
+    """after_request hook: brotli or gzip-compress buffered responses above COMPRESS_MIN_BYTES."""
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed \
+            or 'Content-Encoding' in response.headers:
+        return response
+
+    data = response.get_data()
+    encoding = negotiate_encoding(len(data))
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        data = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+
+    # json_response already tags its body with the variant's ETag; other responses get it here
+    etag = response.headers.get('ETag')
+    if etag:
+        response.headers['ETag'] = variant_etag(etag, encoding)
+    return response
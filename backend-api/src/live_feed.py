@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+
+
+class LiveFeed:
+    """Fans newly processed files out to streaming clients from one shared poller.
+
+    The poller asks `fetch(since, limit, after_key)` (oldest first, then by key) only for files
+    at or after its high-water timestamp. After a full page the mark is that page's last
+    (timestamp, key), so a page of files sharing one timestamp cannot stall the feed. The mark trails the last poll by `lag_seconds` so records flushed
+    late by the processor are not missed; files already sent are remembered until the mark
+    passes them. Each client gets a bounded queue and is disconnected when it falls
+    `max_queue` files behind. The poller runs only while someone is subscribed.
+    """
+
+    def __init__(self, fetch, interval=2.0, lag_seconds=30, fetch_limit=1000, max_queue=1000, max_clients=500):
+        self.fetch = fetch
+        self.interval = interval
+        self.lag_seconds = lag_seconds
+        self.fetch_limit = fetch_limit
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._high_water = None
+        self._high_water_key = None
+        # key -> timestamp of files already sent within the lag window
+        self._sent = {}
+        self._stats = {'polls': 0, 'files': 0, 'dropped_clients': 0, 'errors': 0}
+
+    def subscribe(self):
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber = Subscriber(self.max_queue)
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live-feed-poller', daemon=True)
+                self._thread.start()
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, clients=len(self._subscribers))
+
+    def poll(self):
+        """Fetch the files added since the last poll and queue them for every subscriber."""
+        started = time.time()
+        since = self._high_water or _format_time(started - self.lag_seconds)
+
+        rows = list(self.fetch(since, self.fetch_limit, self._high_water_key))
+        files = [item for item in rows if self._sent.get(item['key']) != item['timestamp']]
+        for item in files:
+            self._sent[item['key']] = item['timestamp']
+
+        if len(rows) >= self.fetch_limit:
+            # More files are waiting; continue right after this page's last file, even if
+            # the next ones share its timestamp
+            self._high_water = rows[-1]['timestamp']
+            self._high_water_key = rows[-1]['key']
+        else:
+            self._high_water = max(since, _format_time(started - self.lag_seconds))
+            self._high_water_key = None
+        # Files before the mark are never fetched again, so they no longer need remembering
+        self._sent = {key: timestamp for key, timestamp in self._sent.items() if timestamp >= self._high_water}
+
+        with self._lock:
+            self._stats['polls'] += 1
+            self._stats['files'] += len(files)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            if not subscriber.offer(files):
+                with self._lock:
+                    self._subscribers.discard(subscriber)
+                    self._stats['dropped_clients'] += 1
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Nobody is listening; the next subscriber starts a new poller
+                    self._thread = None
+                    self._high_water = None
+                    self._high_water_key = None
+                    self._sent = {}
+                    return
+
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error polling for new files: {str(e)}")
+                with self._lock:
+                    self._stats['errors'] += 1
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class Subscriber:
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = False
+
+    def offer(self, files):
+        """Queue files without blocking the poller; returns False when this client fell too far behind."""
+        try:
+            for item in files:
+                self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped = True
+            return False
+        return True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def _format_time(epoch):
+    # Same fixed-width format as Timestream timestamps, so strings compare chronologically
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(epoch)) + f'.{int(epoch % 1 * 1e9):09d}'
@@ -0,0 +1,27 @@
+import json
+import os
+import time
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'FileProcessing')
+
+
+def emit_metrics(metrics, dimensions, properties=None, namespace=NAMESPACE):
+    """Print one CloudWatch Embedded Metric Format document.
+
+    `metrics` maps a metric name to a (value, unit) pair. CloudWatch Logs extracts the
+    metrics from the container's log stream, so no PutMetricData calls are made.
+    """
+    document = dict(properties or {})
+    document.update(dimensions)
+    for name, (value, _) in metrics.items():
+        document[name] = value
+
+    document['_aws'] = {
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [{
+            'Namespace': namespace,
+            'Dimensions': [list(dimensions)],
+            'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()]
+        }]
+    }
+    print(json.dumps(document), flush=True)
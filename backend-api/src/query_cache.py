@@ -0,0 +1,135 @@
+import threading
+import time
+
+
+class QueryCache:
+    """In-process cache for query results.
+
+    Entries are fresh for `ttl` seconds. After that they are still served for up to
+    `stale_ttl` seconds while a single background refresh runs. Concurrent misses for
+    the same key share one load instead of each running the query.
+    """
+
+    def __init__(self, ttl=15, stale_ttl=300, max_entries=256):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._in_flight = {}
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'errors': 0
+        }
+
+    def get(self, key, loader):
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.fresh_until:
+                self._stats['hits'] += 1
+                return entry.value
+
+            if entry is not None and now < entry.stale_until:
+                self._stats['stale_hits'] += 1
+                if key not in self._in_flight:
+                    self._in_flight[key] = _Flight()
+                    threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                return entry.value
+
+            flight = self._in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                self._stats['misses'] += 1
+                flight = self._in_flight[key] = _Flight()
+            else:
+                self._stats['coalesced'] += 1
+
+        if not is_leader:
+            return flight.wait()
+
+        return self._load(key, loader, flight)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def _refresh(self, key, loader):
+        with self._lock:
+            self._stats['refreshes'] += 1
+            flight = self._in_flight[key]
+
+        try:
+            self._load(key, loader, flight)
+        except Exception as e:
+            # Keep serving the stale value; the next request past the TTL retries
+            print(f"Background refresh failed for {key}: {str(e)}")
+
+    def _load(self, key, loader, flight):
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._stats['errors'] += 1
+                self._in_flight.pop(key, None)
+            flight.fail(e)
+            raise
+
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = _Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl)
+            self._in_flight.pop(key, None)
+            self._evict()
+        flight.resolve(value)
+
+        return value
+
+    def _evict(self):
+        # Drop the entries closest to expiry once the cache is over capacity
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            oldest = sorted(self._entries, key=lambda k: self._entries[k].stale_until)[:overflow]
+            for key in oldest:
+                del self._entries[key]
+
+
+class _Entry:
+    __slots__ = ('value', 'fresh_until', 'stale_until')
+
+    def __init__(self, value, fresh_until, stale_until):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class _Flight:
+    def __init__(self):
+        self._event = threading.Event()
+        self._value = None
+        self._error = None
+
+    def resolve(self, value):
+        self._value = value
+        self._event.set()
+
+    def fail(self, error):
+        self._error = error
+        self._event.set()
+
+    def wait(self):
+        self._event.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
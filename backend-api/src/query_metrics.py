@@ -0,0 +1,157 @@
+import bisect
+import json
+import os
+import threading
+
+# Upper bounds (seconds) of the query latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help) of every per-query series, in exposition order
+COUNTERS = {
+    'queries': ('counter', 'Timestream queries run'),
+    'errors': ('counter', 'Timestream queries that failed'),
+    'empty_results': ('counter', 'Timestream queries that succeeded without returning rows'),
+    'pages': ('counter', 'Timestream result pages fetched'),
+    'rows': ('counter', 'Rows returned by Timestream queries'),
+    'retries': ('counter', 'Timestream query calls retried by the client'),
+    'bytes_scanned': ('counter', 'Bytes scanned by Timestream queries'),
+    'bytes_metered': ('counter', 'Bytes billed for Timestream queries'),
+}
+METRIC_PREFIX = 'timestream_query_'
+
+
+class QueryMetrics:
+    """Per-query counters and latency histograms, rendered in the Prometheus text format.
+
+    With a `directory`, every process writes its totals to its own file there and render()
+    sums all files, so whichever gunicorn worker answers a scrape reports the whole task.
+    Files of exited workers are kept, so the counters never go backwards when gunicorn
+    replaces a worker. Without one, only this process is counted.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, directory=None):
+        self.buckets = tuple(buckets)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._pid = os.getpid()
+
+    def record(self, name, duration, pages=0, rows=0, retries=0, bytes_scanned=0, bytes_metered=0, error=False):
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked worker inherits the parent's totals, which the parent's file already holds
+                self._queries = {}
+                self._pid = os.getpid()
+
+            series = self._queries.get(name)
+            if series is None:
+                series = self._queries[name] = _QuerySeries(len(self.buckets))
+
+            counters = series.counters
+            counters['queries'] += 1
+            if error:
+                counters['errors'] += 1
+            elif rows == 0:
+                counters['empty_results'] += 1
+            counters['pages'] += pages
+            counters['rows'] += rows
+            counters['retries'] += retries
+            counters['bytes_scanned'] += bytes_scanned
+            counters['bytes_metered'] += bytes_metered
+
+            series.bucket_counts[bisect.bisect_left(self.buckets, duration)] += 1
+            series.duration_sum += duration
+
+            if self.directory:
+                try:
+                    self._write()
+                except OSError as e:
+                    # Metrics must never fail the query they describe
+                    print(f"Error writing query metrics: {str(e)}")
+
+    def snapshot(self):
+        return {name: dict(series.counters, duration_sum=series.duration_sum)
+                for name, series in self._collect().items()}
+
+    def render(self):
+        queries = sorted(self._collect().items())
+        lines = []
+        for counter, (metric_type, description) in COUNTERS.items():
+            metric = f'{METRIC_PREFIX}{counter}_total'
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} {metric_type}')
+            for name, series in queries:
+                lines.append(f'{metric}{{query="{_label(name)}"}} {series.counters[counter]}')
+
+        metric = f'{METRIC_PREFIX}duration_seconds'
+        lines.append(f'# HELP {metric} Time spent waiting on Timestream per query, across all pages')
+        lines.append(f'# TYPE {metric} histogram')
+        for name, series in queries:
+            label = _label(name)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.bucket_counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{query="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{query="{label}",le="+Inf"}} {series.counters["queries"]}')
+            lines.append(f'{metric}_sum{{query="{label}"}} {round(series.duration_sum, 6)}')
+            lines.append(f'{metric}_count{{query="{label}"}} {series.counters["queries"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _collect(self):
+        """Return name -> _QuerySeries summed over every process sharing the directory."""
+        if not self.directory:
+            with self._lock:
+                return {name: series.copy() for name, series in self._queries.items()}
+
+        merged = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    queries = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, values in queries.items():
+                series = merged.get(name)
+                if series is None:
+                    series = merged[name] = _QuerySeries(len(self.buckets))
+                series.add(values)
+        return merged
+
+    def _write(self):
+        # Called with the lock held; the rename makes each file replace atomic for readers
+        path = os.path.join(self.directory, f'queries-{self._pid}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump({name: series.to_dict() for name, series in self._queries.items()}, f)
+        os.replace(path + '.tmp', path)
+
+
+class _QuerySeries:
+    __slots__ = ('counters', 'bucket_counts', 'duration_sum')
+
+    def __init__(self, bucket_count):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # One slot per bucket plus the overflow past the last bound
+        self.bucket_counts = [0] * (bucket_count + 1)
+        self.duration_sum = 0.0
+
+    def copy(self):
+        series = _QuerySeries(len(self.bucket_counts) - 1)
+        series.add(self.to_dict())
+        return series
+
+    def add(self, values):
+        for counter in COUNTERS:
+            self.counters[counter] += values['counters'].get(counter, 0)
+        for i, count in enumerate(values['bucket_counts'][:len(self.bucket_counts)]):
+            self.bucket_counts[i] += count
+        self.duration_sum += values['duration_sum']
+
+    def to_dict(self):
+        return {'counters': self.counters, 'bucket_counts': self.bucket_counts, 'duration_sum': self.duration_sum}
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
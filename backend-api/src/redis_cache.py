@@ -0,0 +1,122 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+try:
+    import redis
+except ImportError:  # Without the client every read falls back to Timestream
+    redis = None
+
+REDIS_HOST = os.environ.get('REDIS_HOST')
+REDIS_PORT = int(os.environ.get('REDIS_PORT', '6379'))
+
+# Key layout shared with the file processor (src/lambda/file_processor/redis_cache.py)
+KEY_PREFIX = 'file-processing'
+# Hourly hashes (EXTENSION_COUNTS_KEY:<YYYY-MM-DDTHH>) that expire with Timestream's retention,
+# so their sum covers the same window as the rollup table
+EXTENSION_COUNTS_KEY = f'{KEY_PREFIX}:extension-counts'
+# Same layout for the bytes per extension, summed into total_bytes like the rollup table's
+EXTENSION_BYTES_KEY = f'{KEY_PREFIX}:extension-bytes'
+# Time of the oldest file counted since the cache was last empty, e.g. after a node restart.
+# Renamed when the bytes hashes were added, so counts from before then don't count as coverage
+COUNTS_SINCE_KEY = f'{KEY_PREFIX}:counts-with-bytes-since'
+COUNT_WINDOW_HOURS = 7 * 24
+EXTENSION_LAST_UPDATE_KEY = f'{KEY_PREFIX}:extension-last-update'
+RECENT_FILES_KEY = f'{KEY_PREFIX}:recent-files'
+RECENT_FILES_LIMIT = 1000
+
+
+class RedisCache:
+    """Read side of the live counters and recent files list maintained by the processor.
+
+    Every method returns None when Redis is not configured, unreachable or empty, so
+    callers can fall back to Timestream.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    def reset_client(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None and redis is not None and REDIS_HOST:
+            self._client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT,
+                                       socket_connect_timeout=1, socket_timeout=1,
+                                       health_check_interval=30, decode_responses=True)
+        return self._client
+
+    def get_file_types(self, now=None):
+        """Return per-extension counts and bytes over the retention window, or None unless Redis covers all of it.
+
+        Counters only exist from the first file recorded after the cache was empty. Until that
+        is a full window ago, Timestream has files Redis never saw and must answer instead.
+        """
+        if self.client is None:
+            return None
+
+        now = now or datetime.utcnow()
+        hours = [now - timedelta(hours=offset) for offset in range(COUNT_WINDOW_HOURS)]
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.get(COUNTS_SINCE_KEY)
+            pipeline.hgetall(EXTENSION_LAST_UPDATE_KEY)
+            for hour in hours:
+                pipeline.hgetall(f"{EXTENSION_COUNTS_KEY}:{hour.strftime('%Y-%m-%dT%H')}")
+                pipeline.hgetall(f"{EXTENSION_BYTES_KEY}:{hour.strftime('%Y-%m-%dT%H')}")
+            counts_since, last_updates, *hourly = pipeline.execute()
+        except Exception as e:
+            print(f"Error reading file types from Redis: {str(e)}")
+            return None
+
+        window_start = hours[-1].strftime('%Y-%m-%d %H')
+        if counts_since is None or counts_since[:13] > window_start:
+            return None
+
+        counts = {}
+        total_bytes = {}
+        for hour_counts, hour_bytes in zip(hourly[::2], hourly[1::2]):
+            for extension, count in hour_counts.items():
+                counts[extension] = counts.get(extension, 0) + int(count)
+            for extension, size in hour_bytes.items():
+                total_bytes[extension] = total_bytes.get(extension, 0) + int(size)
+        if not counts:
+            return None
+
+        # Same fields as the rollup query (TimestreamService.iter_file_types)
+        data = [
+            {'extension': extension, 'count': count, 'total_bytes': total_bytes.get(extension, 0),
+             'last_update': last_updates.get(extension)}
+            for extension, count in counts.items()
+        ]
+        data.sort(key=lambda item: item['count'], reverse=True)
+        return data
+
+    def get_recent_files(self, limit=20, since=None):
+        """Return up to `limit` newest files, optionally only those newer than `since` (a datetime).
+
+        Files are ordered like the Timestream query (time, then key, descending) and carry the
+        time of their Timestream record, so a cursor built from the last one continues the page
+        in Timestream without repeating or skipping rows.
+        """
+        if self.client is None or limit > RECENT_FILES_LIMIT:
+            return None
+
+        try:
+            # Concurrent processors push in flush order, not time order, so sort the whole buffer
+            entries = self.client.lrange(RECENT_FILES_KEY, 0, RECENT_FILES_LIMIT - 1)
+        except Exception as e:
+            print(f"Error reading recent files from Redis: {str(e)}")
+            return None
+
+        if not entries:
+            return None
+
+        data = [json.loads(entry) for entry in entries]
+        if since is not None:
+            # Timestamps share Timestream's fixed-width format, so string comparison orders them
+            cutoff = since.strftime('%Y-%m-%d %H:%M:%S')
+            data = [item for item in data if item['timestamp'] > cutoff]
+        data.sort(key=lambda item: (item['timestamp'], item['key']), reverse=True)
+        return data[:limit]
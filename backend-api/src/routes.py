@@ -1,19 +1,283 @@
-from flask import jsonify
-from .timestream_service import TimestreamService
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from flask import Response, jsonify, request, stream_with_context
+from .bucket_cache import BucketCache
+from .http_cache import compress_response, json_response
+from .live_feed import LiveFeed
+from .query_cache import QueryCache
+from .redis_cache import RedisCache
+from .timestream_service import InvalidCursorError, TimestreamService, decode_cursor, encode_cursor
 
 timestream_service = TimestreamService()
 
+# Live counters kept by the processor; Timestream is only queried when Redis can't answer
+redis_cache = RedisCache()
+
+# Dashboards poll these endpoints, so identical queries are served from memory for a short while
+query_cache = QueryCache(
+    ttl=int(os.environ.get('QUERY_CACHE_TTL_SECONDS', '15')),
+    stale_ttl=int(os.environ.get('QUERY_CACHE_STALE_SECONDS', '300'))
+)
+
+# Closed throughput buckets never change; only missing and still-open buckets are queried
+throughput_cache = BucketCache(settle_seconds=int(os.environ.get('THROUGHPUT_SETTLE_SECONDS', '120')))
+
+# One poller per process feeds every /api/live-files stream with the files added since its last query
+live_feed = LiveFeed(timestream_service.get_files_since,
+                     interval=float(os.environ.get('LIVE_FEED_INTERVAL_SECONDS', '2')),
+                     max_queue=int(os.environ.get('LIVE_FEED_MAX_QUEUE', '1000')),
+                     # Under gunicorn the limit follows the worker's thread count (see gunicorn.conf.py)
+                     max_clients=int(os.environ.get('LIVE_FEED_MAX_CLIENTS', '500')))
+# Comment lines keep idle streams open through the load balancer's idle timeout
+LIVE_FEED_HEARTBEAT_SECONDS = 15
+
+# Shared by all requests so /api/dashboard can run its queries side by side
+QUERY_EXECUTOR_WORKERS = int(os.environ.get('QUERY_EXECUTOR_WORKERS', '8'))
+query_executor = ThreadPoolExecutor(max_workers=QUERY_EXECUTOR_WORKERS, thread_name_prefix='timestream-query')
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4'
+BUCKET_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+MIN_BUCKET_SECONDS = 60
+MAX_BUCKETS = 1440
+GROUP_BY_OPTIONS = ('extension',)
+
 def register_routes(app):
+    app.after_request(compress_response)
+
     @app.route('/api/health', methods=['GET'])
     def health_check():
-        return jsonify({"status": "healthy"})
+        response = jsonify({"status": "healthy"})
+        response.headers['Cache-Control'] = 'no-store'
+        return response
 
     @app.route('/api/file-types', methods=['GET'])
     def get_file_types():
-        data = timestream_service.get_file_types()
-        return jsonify(data)
+        if wants_ndjson():
+            return ndjson_response(timestream_service.iter_file_types())
+
+        try:
+            data = load_file_types()
+        except Exception as e:
+            print(f"Error querying file types: {str(e)}")
+            return jsonify({"error": "query failed"}), 502
+
+        return json_response(data, max_age=query_cache.ttl)
 
     @app.route('/api/recent-files', methods=['GET'])
     def get_recent_files():
-        data = timestream_service.get_recent_files()
-        return jsonify(data)
\ No newline at end of file
+        try:
+            since = parse_since(request.args.get('since'))
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        cursor = request.args.get('cursor')
+
+        try:
+            if cursor:
+                decode_cursor(cursor)
+
+            if wants_ndjson():
+                # Streamed responses have no page size cap; rows are sent as Timestream returns them
+                rows = timestream_service.iter_recent_files(since=since, limit=limit, cursor=cursor)
+                return ndjson_response(rows)
+
+            data, next_cursor = load_recent_files(since=since, limit=limit or DEFAULT_PAGE_SIZE, cursor=cursor)
+        except InvalidCursorError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            print(f"Error querying recent files: {str(e)}")
+            return jsonify({"error": "query failed"}), 502
+
+        return json_response(data, max_age=query_cache.ttl,
+                             headers={'X-Next-Cursor': next_cursor} if next_cursor else None)
+
+    @app.route('/api/throughput', methods=['GET'])
+    def get_throughput():
+        try:
+            bucket_seconds = parse_bucket(request.args.get('bucket', '1m'))
+            end = parse_since(request.args.get('to'), name='to') or datetime.utcnow()
+            start = parse_since(request.args.get('from'), name='from') or end - timedelta(hours=1)
+            group_by = request.args.get('group_by') or None
+            if group_by is not None and group_by not in GROUP_BY_OPTIONS:
+                raise ValueError(f"Invalid 'group_by': {group_by}")
+            if start >= end:
+                raise ValueError("'from' must be before 'to'")
+            if (end - start).total_seconds() / bucket_seconds > MAX_BUCKETS:
+                raise ValueError(f"Too many buckets; at most {MAX_BUCKETS} per request")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            data = load_throughput(bucket_seconds, epoch_seconds(start), epoch_seconds(end), group_by)
+        except Exception as e:
+            print(f"Error querying throughput: {str(e)}")
+            return jsonify({"error": "query failed"}), 502
+
+        return json_response(data, max_age=query_cache.ttl)
+
+    @app.route('/api/live-files', methods=['GET'])
+    def get_live_files():
+        subscriber = live_feed.subscribe()
+        if subscriber is None:
+            return jsonify({"error": "too many live clients"}), 503
+
+        def generate():
+            try:
+                yield 'retry: 5000\n\n'
+                while not subscriber.dropped:
+                    item = subscriber.get(timeout=LIVE_FEED_HEARTBEAT_SECONDS)
+                    if item is None:
+                        yield ': keepalive\n\n'
+                    else:
+                        yield f"id: {item['timestamp']}\nevent: file\ndata: {json.dumps(item)}\n\n"
+                # The client fell too far behind; it reconnects and reloads /api/recent-files
+                yield 'event: dropped\ndata: {}\n\n'
+            finally:
+                live_feed.unsubscribe(subscriber)
+
+        return Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/api/dashboard', methods=['GET'])
+    def get_dashboard():
+        started = time.perf_counter()
+        futures = {name: query_executor.submit(timed, load) for name, load in DASHBOARD_QUERIES.items()}
+
+        payload = {}
+        timings = {}
+        errors = {}
+        for name, future in futures.items():
+            try:
+                payload[name], timings[name] = future.result()
+            except Exception as e:
+                print(f"Error loading dashboard query {name}: {str(e)}")
+                payload[name] = None
+                errors[name] = str(e)
+
+        timings['total'] = round((time.perf_counter() - started) * 1000, 2)
+        payload['timings_ms'] = timings
+        if errors:
+            payload['errors'] = errors
+        return jsonify(payload)
+
+    @app.route('/api/cache-stats', methods=['GET'])
+    def get_cache_stats():
+        return jsonify(dict(query_cache.stats(), throughput=throughput_cache.stats(), live_feed=live_feed.stats()))
+
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        # Prometheus text exposition format, summed over all workers of this task
+        return Response(timestream_service.metrics.render(), mimetype=PROMETHEUS_MIMETYPE,
+                        headers={'Cache-Control': 'no-store'})
+
+
+def reset_after_fork():
+    """Give a forked gunicorn worker its own clients and threads instead of the master's copies."""
+    global query_executor
+    timestream_service.reset_client()
+    redis_cache.reset_client()
+    query_executor = ThreadPoolExecutor(max_workers=QUERY_EXECUTOR_WORKERS, thread_name_prefix='timestream-query')
+
+
+def load_file_types():
+    data = redis_cache.get_file_types()
+    if data is not None:
+        return data
+
+    return query_cache.get(('file_types',), timestream_service.get_file_types)
+
+
+def load_recent_files(since=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    # Redis holds the newest files only, so it can serve the first page of the default window
+    if since is None and cursor is None:
+        data = redis_cache.get_recent_files(limit, since=datetime.utcnow() - timedelta(hours=1))
+        if data is not None:
+            return data, encode_cursor(data[-1]) if len(data) == limit else None
+
+    key = ('recent_files', since, limit, cursor)
+    return query_cache.get(key, lambda: timestream_service.get_recent_files(since=since, limit=limit, cursor=cursor))
+
+
+def load_throughput(bucket_seconds, start, end, group_by=None):
+    def loader(query_start, query_end):
+        return list(timestream_service.iter_throughput(bucket_seconds, query_start, query_end, group_by=group_by))
+
+    return throughput_cache.get((bucket_seconds, group_by), bucket_seconds, start, end, loader)
+
+
+# Queries combined by /api/dashboard; each one runs concurrently on query_executor
+DASHBOARD_QUERIES = {
+    'file_types': load_file_types,
+    'recent_files': lambda: load_recent_files()[0],
+}
+
+
+def timed(load):
+    started = time.perf_counter()
+    result = load()
+    return result, round((time.perf_counter() - started) * 1000, 2)
+
+
+def wants_ndjson():
+    return request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def ndjson_response(rows):
+    def generate():
+        try:
+            for row in rows:
+                yield json.dumps(row) + '\n'
+        except Exception as e:
+            # Headers are already sent, so the error can only be reported in-band
+            print(f"Error streaming results: {str(e)}")
+            yield json.dumps({"error": "query failed"}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def parse_since(value, name='since'):
+    """Parse an ISO 8601 query parameter into a naive UTC datetime; values with an offset are converted."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.rstrip('Z'))
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' timestamp: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_bucket(value):
+    match = re.fullmatch(r'(\d+)([smhd])', value or '')
+    if not match:
+        raise ValueError(f"Invalid 'bucket': {value}")
+    seconds = int(match.group(1)) * BUCKET_UNITS[match.group(2)]
+    if seconds < MIN_BUCKET_SECONDS:
+        raise ValueError(f"Invalid 'bucket': {value}; the smallest bucket is {MIN_BUCKET_SECONDS}s")
+    return seconds
+
+
+def epoch_seconds(value):
+    # Query parameters are naive UTC datetimes
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_limit(value):
+    if not value:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid 'limit': {value}")
+    if limit < 1:
+        raise ValueError(f"Invalid 'limit': {value}")
+    return min(limit, MAX_PAGE_SIZE)
@@ -0,0 +1,133 @@
+"""Decoding of Timestream query results driven by the query's ColumnInfo."""
+
+try:
+    import numpy
+except ImportError:  # Optional, only needed for to_numpy()
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:  # Optional, only needed for to_arrow()
+    pyarrow = None
+
+
+def _parse_boolean(value):
+    return value == 'true'
+
+
+# Timestamps, dates and intervals are passed through in Timestream's own string format
+SCALAR_PARSERS = {
+    'BIGINT': int,
+    'INTEGER': int,
+    'DOUBLE': float,
+    'BOOLEAN': _parse_boolean,
+    'VARCHAR': str,
+    'TIMESTAMP': str,
+    'DATE': str,
+    'TIME': str,
+    'INTERVAL_DAY_TO_SECOND': str,
+    'INTERVAL_YEAR_TO_MONTH': str,
+    'UNKNOWN': str,
+}
+
+NUMPY_DTYPES = {
+    'BIGINT': 'int64',
+    'INTEGER': 'int64',
+    'DOUBLE': 'float64',
+    'BOOLEAN': 'bool',
+}
+
+
+class RowDecoder:
+    """Builds one converter per column from ColumnInfo and applies them to every row.
+
+    Missing values (NullValue or an absent ScalarValue) decode to None instead of being dropped.
+    """
+
+    def __init__(self, column_info):
+        self.column_info = column_info
+        self.names = [column.get('Name') for column in column_info]
+        self._converters = [_converter_for(column['Type']) for column in column_info]
+
+    def decode(self, row):
+        return dict(zip(self.names, [convert(datum) for convert, datum in zip(self._converters, row['Data'])]))
+
+    def decode_rows(self, rows):
+        for row in rows:
+            yield self.decode(row)
+
+    def to_columns(self, rows, columns=None):
+        """Decode rows into {name: [values]}, appending to `columns` when given."""
+        if columns is None:
+            columns = {name: [] for name in self.names}
+        targets = [(convert, columns[name].append) for convert, name in zip(self._converters, self.names)]
+
+        for row in rows:
+            for (convert, append), datum in zip(targets, row['Data']):
+                append(convert(datum))
+
+        return columns
+
+    def to_numpy(self, columns):
+        if numpy is None:
+            raise RuntimeError("numpy is not installed")
+
+        arrays = {}
+        for name, column in zip(self.names, self.column_info):
+            dtype = NUMPY_DTYPES.get(column['Type'].get('ScalarType'))
+            values = columns[name]
+            if dtype is None or None in values:
+                arrays[name] = numpy.array(values, dtype=object)
+            else:
+                arrays[name] = numpy.array(values, dtype=dtype)
+        return arrays
+
+    def to_arrow(self, columns):
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is not installed")
+        return pyarrow.table({name: columns[name] for name in self.names})
+
+
+def _converter_for(column_type):
+    if 'ScalarType' in column_type:
+        return _scalar_converter(SCALAR_PARSERS.get(column_type['ScalarType'], str))
+
+    if 'ArrayColumnInfo' in column_type:
+        element = _converter_for(column_type['ArrayColumnInfo']['Type'])
+
+        def convert_array(datum):
+            if datum.get('NullValue') or 'ArrayValue' not in datum:
+                return None
+            return [element(item) for item in datum['ArrayValue']]
+
+        return convert_array
+
+    if 'RowColumnInfo' in column_type:
+        nested = RowDecoder(column_type['RowColumnInfo'])
+
+        def convert_row(datum):
+            if datum.get('NullValue') or 'RowValue' not in datum:
+                return None
+            return nested.decode(datum['RowValue'])
+
+        return convert_row
+
+    if 'TimeSeriesMeasureValueColumnInfo' in column_type:
+        measure = _converter_for(column_type['TimeSeriesMeasureValueColumnInfo']['Type'])
+
+        def convert_time_series(datum):
+            if datum.get('NullValue') or 'TimeSeriesValue' not in datum:
+                return None
+            return [{'time': point['Time'], 'value': measure(point['Value'])} for point in datum['TimeSeriesValue']]
+
+        return convert_time_series
+
+    return _scalar_converter(str)
+
+
+def _scalar_converter(parse):
+    def convert(datum):
+        value = datum.get('ScalarValue')
+        return None if value is None else parse(value)
+
+    return convert
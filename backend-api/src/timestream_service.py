@@ -1,73 +1,261 @@
+import base64
+import binascii
 import boto3
+from botocore.config import Config
+import json
 import os
+import re
+import time
 from datetime import datetime, timedelta
+from .metrics import emit_metrics
+from .query_metrics import QueryMetrics
+from .row_decoder import RowDecoder
+
+# Records written by the backfill job carry their load time, so views of recent activity skip
+# them; the file type totals (the rollup table) include them. Records from before the origin
+# dimension existed have no origin and are live uploads.
+LIVE_ORIGIN_CONDITION = "(origin IS NULL OR origin <> 'backfill')"
+
+# Timestream timestamps look like '2024-01-01 12:00:00.123000000'
+TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d{1,9})?$')
+
+
+# Every request thread of a worker shares one client, so its pool must cover all of them
+MAX_POOL_CONNECTIONS = int(os.environ.get('QUERY_CLIENT_MAX_POOL_CONNECTIONS', '64'))
+
+
+class InvalidCursorError(ValueError):
+    pass
 
 
 class TimestreamService:
     def __init__(self):
-        self.client = boto3.client('timestream-query')
+        self.client = self.create_client()
         self.db_name = os.environ.get('TIMESTREAM_DB_NAME')
         self.events_table = os.environ.get('TIMESTREAM_EVENTS_TABLE')
-        self.file_types_table = os.environ.get('TIMESTREAM_FILE_TYPES_TABLE')
+        # Hourly per-extension aggregates maintained by a Timestream scheduled query
+        self.rollup_table = os.environ.get('TIMESTREAM_ROLLUP_TABLE', 'file_type_rollups')
+        # Layout of the events table written by the processor ('1' single-measure, '2' multi-measure)
+        self.schema_version = os.environ.get('TIMESTREAM_SCHEMA_VERSION', '1')
+        # Layouts read back: '1', '2' or 'both' while the old layout is still within retention
+        self.read_schema = os.environ.get('TIMESTREAM_READ_SCHEMA') or self.schema_version
+        # Per-query counters and latency histograms served by /api/metrics, shared by all workers
+        # through QUERY_METRICS_DIR (set by gunicorn.conf.py)
+        self.metrics = QueryMetrics(directory=os.environ.get('QUERY_METRICS_DIR') or None)
+
+    @staticmethod
+    def create_client():
+        return boto3.client('timestream-query', config=Config(
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            retries={'mode': 'adaptive', 'max_attempts': 5},
+            tcp_keepalive=True
+        ))
+
+    def reset_client(self):
+        """Replace the client, e.g. in a forked worker, where inherited pooled connections are unsafe."""
+        self.client = self.create_client()
 
     def get_file_types(self):
+        return list(self.iter_file_types())
+
+    def iter_file_types(self):
+        # Sums a handful of rows per extension instead of counting every file event
+        query = f"""
+        SELECT file_extension AS extension,
+               SUM(file_count) AS count,
+               SUM(total_bytes) AS total_bytes,
+               MAX(last_update) AS last_update
+        FROM "{self.db_name}"."{self.rollup_table}"
+        WHERE measure_name = 'rollup'
+        GROUP BY file_extension
+        ORDER BY count DESC
+        """
+
+        yield from self.query_rows(query, name='file_types')
+
+    def get_recent_files(self, hours=1, since=None, limit=20, cursor=None):
+        """Return one page of recent files and the cursor for the next page (or None)."""
+        items = list(self.iter_recent_files(hours=hours, since=since, limit=limit, cursor=cursor))
+        next_cursor = encode_cursor(items[-1]) if limit and len(items) == limit else None
+        return items, next_cursor
+
+    def iter_recent_files(self, hours=1, since=None, limit=None, cursor=None):
+        """Yield recent files newest first, fetching further result pages only as they are consumed."""
+        if since is None:
+            since = datetime.utcnow() - timedelta(hours=hours)
+
+        measure_condition, key_column, size_column = self._file_event_columns()
+        columns = f"{key_column} AS key, {size_column} AS size"
+        conditions = [measure_condition, LIVE_ORIGIN_CONDITION]
+        conditions.append(f"time > '{since.strftime('%Y-%m-%d %H:%M:%S')}'")
+        if cursor:
+            # Keyset pagination: continue strictly after the last (time, key) already returned
+            last_time, last_key = decode_cursor(cursor)
+            conditions.append(
+                f"(time < '{last_time}' OR (time = '{last_time}' AND {key_column} < '{_escape(last_key)}'))"
+            )
+
+        query = f"""
+        SELECT {columns}, file_extension, time AS timestamp
+        FROM "{self.db_name}"."{self.events_table}"
+        WHERE {' AND '.join(conditions)}
+        ORDER BY time DESC, {key_column} DESC
+        """
+        if limit:
+            query += f"LIMIT {int(limit)}\n"
+
+        yield from self.query_rows(query, name='recent_files')
+
+    def get_files_since(self, since, limit=1000, after_key=None):
+        """Return files recorded at or after the Timestream timestamp `since`, oldest first.
+
+        With `after_key`, files at exactly `since` are only returned when their key sorts after it.
+        Errors are raised so the live feed keeps its position and retries.
+        """
+        if not TIMESTAMP_PATTERN.match(since):
+            raise ValueError(f"Invalid timestamp: {since}")
+
+        measure_condition, key_column, size_column = self._file_event_columns()
+
+        time_condition = f"time >= '{since}'"
+        if after_key is not None:
+            time_condition = f"(time > '{since}' OR (time = '{since}' AND {key_column} > '{_escape(after_key)}'))"
+
+        query = f"""
+        SELECT {key_column} AS key, {size_column} AS size, file_extension, time AS timestamp
+        FROM "{self.db_name}"."{self.events_table}"
+        WHERE {measure_condition} AND {LIVE_ORIGIN_CONDITION} AND {time_condition}
+        ORDER BY time ASC, {key_column} ASC
+        LIMIT {int(limit)}
+        """
+
+        return list(self.query_rows(query, name='live_files'))
+
+    def iter_throughput(self, bucket_seconds, start, end, group_by=None):
+        """Yield upload counts and bytes per time bucket (and extension) between epoch seconds start and end."""
+        measure_condition, _, size_column = self._file_event_columns()
+
+        group_columns = [f"bin(time, {int(bucket_seconds)}s)"]
+        select_columns = [f"bin(time, {int(bucket_seconds)}s) AS time"]
+        if group_by == 'extension':
+            group_columns.append("file_extension")
+            select_columns.append("file_extension AS extension")
+
+        query = f"""
+        SELECT {', '.join(select_columns)}, COUNT(*) AS uploads, SUM({size_column}) AS bytes
+        FROM "{self.db_name}"."{self.events_table}"
+        WHERE {measure_condition}
+          AND {LIVE_ORIGIN_CONDITION}
+          AND time >= from_milliseconds({int(start * 1000)})
+          AND time < from_milliseconds({int(end * 1000)})
+        GROUP BY {', '.join(group_columns)}
+        ORDER BY 1
+        """
+
+        yield from self.query_rows(query, name='throughput')
+
+    def _file_event_columns(self):
+        """Return the condition selecting file records and the expressions of their key and size, per read schema."""
+        if self.read_schema == 'both':
+            # One scan over both layouts: '1' keeps the key in a dimension and the size in measure_value,
+            # '2' both in measure attributes
+            return ("measure_name IN ('file_size', 'file_event')",
+                    "COALESCE(key, object_key)",
+                    "CASE WHEN measure_name = 'file_event' THEN size ELSE measure_value::bigint END")
+        if self.read_schema == '2':
+            # object_key and size are measure attributes of the multi-measure file_event record
+            return "measure_name = 'file_event'", "object_key", "size"
+        return "measure_name = 'file_size'", "key", "measure_value::bigint"
+
+    def query_rows(self, query, name='adhoc'):
+        """Yield each result row as a dict keyed by column name."""
+        for decoder, page in self._pages(query, name):
+            yield from decoder.decode_rows(page['Rows'])
+
+    def query_columns(self, query, output='lists', name='adhoc'):
+        """Return the whole result column-oriented, as lists or as 'numpy' arrays / an 'arrow' table."""
+        decoder = None
+        columns = None
+        for decoder, page in self._pages(query, name):
+            columns = decoder.to_columns(page['Rows'], columns)
+
+        if output == 'numpy':
+            return decoder.to_numpy(columns)
+        if output == 'arrow':
+            return decoder.to_arrow(columns)
+        return columns
+
+    def _pages(self, query, name):
+        """Yield (decoder, page) for every result page and record the query's cost under `name`.
+
+        Errors are raised, never turned into an empty result, so callers don't cache or show a
+        failed query as "no data".
+        """
+        # Timestream can return empty pages with a NextToken while the query is still running
+        kwargs = {'QueryString': query}
+        decoder = None
+        stats = {'duration': 0.0, 'pages': 0, 'rows': 0, 'retries': 0, 'bytes_scanned': 0, 'bytes_metered': 0}
+        failed = False
         try:
-            query = f"""
-            SELECT file_extension as extension, count as count, last_update
-            FROM "{self.db_name}"."{self.file_types_table}"
-            ORDER BY count DESC
-            """
-
-            result = self.client.query(QueryString=query)
-
-            data = []
-            for row in result['Rows']:
-                item = {}
-                for i, col in enumerate(row['Data']):
-                    if 'ScalarValue' in col:
-                        if i == 0:
-                            item['extension'] = col['ScalarValue']
-                        elif i == 1:
-                            item['count'] = int(col['ScalarValue'])
-                        elif i == 2:
-                            item['last_update'] = col['ScalarValue']
-                data.append(item)
-
-            return data
-        except Exception as e:
-            print(f"Error querying file types: {str(e)}")
-            return []
-
-    def get_recent_files(self, hours=1):
-        try:
-            one_hour_ago = (datetime.utcnow() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-
-            query = f"""
-            SELECT key, size, file_extension, time
-            FROM "{self.db_name}"."{self.events_table}"
-            WHERE time > '{one_hour_ago}'
-            ORDER BY time DESC
-            LIMIT 20
-            """
-
-            result = self.client.query(QueryString=query)
-
-            data = []
-            for row in result['Rows']:
-                item = {}
-                for i, col in enumerate(row['Data']):
-                    if 'ScalarValue' in col:
-                        if i == 0:
-                            item['key'] = col['ScalarValue']
-                        elif i == 1:
-                            item['size'] = int(col['ScalarValue'])
-                        elif i == 2:
-                            item['file_extension'] = col['ScalarValue']
-                        elif i == 3:
-                            item['timestamp'] = col['ScalarValue']
-                data.append(item)
-
-            return data
-        except Exception as e:
-            print(f"Error querying recent files: {str(e)}")
-            return []
\ No newline at end of file
+            while True:
+                started = time.perf_counter()
+                try:
+                    result = self.client.query(**kwargs)
+                finally:
+                    # Only time spent waiting on Timestream counts, not time spent consuming rows;
+                    # failed calls count too, so slow timeouts show up in the latency histogram
+                    stats['duration'] += time.perf_counter() - started
+                stats['pages'] += 1
+                stats['rows'] += len(result['Rows'])
+                stats['retries'] += result.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+                # Cumulative over the pages of the query, so the last page has the totals
+                query_status = result.get('QueryStatus', {})
+                stats['bytes_scanned'] = query_status.get('CumulativeBytesScanned', 0)
+                stats['bytes_metered'] = query_status.get('CumulativeBytesMetered', 0)
+
+                if decoder is None:
+                    # Column metadata is identical on every page, so it is only read once
+                    decoder = RowDecoder(result['ColumnInfo'])
+                yield decoder, result
+
+                next_token = result.get('NextToken')
+                if not next_token:
+                    return
+                kwargs['NextToken'] = next_token
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.metrics.record(name, stats['duration'], pages=stats['pages'], rows=stats['rows'],
+                                retries=stats['retries'], bytes_scanned=stats['bytes_scanned'],
+                                bytes_metered=stats['bytes_metered'], error=failed)
+            emit_metrics({
+                'QueryDuration': (round(stats['duration'] * 1000, 3), 'Milliseconds'),
+                'QueryPages': (stats['pages'], 'Count'),
+                'QueryRows': (stats['rows'], 'Count'),
+                'QueryRetries': (stats['retries'], 'Count'),
+                'QueryBytesScanned': (stats['bytes_scanned'], 'Bytes'),
+                'QueryBytesMetered': (stats['bytes_metered'], 'Bytes'),
+                'QueryErrors': (int(failed), 'Count')
+            }, dimensions={'Service': 'backend-api', 'Query': name})
+
+
+def encode_cursor(item):
+    payload = json.dumps([item.get('timestamp'), item.get('key')]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        last_time, last_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+    if not isinstance(last_time, str) or not TIMESTAMP_PATTERN.match(last_time) or not isinstance(last_key, str):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+    return last_time, last_key
+
+
+def _escape(value):
+    return value.replace("'", "''")
@@ -0,0 +1,279 @@
+"""Load file metrics for objects that were uploaded before notifications were wired up.
+
+Runs the processor's own record building (process_s3_event / write_to_timestream) over a
+bucket listing instead of SQS events, e.g. after a schema change:
+
+    python backfill.py --bucket my-uploads --workers 16 --checkpoint backfill.json
+
+The listing is split into one shard per top-level prefix, shards are processed in parallel
+and progress is checkpointed after every page so an interrupted run resumes where it stopped.
+Keys that failed are kept in the checkpoint and retried at the end of this and every later
+run. Records are tagged origin=backfill so views of recent activity leave them out, while
+the file type totals (the rollup table and the Redis counters) include them.
+"""
+import argparse
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from botocore.exceptions import ClientError
+
+import index
+from batch_writer import TimestreamBatchWriter
+from metrics import MetricsLogger
+
+logger = logging.getLogger()
+
+DEFAULT_WORKERS = 8
+# Stay well below the Timestream write throttle shared with the live processor
+DEFAULT_RECORDS_PER_SECOND = 1000
+# ListObjectsV2 returns at most 1000 keys per page
+PAGE_SIZE = 1000
+
+
+class TokenBucket:
+    """Rate limiter shared by all workers; `acquire` blocks until `amount` tokens are available."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Requests larger than the bucket go into debt instead of waiting forever
+                if self._tokens >= min(amount, self.capacity):
+                    self._tokens -= amount
+                    return
+                wait = (min(amount, self.capacity) - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """Per-shard progress (the last key written) plus the keys that failed, kept in a JSON file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = {'shards': {}, 'failed': []}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._state = json.load(f)
+
+    def position(self, shard_id):
+        return self._state['shards'].get(shard_id, {}).get('after')
+
+    def is_done(self, shard_id):
+        return self._state['shards'].get(shard_id, {}).get('done', False)
+
+    def failed_keys(self):
+        return list(self._state['failed'])
+
+    def advance(self, shard_id, last_key, failed_keys=(), done=False):
+        with self._lock:
+            self._state['shards'][shard_id] = {'after': last_key, 'done': done}
+            self._state['failed'].extend(key for key in failed_keys if key not in self._state['failed'])
+            self._save()
+
+    def resolve(self, keys):
+        """Forget failed keys that have since been written (or no longer exist)."""
+        keys = set(keys)
+        with self._lock:
+            self._state['failed'] = [key for key in self._state['failed'] if key not in keys]
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        # Write to a temporary file first so an interrupted run never leaves a truncated checkpoint
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self._state, f)
+        os.replace(temp_path, self.path)
+
+
+class Shard:
+    def __init__(self, prefix, recursive=True):
+        self.prefix = prefix
+        self.recursive = recursive
+
+    @property
+    def id(self):
+        return f"{'tree' if self.recursive else 'direct'}:{self.prefix}"
+
+
+def list_shards(s3_client, bucket, prefix=''):
+    """One shard per common prefix directly below `prefix`, plus one for the objects at that level."""
+    shards = [Shard(prefix, recursive=False)]
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter='/'):
+        shards.extend(Shard(common['Prefix']) for common in page.get('CommonPrefixes', []))
+    return shards
+
+
+def listing_metadata(s3_object):
+    # Same inference as the processor's event fast path, so no HEAD request per object
+    content_type, _ = mimetypes.guess_type(s3_object['Key'])
+    return {
+        'content_type': content_type or 'application/octet-stream',
+        'last_modified': s3_object['LastModified']
+    }
+
+
+class Backfill:
+    def __init__(self, bucket, checkpoint=None, workers=DEFAULT_WORKERS,
+                 records_per_second=DEFAULT_RECORDS_PER_SECOND, fetch_metadata=False, page_size=PAGE_SIZE):
+        self.bucket = bucket
+        self.checkpoint = checkpoint or Checkpoint()
+        self.workers = workers
+        self.rate_limiter = TokenBucket(records_per_second)
+        self.fetch_metadata = fetch_metadata
+        self.page_size = page_size
+        self._stats_lock = threading.Lock()
+        self.stats = {'shards': 0, 'objects': 0, 'retried': 0, 'failed': 0}
+
+    def run(self, shards):
+        pending = [shard for shard in shards if not self.checkpoint.is_done(shard.id)]
+        logger.info(f"Backfilling {len(pending)} of {len(shards)} shards of s3://{self.bucket}")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill') as executor:
+            futures = {executor.submit(self.run_shard, shard): shard for shard in pending}
+            for future in as_completed(futures):
+                # A shard that raised keeps its checkpoint and is picked up by the next run
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Error backfilling shard {futures[future].id}: {str(e)}")
+
+        self.retry_failed()
+        self.stats['failed'] = len(self.checkpoint.failed_keys())
+        return self.stats
+
+    def retry_failed(self):
+        """Process the keys recorded as failed, by this or an earlier run, once more."""
+        keys = self.checkpoint.failed_keys()
+        if not keys:
+            return
+        logger.info(f"Retrying {len(keys)} failed keys")
+
+        s3_client = index.get_s3_client()
+        for start in range(0, len(keys), self.page_size):
+            objects = []
+            resolved = set()
+            for key in keys[start:start + self.page_size]:
+                try:
+                    response = s3_client.head_object(Bucket=self.bucket, Key=key)
+                except ClientError as e:
+                    if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                        # Deleted since the listing; there is nothing left to backfill
+                        resolved.add(key)
+                    else:
+                        logger.error(f"Error reading {key} for retry: {str(e)}")
+                    continue
+                objects.append({'Key': key, 'Size': response['ContentLength'],
+                                'LastModified': response['LastModified']})
+
+            failed_keys = self.process_objects(objects) if objects else set()
+            resolved.update(obj['Key'] for obj in objects if obj['Key'] not in failed_keys)
+            self.checkpoint.resolve(resolved)
+            with self._stats_lock:
+                self.stats['retried'] += len(objects)
+
+    def run_shard(self, shard):
+        kwargs = {'Bucket': self.bucket, 'Prefix': shard.prefix, 'MaxKeys': self.page_size}
+        if not shard.recursive:
+            kwargs['Delimiter'] = '/'
+        start_after = self.checkpoint.position(shard.id)
+        if start_after:
+            kwargs['StartAfter'] = start_after
+
+        s3_client = index.get_s3_client()
+        while True:
+            page = s3_client.list_objects_v2(**kwargs)
+            objects = page.get('Contents', [])
+            failed_keys = self.process_objects(objects) if objects else set()
+
+            last_key = objects[-1]['Key'] if objects else start_after
+            done = not page.get('IsTruncated')
+            self.checkpoint.advance(shard.id, last_key, sorted(failed_keys), done=done)
+            with self._stats_lock:
+                self.stats['objects'] += len(objects)
+                self.stats['shards'] += 1 if done else 0
+
+            logger.info(f"Shard {shard.id}: {len(objects)} objects up to {last_key}")
+            if done:
+                return
+            start_after = last_key
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+
+    def process_objects(self, objects):
+        """Write records for one listing page and return the keys that could not be written."""
+        s3_records = [
+            {'s3': {'bucket': {'name': self.bucket}, 'object': {'key': obj['Key'], 'size': obj['Size']}}}
+            for obj in objects
+        ]
+        if self.fetch_metadata:
+            metadata = index.fetch_metadata(s3_records)
+        else:
+            metadata = [listing_metadata(obj) for obj in objects]
+
+        writer = TimestreamBatchWriter(index.get_timestream_client(), index.DB_NAME, metrics=index.metrics)
+        failed_keys = set()
+        processed_files = []
+        for s3_record, object_metadata in zip(s3_records, metadata):
+            key = s3_record['s3']['object']['key']
+            try:
+                processed_files.append(index.process_s3_event(s3_record, writer, message_id=key,
+                                                              metadata=object_metadata,
+                                                              origin=index.ORIGIN_BACKFILL))
+            except Exception:
+                failed_keys.add(key)
+                writer.discard(key)
+
+        self.rate_limiter.acquire(writer.pending_count())
+        failed_keys.update(writer.flush())
+        # Count the files like the processor does, but keep them out of the recent files list
+        index.update_live_cache([item for item in processed_files if item['key'] not in failed_keys], recent=False)
+        index.metrics.flush()
+        return failed_keys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bucket', required=True)
+    parser.add_argument('--prefix', action='append', dest='prefixes',
+                        help='Only backfill these prefixes (repeatable); default: shard the whole bucket')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--records-per-second', type=int, default=DEFAULT_RECORDS_PER_SECOND)
+    parser.add_argument('--checkpoint', help='JSON file used to resume an interrupted run')
+    parser.add_argument('--fetch-metadata', action='store_true',
+                        help='HEAD (or sniff) every object like the processor does instead of guessing from the key')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(threadName)s %(message)s')
+    index.metrics = MetricsLogger(dimensions={'Function': 'file-processor-backfill'})
+
+    if args.prefixes:
+        shards = [Shard(prefix) for prefix in args.prefixes]
+    else:
+        shards = list_shards(index.get_s3_client(), args.bucket)
+
+    backfill = Backfill(args.bucket, checkpoint=Checkpoint(args.checkpoint), workers=args.workers,
+                        records_per_second=args.records_per_second, fetch_metadata=args.fetch_metadata)
+    stats = backfill.run(shards)
+    logger.info(f"Backfill finished: {json.dumps(stats)}")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
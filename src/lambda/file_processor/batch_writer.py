@@ -0,0 +1,210 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ConnectionError as EndpointError, HTTPClientError
+
+logger = logging.getLogger()
+
+# Timestream rejects WriteRecords calls with more than 100 records
+MAX_RECORDS_PER_WRITE = 100
+# Upper bound on concurrent WriteRecords calls per invocation; the controller adapts below it
+MAX_IN_FLIGHT_WRITES = int(os.environ.get('TIMESTREAM_MAX_IN_FLIGHT', '4'))
+# Attempts per chunk; the timestream-write client doesn't retry, so these are all the calls made
+MAX_WRITE_ATTEMPTS = int(os.environ.get('TIMESTREAM_WRITE_ATTEMPTS', '4'))
+BACKOFF_BASE_SECONDS = 0.1
+BACKOFF_MAX_SECONDS = 2.0
+# Server-side failures that are retried like throttling, without lowering the concurrency limit
+TRANSIENT_ERROR_CODES = {'InternalServerException', 'ServiceUnavailable', 'ServiceUnavailableException',
+                         'RequestTimeout', 'RequestTimeoutException'}
+# Words in a rejected record's Reason that mark it as worth re-sending. Every other rejection
+# (timestamps outside the memory store retention, invalid dimensions or values, version
+# conflicts) would be rejected the same way again.
+TRANSIENT_REJECTION_REASONS = ('throttl', 'internal', 'temporar', 'unavailable', 'try again', 'timed out')
+
+
+class WriteController:
+    """AIMD limit on in-flight WriteRecords calls plus jittered exponential backoff.
+
+    Every successful write raises the limit by 1/limit (about one per round of writes), a
+    throttled write halves it. The module keeps one controller, so the learned limit carries
+    over to the next warm invocation instead of starting each batch at full speed.
+    """
+
+    def __init__(self, max_limit=MAX_IN_FLIGHT_WRITES, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled=False):
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    @staticmethod
+    def backoff(attempt):
+        # Full jitter keeps concurrent Lambdas from retrying in lockstep
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+write_controller = WriteController()
+
+
+class TimestreamBatchWriter:
+    """Collects Timestream records for a whole invocation and writes them per table in chunks.
+
+    Every record can be tagged with a source (the SQS message id it came from) so that a
+    failed write can be reported back against the messages that produced it.
+    """
+
+    def __init__(self, client, database_name, max_records_per_write=MAX_RECORDS_PER_WRITE, metrics=None,
+                 controller=None):
+        self.client = client
+        self.metrics = metrics
+        self.database_name = database_name
+        self.max_records_per_write = max_records_per_write
+        self.controller = controller or write_controller
+        self.write_calls = 0
+        self._lock = threading.Lock()
+        # table -> [(record, source)]
+        self._records = defaultdict(list)
+
+    def add(self, table_name, record, source=None):
+        self._records[table_name].append((record, source))
+
+    def discard(self, source):
+        """Drop everything queued for a source, e.g. when its message failed half way."""
+        for table_name in self._records:
+            self._records[table_name] = [(r, s) for r, s in self._records[table_name] if s != source]
+
+    def pending_count(self):
+        return sum(len(records) for records in self._records.values())
+
+    def flush(self):
+        """Write every buffered record and return the set of sources whose records failed."""
+        chunks = [
+            (table_name, records[start:start + self.max_records_per_write])
+            for table_name, records in self._records.items()
+            for start in range(0, len(records), self.max_records_per_write)
+        ]
+        self._records.clear()
+
+        failed_sources = set()
+        if len(chunks) == 1:
+            failed_sources.update(self._write_chunk(*chunks[0]))
+        elif chunks:
+            with ThreadPoolExecutor(max_workers=min(self.controller.max_limit, len(chunks))) as executor:
+                for failed in executor.map(lambda chunk: self._write_chunk(*chunk), chunks):
+                    failed_sources.update(failed)
+
+        self._put_metric('WriteConcurrencyLimit', round(self.controller.limit, 2), 'Count')
+        return failed_sources
+
+    def _write_chunk(self, table_name, chunk):
+        """Write one chunk, retrying throttled calls and re-sending only rejected records."""
+        failed_sources = set()
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            throttled = False
+            started = time.perf_counter()
+            self.controller.acquire()
+            try:
+                response = self.client.write_records(
+                    DatabaseName=self.database_name,
+                    TableName=table_name,
+                    Records=[record for record, _ in chunk],
+                    CommonAttributes={
+                        'TimeUnit': 'MILLISECONDS'
+                    }
+                )
+                logger.debug(f"Wrote {len(chunk)} records to Timestream table {table_name}")
+                self._add_count('RecordsWritten', len(chunk))
+                self._add_count('WriteRecordsRetries',
+                                (response or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0))
+                return failed_sources
+            except Exception as e:
+                code = _error_code(e)
+                if code == 'ThrottlingException':
+                    throttled = True
+                    self._add_count('WriteRecordsThrottled', 1)
+                elif code in TRANSIENT_ERROR_CODES or isinstance(e, (EndpointError, HTTPClientError)):
+                    # Re-sending is safe: a record identical to one already written is accepted again
+                    logger.warning(f"Transient error writing to Timestream table {table_name}: {str(e)}")
+                    self._add_count('WriteRecordsTransientErrors', 1)
+                elif code == 'RejectedRecordsException':
+                    # The other records of the call were written; keep only the rejected ones
+                    permanent, retryable = _split_rejected(chunk, e)
+                    self._add_count('RecordsWritten', len(chunk) - len(permanent) - len(retryable))
+                    self._add_count('WriteRecordsRejected', len(permanent) + len(retryable))
+                    for reason in {r.get('Reason') for r in e.response.get('RejectedRecords', [])}:
+                        logger.warning(f"Timestream rejected records in {table_name}: {reason}")
+                    failed_sources.update(_sources_of(permanent))
+                    if not retryable:
+                        return failed_sources
+                    chunk = retryable
+                else:
+                    logger.error(f"Error writing to Timestream table {table_name}: {str(e)}")
+                    self._add_count('WriteRecordsErrors', 1)
+                    return failed_sources | _sources_of(chunk)
+            finally:
+                self.controller.release(throttled=throttled)
+                with self._lock:
+                    self.write_calls += 1
+                self._put_metric('WriteRecordsDuration', round((time.perf_counter() - started) * 1000, 3),
+                                 'Milliseconds')
+
+            if attempt + 1 < MAX_WRITE_ATTEMPTS:
+                time.sleep(self.controller.backoff(attempt))
+
+        logger.error(f"Giving up writing {len(chunk)} records to Timestream table {table_name} "
+                     f"after {MAX_WRITE_ATTEMPTS} attempts")
+        self._add_count('WriteRecordsErrors', 1)
+        return failed_sources | _sources_of(chunk)
+
+    def _put_metric(self, name, value, unit='Count'):
+        if self.metrics is not None:
+            self.metrics.put_metric(name, value, unit)
+
+    def _add_count(self, name, value):
+        if self.metrics is not None:
+            self.metrics.add_count(name, value)
+
+
+def _sources_of(chunk):
+    return {source for _, source in chunk if source is not None}
+
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def _split_rejected(chunk, error):
+    """Split the rejected (record, source) pairs into those that can't succeed and those worth re-sending."""
+    permanent = []
+    retryable = []
+    for rejection in error.response.get('RejectedRecords', []):
+        item = chunk[rejection['RecordIndex']]
+        (retryable if _is_transient_rejection(rejection) else permanent).append(item)
+    return permanent, retryable
+
+
+def _is_transient_rejection(rejection):
+    if 'ExistingVersion' in rejection:
+        return False
+    reason = (rejection.get('Reason') or '').lower()
+    return any(word in reason for word in TRANSIENT_REJECTION_REASONS)
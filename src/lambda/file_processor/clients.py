@@ -0,0 +1,50 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+# Connection and retry tuning shared by every client
+MAX_POOL_CONNECTIONS = int(os.environ.get('CLIENT_MAX_POOL_CONNECTIONS', os.environ.get('HEAD_CONCURRENCY', '16')))
+RETRY_MODE = os.environ.get('CLIENT_RETRY_MODE', 'adaptive')
+MAX_ATTEMPTS = int(os.environ.get('CLIENT_MAX_ATTEMPTS', '5'))
+CONNECT_TIMEOUT = float(os.environ.get('CLIENT_CONNECT_TIMEOUT', '2'))
+READ_TIMEOUT = float(os.environ.get('CLIENT_READ_TIMEOUT', '10'))
+
+_lock = threading.Lock()
+_clients = {}
+
+
+# Clients whose callers retry themselves; botocore makes a single attempt so every throttle
+# reaches the caller (the batch writer's AIMD controller) instead of being retried underneath it
+CALLER_RETRIED_SERVICES = {'timestream-write'}
+
+
+def client_config(service_name=None):
+    if service_name in CALLER_RETRIED_SERVICES:
+        retries = {'mode': 'standard', 'max_attempts': 1}
+    else:
+        retries = {'mode': RETRY_MODE, 'max_attempts': MAX_ATTEMPTS}
+
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        retries=retries,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        # Keep pooled connections alive between warm invocations
+        tcp_keepalive=True
+    )
+
+
+def get_client(service_name):
+    """Create a client on first use and reuse it for the lifetime of the execution environment.
+
+    Reusing the timestream-write client also reuses its cached endpoint discovery result.
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = _clients[service_name] = boto3.client(service_name, config=client_config(service_name))
+    return client
@@ -0,0 +1,149 @@
+import os
+import threading
+
+# Number of leading bytes fetched per object; enough for every signature below
+SNIFF_BYTES = int(os.environ.get('SNIFF_BYTES', '4096'))
+
+# (offset, signature, detected type), checked in order
+MAGIC_SIGNATURES = [
+    (0, b'\x89PNG\r\n\x1a\n', 'png'),
+    (0, b'\xff\xd8\xff', 'jpeg'),
+    (0, b'GIF87a', 'gif'),
+    (0, b'GIF89a', 'gif'),
+    (0, b'%PDF-', 'pdf'),
+    (0, b'PK\x03\x04', 'zip'),
+    (0, b'PK\x05\x06', 'zip'),
+    (0, b'\x1f\x8b', 'gzip'),
+    (0, b'BZh', 'bzip2'),
+    (0, b'\xfd7zXZ\x00', 'xz'),
+    (0, b'7z\xbc\xaf\x27\x1c', '7z'),
+    (0, b'Rar!\x1a\x07', 'rar'),
+    (257, b'ustar', 'tar'),
+    (0, b'PAR1', 'parquet'),
+    (0, b'SQLite format 3\x00', 'sqlite'),
+    (0, b'OggS', 'ogg'),
+    (0, b'fLaC', 'flac'),
+    (0, b'ID3', 'mp3'),
+    (0, b'\x7fELF', 'elf'),
+    (0, b'MZ', 'exe'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'ole'),
+]
+
+# RIFF containers carry their real type at offset 8
+RIFF_TYPES = {
+    b'WEBP': 'webp',
+    b'WAVE': 'wav',
+    b'AVI ': 'avi',
+}
+
+# ISO base media brands at offset 8, after the 'ftyp' box marker
+FTYP_BRANDS = {
+    b'qt  ': 'mov',
+    b'heic': 'heic',
+    b'heix': 'heic',
+    b'avif': 'avif',
+}
+
+# Each worker thread reuses one buffer for every object it sniffs
+_local = threading.local()
+
+
+def sniff_object(s3_client, bucket, key, size=None):
+    """Fetch the first SNIFF_BYTES of an object with a ranged GET and classify it.
+
+    The GET response also carries ContentType and LastModified, so the result can stand
+    in for a HEAD request.
+    """
+    if size == 0:
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+        return _metadata(response, 'empty')
+
+    response = s3_client.get_object(Bucket=bucket, Key=key, Range=f'bytes=0-{SNIFF_BYTES - 1}')
+    buffer = _sniff_buffer()
+    length = _read_into(response['Body'], buffer)
+
+    return _metadata(response, detect_type(memoryview(buffer)[:length]))
+
+
+def detect_type(data):
+    """Classify a byte prefix by its magic number, falling back to text/binary."""
+    data = bytes(data)
+    if not data:
+        return 'empty'
+
+    for offset, signature, detected_type in MAGIC_SIGNATURES:
+        if data[offset:offset + len(signature)] == signature:
+            if detected_type == 'zip' and b'[Content_Types].xml' in data:
+                return 'ooxml'
+            return detected_type
+
+    if data[:4] == b'RIFF' and data[8:12] in RIFF_TYPES:
+        return RIFF_TYPES[data[8:12]]
+
+    if data[4:8] == b'ftyp':
+        return FTYP_BRANDS.get(data[8:12], 'mp4')
+
+    return _detect_text_type(data)
+
+
+def _detect_text_type(data):
+    if b'\x00' in data:
+        return 'binary'
+
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # The prefix may end in the middle of a multi-byte character
+        if e.start < len(data) - 3:
+            return 'binary'
+        text = data[:e.start].decode('utf-8')
+
+    stripped = text.lstrip('﻿ \t\r\n')
+    lowered = stripped[:64].lower()
+
+    if lowered.startswith('<?xml'):
+        return 'svg' if '<svg' in stripped.lower() else 'xml'
+    if lowered.startswith('<!doctype html') or lowered.startswith('<html'):
+        return 'html'
+    if stripped.startswith('{') or stripped.startswith('['):
+        return 'json'
+
+    return 'text'
+
+
+def _sniff_buffer():
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None or len(buffer) != SNIFF_BYTES:
+        buffer = _local.buffer = bytearray(SNIFF_BYTES)
+    return buffer
+
+
+def _read_into(body, buffer):
+    # Read straight into the reusable buffer when the underlying stream supports it
+    view = memoryview(buffer)
+    readinto = getattr(getattr(body, '_raw_stream', None), 'readinto', None)
+    total = 0
+
+    try:
+        while total < len(buffer):
+            if readinto is not None:
+                read = readinto(view[total:])
+            else:
+                chunk = body.read(len(buffer) - total)
+                read = len(chunk)
+                view[total:total + read] = chunk
+            if not read:
+                break
+            total += read
+    finally:
+        body.close()
+
+    return total
+
+
+def _metadata(response, detected_type):
+    return {
+        'content_type': response.get('ContentType', 'application/octet-stream'),
+        'last_modified': response.get('LastModified'),
+        'detected_type': detected_type
+    }
@@ -0,0 +1,189 @@
+import codecs
+import csv
+import json
+import os
+import time
+import zlib
+
+# Bytes read from S3 per chunk; together with the line limit this bounds memory per object
+READ_CHUNK_BYTES = int(os.environ.get('ANALYZE_CHUNK_BYTES', str(1024 * 1024)))
+# Stop after this many (compressed) bytes; the stack sizes it per performance profile
+MAX_ANALYZED_BYTES = int(os.environ.get('ANALYZE_MAX_BYTES', str(512 * 1024 * 1024)))
+# A single line longer than this ends the analysis; buffering it would be unbounded
+MAX_LINE_BYTES = 1024 * 1024
+# Columns tracked for the null-rate sketch; wider files only count rows
+MAX_COLUMNS = 1024
+
+NULL_VALUES = {'', 'null', 'NULL', 'None', 'NA', 'N/A', 'NaN'}
+ANALYZED_FORMATS = {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}
+
+
+class LineTooLongError(Exception):
+    pass
+
+
+def content_format(key):
+    """Return ('csv' | 'jsonl', compressed) for keys worth analyzing, or None."""
+    name = key.lower()
+    compressed = name.endswith('.gz')
+    if compressed:
+        name = name[:-3]
+    extension = name.rsplit('.', 1)[-1] if '.' in name else ''
+    data_format = ANALYZED_FORMATS.get(extension)
+    return (data_format, compressed) if data_format else None
+
+
+def analyze_object(s3_client, bucket, key, deadline=None):
+    """Stream an object once and compute row count, column count and null rates in constant memory.
+
+    The scan stops, with `truncated` set, at MAX_ANALYZED_BYTES or once time.monotonic()
+    reaches `deadline`, so one large file can't exhaust the invocation.
+    """
+    data_format, compressed = content_format(key)
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    stats = ColumnStats()
+    body = response['Body']
+    try:
+        lines = _lines(_chunks(body, compressed, stats, deadline))
+        if data_format == 'csv':
+            _analyze_csv(lines, stats)
+        else:
+            _analyze_jsonl(lines, stats)
+    except LineTooLongError:
+        stats.complete = False
+    finally:
+        body.close()
+
+    return stats.summary()
+
+
+class ColumnStats:
+    def __init__(self):
+        self.rows = 0
+        self.columns = []
+        self._positions = {}
+        self.null_counts = []
+        self.analyzed_bytes = 0
+        self.complete = True
+        # Stopped at the byte limit or the deadline rather than at the end of the object
+        self.truncated = False
+
+    def column(self, name):
+        position = self._positions.get(name)
+        if position is None and len(self.columns) < MAX_COLUMNS:
+            position = self._positions[name] = len(self.columns)
+            self.columns.append(name)
+            # Rows seen before the column first appeared didn't have it
+            self.null_counts.append(self.rows)
+        return position
+
+    def summary(self):
+        cells = self.rows * len(self.columns)
+        null_rates = [nulls / self.rows for nulls in self.null_counts] if self.rows else []
+        return {
+            'row_count': self.rows,
+            'column_count': len(self.columns),
+            'null_rate': round(sum(self.null_counts) / cells, 6) if cells else 0.0,
+            'max_column_null_rate': round(max(null_rates), 6) if null_rates else 0.0,
+            'columns_with_nulls': sum(1 for nulls in self.null_counts if nulls),
+            'analyzed_bytes': self.analyzed_bytes,
+            'complete': self.complete,
+            'truncated': self.truncated
+        }
+
+
+def _chunks(body, compressed, stats, deadline=None):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+    while stats.analyzed_bytes < MAX_ANALYZED_BYTES:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        chunk = body.read(READ_CHUNK_BYTES)
+        if not chunk:
+            if decompressor is not None:
+                yield decompressor.flush()
+            return
+        stats.analyzed_bytes += len(chunk)
+        if decompressor is None:
+            yield chunk
+            continue
+        # Bound the decompressed output per step so a small, highly compressed chunk can't blow up
+        data = decompressor.decompress(chunk, READ_CHUNK_BYTES)
+        while True:
+            if data:
+                yield data
+            if decompressor.unconsumed_tail:
+                data = decompressor.decompress(decompressor.unconsumed_tail, READ_CHUNK_BYTES)
+            elif decompressor.eof and decompressor.unused_data:
+                # Concatenated gzip members, e.g. from appending to a .gz file
+                rest = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                data = decompressor.decompress(rest, READ_CHUNK_BYTES)
+            else:
+                break
+    stats.complete = False
+    stats.truncated = True
+
+
+def _lines(chunks):
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+    for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        lines = text.split('\n')
+        pending = lines.pop()
+        if len(pending) > MAX_LINE_BYTES:
+            raise LineTooLongError()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def _analyze_csv(lines, stats):
+    # csv.reader joins quoted fields that span lines itself
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    positions = [stats.column(name) for name in header]
+
+    for row in reader:
+        if not row:
+            continue
+        stats.rows += 1
+        for position, value in zip(positions, row):
+            if position is not None and value.strip() in NULL_VALUES:
+                stats.null_counts[position] += 1
+        # Short rows are missing their trailing values
+        for position in positions[len(row):]:
+            if position is not None:
+                stats.null_counts[position] += 1
+
+
+def _analyze_jsonl(lines, stats):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(item, dict):
+            stats.rows += 1
+            continue
+
+        seen = set()
+        for name, value in item.items():
+            position = stats.column(name)
+            if position is None:
+                continue
+            seen.add(position)
+            if value is None:
+                stats.null_counts[position] += 1
+        stats.rows += 1
+        # Keys missing from this row count as nulls
+        for position in range(len(stats.columns)):
+            if position not in seen:
+                stats.null_counts[position] += 1
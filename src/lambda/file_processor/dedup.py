@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from redis_cache import KEY_PREFIX, get_redis
+
+logger = logging.getLogger()
+
+# Events remembered per container; the cache survives across warm invocations
+DEDUP_CACHE_SIZE = int(os.environ.get('DEDUP_CACHE_SIZE', '10000'))
+# How long processed events are remembered in Redis
+DEDUP_TTL_SECONDS = int(os.environ.get('DEDUP_TTL_SECONDS', '86400'))
+# How long an in-progress claim blocks copies of the same event on other containers. The stack sets
+# it just above the Lambda timeout and below the queue's visibility timeout, so a claim left behind
+# by an invocation that timed out or crashed is gone by the time SQS redelivers its messages.
+DEDUP_CLAIM_SECONDS = int(os.environ.get('DEDUP_CLAIM_SECONDS', '90'))
+
+SEEN_KEY_PREFIX = f'{KEY_PREFIX}:seen'
+
+
+def event_key(s3_record):
+    """Identify one S3 notification, or return None when it carries nothing unique to key on.
+
+    The sequencer orders events for the same key and the version id names the object version,
+    so redelivered copies share this key while a later upload to the same key does not.
+    """
+    s3_object = s3_record['s3']['object']
+    version_id = s3_object.get('versionId')
+    sequencer = s3_object.get('sequencer')
+    if not version_id and not sequencer:
+        return None
+    return f"{s3_record['s3']['bucket']['name']}/{s3_object['key']}/{version_id or ''}/{sequencer or ''}"
+
+
+class EventDeduplicator:
+    """Drops S3 events that were already processed, before any HEAD request or write.
+
+    Events are claimed before processing and only remembered as processed once their
+    records were written, so a failed message is not mistaken for a duplicate when SQS
+    redelivers it. With Redis configured, claims are shared by all concurrent Lambdas
+    (SET NX); without it only this container's LRU is consulted.
+    """
+
+    def __init__(self, max_entries=DEDUP_CACHE_SIZE, client_factory=get_redis, claim_seconds=DEDUP_CLAIM_SECONDS):
+        self.max_entries = max_entries
+        self.client_factory = client_factory
+        self.claim_seconds = claim_seconds
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, s3_records):
+        """Return the (message_id, s3_record) pairs to process and the number of duplicates dropped."""
+        kept = []
+        keys = []
+        batch_keys = set()
+        with self._lock:
+            for message_id, s3_record in s3_records:
+                key = event_key(s3_record)
+                if key is not None and (key in self._seen or key in batch_keys):
+                    if key in self._seen:
+                        self._seen.move_to_end(key)
+                    continue
+                if key is not None:
+                    batch_keys.add(key)
+                kept.append((message_id, s3_record))
+                keys.append(key)
+
+        claimed = self._claim_shared(keys)
+        kept = [pair for pair, is_claimed in zip(kept, claimed) if is_claimed]
+        return kept, len(s3_records) - len(kept)
+
+    def commit(self, s3_records):
+        """Remember successfully written events."""
+        keys = [key for key in map(event_key, s3_records) if key is not None]
+        if not keys:
+            return
+
+        with self._lock:
+            for key in keys:
+                self._seen[key] = True
+                self._seen.move_to_end(key)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+
+        self._update_shared(keys, processed=True)
+
+    def release(self, s3_records):
+        """Give up the claims of events that failed so their redelivery is processed."""
+        keys = [key for key in map(event_key, s3_records) if key is not None]
+        if keys:
+            self._update_shared(keys, processed=False)
+
+    def _claim_shared(self, keys):
+        client = self.client_factory()
+        if client is None or not any(keys):
+            return [True] * len(keys)
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key in keys:
+                if key is not None:
+                    pipeline.set(f'{SEEN_KEY_PREFIX}:{key}', 'claimed', nx=True, ex=self.claim_seconds)
+            results = iter(pipeline.execute())
+            return [True if key is None else bool(next(results)) for key in keys]
+        except Exception as e:
+            # Processing a duplicate is better than dropping an event
+            logger.error(f"Error claiming events in Redis: {str(e)}")
+            return [True] * len(keys)
+
+    def _update_shared(self, keys, processed):
+        client = self.client_factory()
+        if client is None:
+            return
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key in keys:
+                if processed:
+                    pipeline.set(f'{SEEN_KEY_PREFIX}:{key}', 'processed', ex=DEDUP_TTL_SECONDS)
+                else:
+                    pipeline.delete(f'{SEEN_KEY_PREFIX}:{key}')
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Error updating processed events in Redis: {str(e)}")
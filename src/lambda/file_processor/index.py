@@ -1,129 +1,500 @@
 import json
 import logging
+import mimetypes
 import os
-import boto3
+import random
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from batch_writer import TimestreamBatchWriter
+from clients import get_client
+from content_sniffer import sniff_object
+from content_stats import analyze_object, content_format
+from dedup import EventDeduplicator
+from metrics import MetricsLogger
+from redis_cache import record_files
+from zip_inspector import inspect_zip
+
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize clients
-s3_client = boto3.client('s3')
-timestream_client = boto3.client('timestream-write')
-
 # Get environment variables
 DB_NAME = os.environ.get('TIMESTREAM_DB_NAME')
 TABLE_NAME = os.environ.get('TIMESTREAM_TABLE_NAME')
+# '1' writes a file_size record per file (key as a dimension),
+# '2' writes one multi-measure file_event record per file with the key as the object_key measure.
+# Per-extension counts come from the rollup table's scheduled query over either layout.
+SCHEMA_VERSION = os.environ.get('TIMESTREAM_SCHEMA_VERSION', '1')
+# Skip HEAD requests and take metadata from the event itself
+TRUST_EVENT_METADATA = os.environ.get('TRUST_EVENT_METADATA', 'false').lower() == 'true'
+# Detect the real file type from the first bytes of each object (replaces the HEAD request)
+SNIFF_CONTENT = os.environ.get('SNIFF_CONTENT', 'false').lower() == 'true'
+# Count the members of zip uploads by extension, reading only the central directory
+INSPECT_ARCHIVES = os.environ.get('INSPECT_ARCHIVES', 'false').lower() == 'true'
+# Stream CSV / JSON-lines uploads (optionally gzipped) once to record row, column and null statistics
+ANALYZE_CONTENT = os.environ.get('ANALYZE_CONTENT', 'false').lower() == 'true'
+# Content analysis stops this long before the invocation's timeout, leaving time to write the batch
+ANALYZE_TIME_MARGIN_SECONDS = float(os.environ.get('ANALYZE_TIME_MARGIN_SECONDS', '10'))
+# Upper bound on concurrent metadata requests per invocation
+HEAD_CONCURRENCY = int(os.environ.get('HEAD_CONCURRENCY', '16'))
+# Fraction of invocations whose full event payload is logged at INFO (the rest only at DEBUG)
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', '0'))
+
+# Value of the 'origin' dimension on every record; queries of recent activity exclude backfills,
+# which are written at load time but describe objects uploaded long before. File type totals
+# count both.
+ORIGIN_LIVE = 'live'
+ORIGIN_BACKFILL = 'backfill'
+
+# Clients are created on first use, see get_s3_client / get_timestream_client
+s3_client = None
+timestream_client = None
+
+# Remembers processed S3 events so redelivered notifications are dropped early
+deduplicator = EventDeduplicator()
+
+# Per-stage timings and counts, emitted once per invocation as CloudWatch EMF
+metrics = MetricsLogger(dimensions={'Function': os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'file-processor')})
 
 
 def handler(event, context):
-    logger.info(f"Received event: {json.dumps(event)}")
+    try:
+        with metrics.timer('Invocation'):
+            return process_batch(event, deadline=analysis_deadline(context))
+    finally:
+        metrics.flush()
+
+
+def analysis_deadline(context):
+    """Return the time.monotonic() value at which content analysis must stop, or None without a context."""
+    if context is None:
+        return None
+    return time.monotonic() + context.get_remaining_time_in_millis() / 1000 - ANALYZE_TIME_MARGIN_SECONDS
+
+
+def process_batch(event, deadline=None):
+    log_payload = random.random() < LOG_PAYLOAD_SAMPLE_RATE
+    if log_payload or logger.isEnabledFor(logging.DEBUG):
+        logger.log(logging.INFO if log_payload else logging.DEBUG, f"Received event: {json.dumps(event)}")
+
+    # Buffer Timestream records for the whole invocation and write them in bulk at the end
+    writer = TimestreamBatchWriter(get_timestream_client(), DB_NAME, metrics=metrics)
 
-    # Process each SQS message
+    # Track failures per message so SQS only redelivers the messages that actually failed
+    message_ids = []
+    failed_message_ids = set()
+
+    # Collect the S3 records of every SQS message first so metadata can be fetched in one go
+    s3_records = []
     for record in event['Records']:
-        # Get the S3 event data from SQS message
-        body = json.loads(record['body'])
-        logger.info(f"Processing message: {json.dumps(body)}")
+        message_id = record['messageId']
+        message_ids.append(message_id)
+
+        try:
+            # Get the S3 event data from SQS message
+            body = json.loads(record['body'])
+
+            # Extract S3 details
+            for s3_record in body.get('Records', []):
+                s3_records.append((message_id, s3_record))
+        except Exception as e:
+            logger.error(f"Error parsing message {message_id}: {str(e)}")
+            failed_message_ids.add(message_id)
+
+    metrics.add_count('Messages', len(message_ids))
+    metrics.add_count('S3Records', len(s3_records))
+
+    # Skip events that were already processed before paying for a HEAD request or a write
+    s3_records, duplicates = deduplicator.claim(
+        [(message_id, s3_record) for message_id, s3_record in s3_records if message_id not in failed_message_ids]
+    )
+    metrics.add_count('DuplicatesSuppressed', duplicates)
+
+    with metrics.timer('FetchMetadata'):
+        metadata = fetch_metadata([s3_record for _, s3_record in s3_records])
+
+    if ANALYZE_CONTENT:
+        with metrics.timer('AnalyzeContent'):
+            add_content_stats([s3_record for _, s3_record in s3_records], metadata, deadline=deadline)
+
+    if INSPECT_ARCHIVES:
+        with metrics.timer('InspectArchives'):
+            add_archive_summaries([s3_record for _, s3_record in s3_records], metadata)
+
+    processed_files = []
+    for (message_id, s3_record), object_metadata in zip(s3_records, metadata):
+        if message_id in failed_message_ids:
+            continue
+
+        try:
+            processed_files.append(
+                (message_id, process_s3_event(s3_record, writer, message_id, metadata=object_metadata))
+            )
+        except Exception as e:
+            logger.error(f"Error processing message {message_id}: {str(e)}")
+            failed_message_ids.add(message_id)
+            # Don't write half of a failed message; it will be retried as a whole
+            writer.discard(message_id)
+
+    with metrics.timer('Flush'):
+        failed_message_ids.update(writer.flush())
+
+    metrics.add_count('FailedMessages', len(failed_message_ids))
 
-        # Extract S3 details
-        if 'Records' in body:
-            for s3_record in body['Records']:
-                process_s3_event(s3_record)
+    deduplicator.commit([s3_record for message_id, s3_record in s3_records if message_id not in failed_message_ids])
+    deduplicator.release([s3_record for message_id, s3_record in s3_records if message_id in failed_message_ids])
+
+    # Live dashboard data; failed messages are left out since they will be retried
+    update_live_cache([item for message_id, item in processed_files if message_id not in failed_message_ids])
+
+    if failed_message_ids:
+        logger.warning(f"{len(failed_message_ids)} of {len(message_ids)} messages failed")
+
+    return {
+        'batchItemFailures': [
+            {'itemIdentifier': message_id}
+            for message_id in message_ids if message_id in failed_message_ids
+        ]
+    }
+
+
+def update_live_cache(files, recent=True):
+    try:
+        with metrics.timer('CacheUpdate'):
+            record_files(files, recent=recent)
+    except Exception as e:
+        # The cache is an accelerator only; Timestream stays the source of truth
+        logger.error(f"Error updating Redis cache: {str(e)}")
+        metrics.add_count('CacheUpdateErrors', 1)
+
+
+def get_s3_client():
+    global s3_client
+    if s3_client is None:
+        s3_client = get_client('s3')
+    return s3_client
+
+
+def get_timestream_client():
+    global timestream_client
+    if timestream_client is None:
+        timestream_client = get_client('timestream-write')
+    return timestream_client
+
+
+def fetch_metadata(s3_records):
+    """Return metadata (or the exception raised fetching it) for each record, in order."""
+    if TRUST_EVENT_METADATA and not SNIFF_CONTENT:
+        return [metadata_from_event(s3_record) for s3_record in s3_records]
+
+    if len(s3_records) <= 1:
+        return [_fetch_or_error(s3_record) for s3_record in s3_records]
+
+    with ThreadPoolExecutor(max_workers=min(HEAD_CONCURRENCY, len(s3_records))) as executor:
+        return list(executor.map(_fetch_or_error, s3_records))
+
+
+def metadata_from_event(s3_record):
+    # Fast path: no HEAD request, content type is inferred from the key's extension
+    key = s3_record['s3']['object']['key']
+    content_type, _ = mimetypes.guess_type(key)
+    event_time = s3_record.get('eventTime')
 
     return {
-        'statusCode': 200,
-        'body': json.dumps('Processing complete')
+        'content_type': content_type or 'application/octet-stream',
+        'last_modified': datetime.strptime(event_time, '%Y-%m-%dT%H:%M:%S.%fZ') if event_time else datetime.now()
     }
 
 
-def process_s3_event(s3_record):
+def head_metadata(bucket, key):
+    with metrics.timer('HeadObject'):
+        response = get_s3_client().head_object(Bucket=bucket, Key=key)
+    metrics.add_count('HeadObjectRetries', response.get('ResponseMetadata', {}).get('RetryAttempts', 0))
+
+    return {
+        'content_type': response.get('ContentType', 'application/octet-stream'),
+        'last_modified': response.get('LastModified', datetime.now())
+    }
+
+
+def object_metadata(bucket, key, size=None):
+    if SNIFF_CONTENT:
+        with metrics.timer('SniffObject'):
+            metadata = sniff_object(get_s3_client(), bucket, key, size)
+        if metadata['last_modified'] is None:
+            metadata['last_modified'] = datetime.now()
+        return metadata
+
+    return head_metadata(bucket, key)
+
+
+def _fetch_or_error(s3_record):
+    try:
+        return object_metadata(s3_record['s3']['bucket']['name'],
+                               s3_record['s3']['object']['key'],
+                               s3_record['s3']['object'].get('size'))
+    except Exception as e:
+        return e
+
+
+def process_s3_event(s3_record, writer, message_id=None, metadata=None, origin=ORIGIN_LIVE):
     # Extract key information
     bucket = s3_record['s3']['bucket']['name']
     key = s3_record['s3']['object']['key']
     size = s3_record['s3']['object'].get('size', 0)
 
-    logger.info(f"Processing file: s3://{bucket}/{key}, Size: {size} bytes")
+    logger.debug(f"Processing file: s3://{bucket}/{key}, Size: {size} bytes")
 
     try:
-        # Get file metadata
-        response = s3_client.head_object(Bucket=bucket, Key=key)
-        content_type = response.get('ContentType', 'application/octet-stream')
-        last_modified = response.get('LastModified', datetime.now())
+        # Get file metadata unless it was already fetched for the whole batch
+        if metadata is None:
+            metadata = object_metadata(bucket, key, size)
+        if isinstance(metadata, Exception):
+            raise metadata
+
+        content_type = metadata['content_type']
+        last_modified = metadata['last_modified']
+        detected_type = metadata.get('detected_type')
+        content_stats = metadata.get('content_stats')
 
         # Extract file extension
-        file_extension = key.split('.')[-1].lower() if '.' in key else 'unknown'
+        file_extension = file_extension_of(key)
+
+        # Write to Timestream; the record's time doubles as the live cache timestamp
+        timestamp = write_to_timestream(writer, bucket, key, size, content_type, file_extension, last_modified,
+                                        source=message_id, detected_type=detected_type,
+                                        content_stats=content_stats, origin=origin)
+
+        if INSPECT_ARCHIVES and size and is_archive(file_extension, detected_type):
+            # Batches inspect their archives in parallel up front (add_archive_summaries)
+            if 'archive_summary' in metadata:
+                summary = metadata['archive_summary']
+            else:
+                summary = read_archive_summary(bucket, key, size)
+            if summary is not None:
+                write_archive_members(writer, bucket, key, summary, source=message_id, origin=origin)
 
-        # Write to Timestream
-        write_to_timestream(bucket, key, size, content_type, file_extension, last_modified)
+        metrics.add_count('BytesProcessed', size, 'Bytes')
+        logger.debug(f"File processed successfully: {key}")
 
-        logger.info(f"File processed successfully: {key}")
+        return {
+            'key': key,
+            'size': size,
+            'file_extension': file_extension,
+            'timestamp': timestamp
+        }
 
     except Exception as e:
         logger.error(f"Error processing file {key}: {str(e)}")
         raise
 
 
-def write_to_timestream(bucket, key, size, content_type, file_extension, last_modified):
+def write_to_timestream(writer, bucket, key, size, content_type, file_extension, last_modified, source=None,
+                        detected_type=None, content_stats=None, origin=ORIGIN_LIVE):
+    """Queue the records for one file and return their time, formatted the way Timestream returns it."""
+    if SCHEMA_VERSION == '2':
+        return write_file_event(writer, bucket, key, size, content_type, file_extension, source=source,
+                                detected_type=detected_type, content_stats=content_stats, origin=origin)
+
+    # Records are only queued here; the writer sends them when the handler flushes
     current_time = int(datetime.utcnow().timestamp() * 1000)  # Current time in milliseconds
 
-    try:
-        # Prepare dimensions (metadata)
-        dimensions = [
-            {'Name': 'bucket', 'Value': bucket},
-            {'Name': 'key', 'Value': key},
-            {'Name': 'content_type', 'Value': content_type},
-            {'Name': 'file_extension', 'Value': file_extension}
-        ]
+    # Prepare dimensions (metadata)
+    dimensions = [
+        {'Name': 'bucket', 'Value': bucket},
+        {'Name': 'key', 'Value': key},
+        {'Name': 'content_type', 'Value': content_type},
+        {'Name': 'file_extension', 'Value': file_extension},
+        {'Name': 'origin', 'Value': origin}
+    ]
+    if detected_type:
+        dimensions.append({'Name': 'detected_type', 'Value': detected_type})
 
-        # Prepare record values
-        records = [
-            {
-                'Dimensions': dimensions,
-                'MeasureName': 'file_size',
-                'MeasureValue': str(size),
-                'MeasureValueType': 'BIGINT',
-                'Time': str(current_time)
-            }
-        ]
+    writer.add(TABLE_NAME, {
+        'Dimensions': dimensions,
+        'MeasureName': 'file_size',
+        'MeasureValue': str(size),
+        'MeasureValueType': 'BIGINT',
+        'Time': str(current_time)
+    }, source=source)
 
-        # Write to Timestream
-        response = timestream_client.write_records(
-            DatabaseName=DB_NAME,
-            TableName=TABLE_NAME,
-            Records=records,
-            CommonAttributes={
-                'TimeUnit': 'MILLISECONDS'
-            }
-        )
-
-        logger.info(f"Successfully wrote to Timestream: {response}")
-
-        # Also write a record for file type counting
-        file_type_dimensions = [
-            {'Name': 'file_extension', 'Value': file_extension}
-        ]
+    if content_stats:
+        # Same series and time as file_size, so the statistics join on key and time
+        writer.add(TABLE_NAME, {
+            'Dimensions': dimensions,
+            'MeasureName': 'content_stats',
+            'MeasureValueType': 'MULTI',
+            'MeasureValues': content_stats_measures(content_stats),
+            'Time': str(current_time)
+        }, source=source)
+
+    return format_time_ns(current_time * 1000000)
+
+
+def add_content_stats(s3_records, metadata, deadline=None):
+    """Analyze the data files of a batch in parallel and attach the results to their metadata.
+
+    Files still queued when `deadline` passes are recorded without statistics.
+    """
+    indexes = [
+        i for i, s3_record in enumerate(s3_records)
+        if not isinstance(metadata[i], Exception) and s3_record['s3']['object'].get('size')
+        and content_format(s3_record['s3']['object']['key'])
+    ]
+    if not indexes:
+        return
+
+    def analyze(i):
+        s3_object = s3_records[i]['s3']
+        if deadline is not None and time.monotonic() >= deadline:
+            metrics.add_count('ContentAnalysisSkipped', 1)
+            return None
+        try:
+            return analyze_object(get_s3_client(), s3_object['bucket']['name'], s3_object['object']['key'],
+                                  deadline=deadline)
+        except Exception as e:
+            # The file is still recorded, just without content statistics
+            logger.warning(f"Error analyzing {s3_object['object']['key']}: {str(e)}")
+            metrics.add_count('ContentAnalysisErrors', 1)
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(HEAD_CONCURRENCY, len(indexes))) as executor:
+        for i, content_stats in zip(indexes, executor.map(analyze, indexes)):
+            if content_stats is not None:
+                metadata[i] = dict(metadata[i], content_stats=content_stats)
+                metrics.add_count('RowsAnalyzed', content_stats['row_count'])
+                if content_stats['truncated']:
+                    metrics.add_count('ContentAnalysisTruncated', 1)
 
-        file_type_records = [
-            {
-                'Dimensions': file_type_dimensions,
-                'MeasureName': 'file_count',
-                'MeasureValue': '1',
-                'MeasureValueType': 'BIGINT',
-                'Time': str(current_time)
-            }
-        ]
 
-        timestream_client.write_records(
-            DatabaseName=DB_NAME,
-            TableName='file_types',  # Use the file types table
-            Records=file_type_records,
-            CommonAttributes={
-                'TimeUnit': 'MILLISECONDS'
-            }
-        )
+def content_stats_measures(content_stats):
+    return [
+        {'Name': 'row_count', 'Value': str(content_stats['row_count']), 'Type': 'BIGINT'},
+        {'Name': 'column_count', 'Value': str(content_stats['column_count']), 'Type': 'BIGINT'},
+        {'Name': 'null_rate', 'Value': str(content_stats['null_rate']), 'Type': 'DOUBLE'},
+        {'Name': 'max_column_null_rate', 'Value': str(content_stats['max_column_null_rate']), 'Type': 'DOUBLE'},
+        {'Name': 'columns_with_nulls', 'Value': str(content_stats['columns_with_nulls']), 'Type': 'BIGINT'},
+        {'Name': 'stats_complete', 'Value': str(content_stats['complete']).lower(), 'Type': 'BOOLEAN'}
+    ]
 
+
+def file_extension_of(key):
+    return key.split('.')[-1].lower() if '.' in key else 'unknown'
+
+
+def is_archive(file_extension, detected_type=None):
+    return file_extension == 'zip' or detected_type == 'zip'
+
+
+def add_archive_summaries(s3_records, metadata):
+    """Read the central directories of a batch's zip uploads in parallel and attach them to their metadata.
+
+    Each inspection takes several ranged GETs, so archives are read side by side rather than
+    one after another while the records are built.
+    """
+    indexes = []
+    for i, s3_record in enumerate(s3_records):
+        s3_object = s3_record['s3']['object']
+        if isinstance(metadata[i], Exception) or not s3_object.get('size'):
+            continue
+        if is_archive(file_extension_of(s3_object['key']), metadata[i].get('detected_type')):
+            indexes.append(i)
+    if not indexes:
+        return
+
+    def inspect(i):
+        s3_object = s3_records[i]['s3']
+        return read_archive_summary(s3_object['bucket']['name'], s3_object['object']['key'],
+                                    s3_object['object']['size'])
+
+    with ThreadPoolExecutor(max_workers=min(HEAD_CONCURRENCY, len(indexes))) as executor:
+        for i, summary in zip(indexes, executor.map(inspect, indexes)):
+            # None (a failed inspection) is kept too, so the archive isn't read again
+            metadata[i] = dict(metadata[i], archive_summary=summary)
+
+
+def read_archive_summary(bucket, key, size):
+    try:
+        with metrics.timer('InspectArchive'):
+            return inspect_zip(get_s3_client(), bucket, key, size)
     except Exception as e:
-        logger.error(f"Error writing to Timestream: {str(e)}")
-        raise
\ No newline at end of file
+        # The archive itself is still recorded; only the member breakdown is missing
+        logger.warning(f"Error inspecting archive {key}: {str(e)}")
+        metrics.add_count('ArchiveInspectionErrors', 1)
+        return None
+
+
+def write_archive_members(writer, bucket, key, summary, source=None, origin=ORIGIN_LIVE):
+    metrics.add_count('ArchiveMembers', summary['members'])
+    for extension, stats in summary['extensions'].items():
+        writer.add(TABLE_NAME, {
+            'Dimensions': [
+                {'Name': 'bucket', 'Value': bucket},
+                {'Name': 'file_extension', 'Value': extension},
+                {'Name': 'container_extension', 'Value': 'zip'},
+                {'Name': 'origin', 'Value': origin}
+            ],
+            'MeasureName': 'archive_members',
+            'MeasureValueType': 'MULTI',
+            'MeasureValues': [
+                {'Name': 'archive_key', 'Value': key, 'Type': 'VARCHAR'},
+                {'Name': 'member_count', 'Value': str(stats['count']), 'Type': 'BIGINT'},
+                {'Name': 'uncompressed_bytes', 'Value': str(stats['uncompressed_bytes']), 'Type': 'BIGINT'}
+            ],
+            'Time': str(unique_time_ns()),
+            'TimeUnit': 'NANOSECONDS'
+        }, source=source)
+
+
+def write_file_event(writer, bucket, key, size, content_type, file_extension, source=None, detected_type=None,
+                     content_stats=None, origin=ORIGIN_LIVE):
+    # Only low-cardinality values are dimensions, so all files of one type share a time series
+    dimensions = [
+        {'Name': 'bucket', 'Value': bucket},
+        {'Name': 'file_extension', 'Value': file_extension},
+        {'Name': 'origin', 'Value': origin}
+    ]
+    if detected_type:
+        dimensions.append({'Name': 'detected_type', 'Value': detected_type})
+
+    time_ns = unique_time_ns()
+    writer.add(TABLE_NAME, {
+        'Dimensions': dimensions,
+        'MeasureName': 'file_event',
+        'MeasureValueType': 'MULTI',
+        # Both layouts share the events table, where a measure may not reuse the name of a
+        # schema 1 dimension, hence object_key and object_content_type
+        'MeasureValues': [
+            {'Name': 'object_key', 'Value': key, 'Type': 'VARCHAR'},
+            {'Name': 'size', 'Value': str(size), 'Type': 'BIGINT'},
+            {'Name': 'file_count', 'Value': '1', 'Type': 'BIGINT'},
+            {'Name': 'object_content_type', 'Value': content_type, 'Type': 'VARCHAR'}
+        ] + (content_stats_measures(content_stats) if content_stats else []),
+        # Without key in the dimensions, records in one series must not share a timestamp
+        'Time': str(time_ns),
+        'TimeUnit': 'NANOSECONDS'
+    }, source=source)
+
+    return format_time_ns(time_ns)
+
+
+_last_time_ns = 0
+_time_lock = threading.Lock()
+
+
+def unique_time_ns():
+    """Return the current time in nanoseconds, strictly increasing within this process."""
+    global _last_time_ns
+    with _time_lock:
+        _last_time_ns = max(time.time_ns(), _last_time_ns + 1)
+        return _last_time_ns
+
+
+def format_time_ns(time_ns):
+    # Timestream's own timestamp format, so cached files page and compare like queried ones
+    seconds, nanoseconds = divmod(time_ns, 1000000000)
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(seconds)) + f'.{nanoseconds:09d}'
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'FileProcessing')
+
+# CloudWatch accepts at most 100 values per metric in one EMF document
+MAX_VALUES_PER_METRIC = 100
+
+
+class MetricsLogger:
+    """Collects metrics for one invocation and prints them as CloudWatch Embedded Metric Format.
+
+    CloudWatch extracts the metrics from the log line, so no PutMetricData calls are made.
+    Safe to use from the metadata thread pool.
+    """
+
+    def __init__(self, namespace=NAMESPACE, dimensions=None):
+        self.namespace = namespace
+        self.dimensions = dimensions or {}
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._counters = {}
+        self._properties = {}
+
+    def put_metric(self, name, value, unit='Count'):
+        """Record one sample; every sample is kept so CloudWatch can compute percentiles."""
+        with self._lock:
+            self._metrics.setdefault(name, (unit, []))[1].append(value)
+
+    def add_count(self, name, value=1, unit='Count'):
+        """Add to a total that is emitted as a single value per flush."""
+        with self._lock:
+            previous = self._counters.get(name, (unit, 0))[1]
+            self._counters[name] = (unit, previous + value)
+
+    def set_property(self, name, value):
+        with self._lock:
+            self._properties[name] = value
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put_metric(f"{stage}Duration", round((time.perf_counter() - started) * 1000, 3), 'Milliseconds')
+
+    def flush(self):
+        with self._lock:
+            metrics, self._metrics = self._metrics, {}
+            counters, self._counters = self._counters, {}
+            properties, self._properties = self._properties, {}
+
+        for name, (unit, total) in counters.items():
+            metrics[name] = (unit, [total])
+
+        if not metrics:
+            return
+
+        # Split metrics with many values across several documents
+        rounds = max(len(values) for _, values in metrics.values())
+        for start in range(0, rounds, MAX_VALUES_PER_METRIC):
+            document = dict(properties)
+            document.update(self.dimensions)
+            definitions = []
+            for name, (unit, values) in metrics.items():
+                chunk = values[start:start + MAX_VALUES_PER_METRIC]
+                if not chunk:
+                    continue
+                definitions.append({'Name': name, 'Unit': unit})
+                document[name] = chunk if len(chunk) > 1 else chunk[0]
+
+            document['_aws'] = {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [list(self.dimensions)],
+                    'Metrics': definitions
+                }]
+            }
+            # Printed rather than logged so the line is pure JSON for EMF extraction
+            print(json.dumps(document))
@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+
+try:
+    import redis
+except ImportError:  # The cache is optional; without the client the processor only writes Timestream
+    redis = None
+
+logger = logging.getLogger()
+
+REDIS_HOST = os.environ.get('REDIS_HOST')
+REDIS_PORT = int(os.environ.get('REDIS_PORT', '6379'))
+
+# Key layout shared with the backend API (backend-api/src/redis_cache.py)
+KEY_PREFIX = 'file-processing'
+# Hourly hashes (EXTENSION_COUNTS_KEY:<YYYY-MM-DDTHH>) that expire with Timestream's retention,
+# so their sum covers the same window as the rollup table
+EXTENSION_COUNTS_KEY = f'{KEY_PREFIX}:extension-counts'
+# Same layout for the bytes per extension, summed into total_bytes like the rollup table's
+EXTENSION_BYTES_KEY = f'{KEY_PREFIX}:extension-bytes'
+# Time of the oldest file counted since the cache was last empty, e.g. after a node restart.
+# Renamed when the bytes hashes were added, so counts from before then don't count as coverage
+COUNTS_SINCE_KEY = f'{KEY_PREFIX}:counts-with-bytes-since'
+COUNT_WINDOW_HOURS = 7 * 24
+EXTENSION_LAST_UPDATE_KEY = f'{KEY_PREFIX}:extension-last-update'
+RECENT_FILES_KEY = f'{KEY_PREFIX}:recent-files'
+RECENT_FILES_LIMIT = 1000
+
+_client = None
+
+
+def get_redis():
+    """Return a shared Redis client, or None when no cache is configured."""
+    global _client
+    if _client is None and redis is not None and REDIS_HOST:
+        _client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT,
+                              socket_connect_timeout=1, socket_timeout=1,
+                              health_check_interval=30)
+    return _client
+
+
+def record_files(files, client=None, recent=True):
+    """Update the live per-extension counters and, unless `recent` is False, the recent files ring buffer.
+
+    `files` is a list of dicts with key, size, file_extension and timestamp. Everything is sent
+    in one pipelined round trip; HINCRBY and LPUSH are atomic on the server, so concurrent
+    Lambdas never lose updates.
+    """
+    client = client or get_redis()
+    if client is None or not files:
+        return False
+
+    pipeline = client.pipeline(transaction=False)
+    hour_keys = set()
+    for item in files:
+        hour_counts_key, hour_bytes_key = counts_key(item['timestamp']), bytes_key(item['timestamp'])
+        hour_keys.update((hour_counts_key, hour_bytes_key))
+        pipeline.hincrby(hour_counts_key, item['file_extension'], 1)
+        pipeline.hincrby(hour_bytes_key, item['file_extension'], item['size'])
+        pipeline.hset(EXTENSION_LAST_UPDATE_KEY, item['file_extension'], item['timestamp'])
+    for hour_key in hour_keys:
+        pipeline.expire(hour_key, (COUNT_WINDOW_HOURS + 1) * 3600)
+    pipeline.set(COUNTS_SINCE_KEY, min(item['timestamp'] for item in files), nx=True)
+    if recent:
+        pipeline.lpush(RECENT_FILES_KEY, *[json.dumps(item) for item in files])
+        pipeline.ltrim(RECENT_FILES_KEY, 0, RECENT_FILES_LIMIT - 1)
+    pipeline.execute()
+
+    return True
+
+
+def counts_key(timestamp):
+    # Timestamps look like '2024-01-01 12:00:00.000000000'; the hour selects the hash
+    return f"{EXTENSION_COUNTS_KEY}:{timestamp[:10]}T{timestamp[11:13]}"
+
+
+def bytes_key(timestamp):
+    return f"{EXTENSION_BYTES_KEY}:{timestamp[:10]}T{timestamp[11:13]}"
@@ -0,0 +1,152 @@
+import os
+import struct
+from collections import defaultdict
+
+# The end of central directory record is 22 bytes plus a comment of up to 64 KiB
+EOCD_SEARCH_BYTES = 22 + 0xFFFF
+# Central directory bytes read per chunk; the only buffer that grows with the archive is bounded by this
+READ_CHUNK_BYTES = int(os.environ.get('ARCHIVE_READ_CHUNK_BYTES', str(256 * 1024)))
+# Archives with a larger central directory are skipped rather than read
+MAX_CENTRAL_DIRECTORY_BYTES = int(os.environ.get('ARCHIVE_MAX_DIRECTORY_BYTES', str(64 * 1024 * 1024)))
+# Distinct member extensions kept per archive; the rest are counted as 'other'
+MAX_EXTENSIONS = 100
+
+EOCD_SIGNATURE = b'PK\x05\x06'
+ZIP64_LOCATOR_SIGNATURE = b'PK\x06\x07'
+ZIP64_EOCD_SIGNATURE = b'PK\x06\x06'
+CENTRAL_FILE_SIGNATURE = b'PK\x01\x02'
+CENTRAL_FILE_HEADER_BYTES = 46
+ZIP64_EXTRA_ID = 0x0001
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def inspect_zip(s3_client, bucket, key, size):
+    """Summarize the members of a zip object from its central directory, using range reads only.
+
+    Returns {'members', 'uncompressed_bytes', 'extensions': {ext: {'count', 'uncompressed_bytes'}}}.
+    """
+    tail_start = max(0, size - EOCD_SEARCH_BYTES)
+    tail = _read_range(s3_client, bucket, key, tail_start, size - 1)
+    directory_offset, directory_size = _locate_central_directory(s3_client, bucket, key, tail, tail_start)
+
+    if directory_size > MAX_CENTRAL_DIRECTORY_BYTES:
+        raise ArchiveError(f"Central directory of {directory_size} bytes exceeds {MAX_CENTRAL_DIRECTORY_BYTES}")
+    if directory_offset + directory_size > size:
+        raise ArchiveError("Central directory lies outside the object")
+
+    summary = {'members': 0, 'uncompressed_bytes': 0,
+               'extensions': defaultdict(lambda: {'count': 0, 'uncompressed_bytes': 0})}
+    if directory_size == 0:
+        summary['extensions'] = {}
+        return summary
+
+    response = s3_client.get_object(Bucket=bucket, Key=key,
+                                    Range=f'bytes={directory_offset}-{directory_offset + directory_size - 1}')
+    body = response['Body']
+    buffer = bytearray()
+    try:
+        while True:
+            chunk = body.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            buffer.extend(chunk)
+            consumed = _parse_entries(buffer, summary)
+            del buffer[:consumed]
+    finally:
+        body.close()
+
+    if buffer:
+        raise ArchiveError("Truncated central directory entry")
+
+    summary['extensions'] = dict(summary['extensions'])
+    return summary
+
+
+def member_extension(name):
+    basename = name.rsplit('/', 1)[-1]
+    return basename.rsplit('.', 1)[-1].lower() if '.' in basename else 'unknown'
+
+
+def _read_range(s3_client, bucket, key, start, end):
+    response = s3_client.get_object(Bucket=bucket, Key=key, Range=f'bytes={start}-{end}')
+    body = response['Body']
+    try:
+        return body.read()
+    finally:
+        body.close()
+
+
+def _locate_central_directory(s3_client, bucket, key, tail, tail_start):
+    position = tail.rfind(EOCD_SIGNATURE)
+    if position < 0 or len(tail) - position < 22:
+        raise ArchiveError("No end of central directory record")
+
+    directory_size, directory_offset = struct.unpack_from('<II', tail, position + 12)
+    if directory_size != 0xFFFFFFFF and directory_offset != 0xFFFFFFFF:
+        return directory_offset, directory_size
+
+    # Zip64: the locator right before the EOCD record points at the zip64 EOCD record
+    locator = position - 20
+    if locator < 0 or tail[locator:locator + 4] != ZIP64_LOCATOR_SIGNATURE:
+        raise ArchiveError("Missing zip64 end of central directory locator")
+    record_offset, = struct.unpack_from('<Q', tail, locator + 8)
+
+    if record_offset >= tail_start:
+        record = bytes(tail[record_offset - tail_start:record_offset - tail_start + 56])
+    else:
+        record = _read_range(s3_client, bucket, key, record_offset, record_offset + 55)
+    if record[:4] != ZIP64_EOCD_SIGNATURE:
+        raise ArchiveError("Invalid zip64 end of central directory record")
+
+    directory_size, directory_offset = struct.unpack_from('<QQ', record, 40)
+    return directory_offset, directory_size
+
+
+def _parse_entries(buffer, summary):
+    """Add every complete entry in `buffer` to `summary` and return the number of bytes consumed."""
+    offset = 0
+    while len(buffer) - offset >= CENTRAL_FILE_HEADER_BYTES:
+        if buffer[offset:offset + 4] != CENTRAL_FILE_SIGNATURE:
+            raise ArchiveError(f"Unexpected central directory signature at {offset}")
+
+        uncompressed_size, name_length, extra_length, comment_length = \
+            struct.unpack_from('<4xIHHH', buffer, offset + 20)
+        entry_length = CENTRAL_FILE_HEADER_BYTES + name_length + extra_length + comment_length
+        if len(buffer) - offset < entry_length:
+            break
+
+        name_start = offset + CENTRAL_FILE_HEADER_BYTES
+        name = bytes(buffer[name_start:name_start + name_length]).decode('utf-8', errors='replace')
+        if uncompressed_size == 0xFFFFFFFF:
+            extra = buffer[name_start + name_length:name_start + name_length + extra_length]
+            uncompressed_size = _zip64_uncompressed_size(extra, uncompressed_size)
+
+        if not name.endswith('/'):
+            _add_member(summary, member_extension(name), uncompressed_size)
+        offset += entry_length
+
+    return offset
+
+
+def _zip64_uncompressed_size(extra, default):
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, data_size = struct.unpack_from('<HH', extra, offset)
+        if header_id == ZIP64_EXTRA_ID and data_size >= 8:
+            # The uncompressed size is the first field whenever it overflowed
+            return struct.unpack_from('<Q', extra, offset + 4)[0]
+        offset += 4 + data_size
+    return default
+
+
+def _add_member(summary, extension, uncompressed_size):
+    extensions = summary['extensions']
+    if extension not in extensions and len(extensions) >= MAX_EXTENSIONS:
+        extension = 'other'
+    extensions[extension]['count'] += 1
+    extensions[extension]['uncompressed_bytes'] += uncompressed_size
+    summary['members'] += 1
+    summary['uncompressed_bytes'] += uncompressed_size
@@ -0,0 +1,152 @@
+"""Load test for the backend API's gunicorn serving modes.
+
+Starts gunicorn with backend-api/gunicorn.conf.py once per mode against the app with a
+fixed-latency fake Timestream (tests/benchmark/fake_api.py), drives it with keep-alive
+clients and reports req/s and p50/p99 latency per mode.
+
+    python -m tests.benchmark.api_loadtest --modes sync gthread gevent --clients 50 --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from tests.benchmark.run_benchmark import percentile
+
+ROOT = Path(__file__).resolve().parents[2]
+CONFIG_PATH = ROOT / 'backend-api' / 'gunicorn.conf.py'
+
+# GUNICORN_* settings per serving mode; gunicorn turns 'sync' into gthread when threads > 1
+MODES = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_WORKERS': '1', 'GUNICORN_THREADS': '1'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_WORKERS': '2', 'GUNICORN_THREADS': '32'},
+    'gevent': {'GUNICORN_WORKER_CLASS': 'gevent', 'GUNICORN_WORKERS': '2', 'GUNICORN_WORKER_CONNECTIONS': '1000'},
+}
+
+
+def free_port():
+    """Return a port nothing is listening on, so parallel runs don't collide on a fixed one."""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(mode, port, query_latency_ms, overrides=None):
+    env = dict(os.environ, **MODES[mode], PORT=str(port), GUNICORN_ACCESS_LOG='',
+               LOADTEST_QUERY_LATENCY_MS=str(query_latency_ms))
+    env.update(overrides or {})
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', str(CONFIG_PATH), 'tests.benchmark.fake_api:app'],
+        cwd=str(ROOT), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn ({mode}) exited: {process.stderr.read().decode()[-2000:]}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.1)
+
+    process.kill()
+    raise RuntimeError(f"gunicorn ({mode}) did not start listening on port {port}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def drive(port, clients, duration):
+    """Run `clients` keep-alive connections for `duration` seconds; return latencies (s) and errors."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        failed = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                # Distinct limits keep identical requests from being coalesced by the query cache
+                connection.request('GET', f'/api/recent-files?limit={rng.randrange(1, 1000)}')
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def run_loadtest(modes=('sync', 'gthread', 'gevent'), clients=50, duration=10, query_latency_ms=50, port=5055,
+                 warmup=2):
+    reports = []
+    for mode in modes:
+        process = start_server(mode, port, query_latency_ms)
+        try:
+            # Workers import the app lazily when it isn't preloaded; keep that out of the numbers
+            drive(port, clients, warmup)
+            latencies, errors = drive(port, clients, duration)
+        finally:
+            stop_server(process)
+
+        reports.append({
+            'mode': mode,
+            'requests': len(latencies),
+            'errors': errors,
+            'req_per_sec': round(len(latencies) / duration, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        })
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--query-latency-ms', type=float, default=50)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds of unmeasured load before each run')
+    args = parser.parse_args(argv)
+
+    reports = run_loadtest(modes=args.modes, clients=args.clients, duration=args.duration,
+                           query_latency_ms=args.query_latency_ms, port=args.port, warmup=args.warmup)
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Synthetic SQS events wrapping S3 ObjectCreated notifications."""
+import json
+import random
+import uuid
+from datetime import datetime, timezone
+
+DEFAULT_EXTENSIONS = ['csv', 'json', 'png', 'jpg', 'pdf', 'zip', 'txt', 'parquet']
+
+
+def generate_sqs_event(batch_size=10, records_per_message=1, key_distribution='uniform',
+                       extensions=DEFAULT_EXTENSIONS, bucket='benchmark-bucket', rng=None):
+    """Build one SQS batch of `batch_size` messages, each carrying `records_per_message` S3 records.
+
+    key_distribution controls which extensions appear:
+      uniform - every extension equally likely
+      skewed  - Zipf-like, the first extension dominates
+      single  - every key uses the first extension
+    """
+    rng = rng or random.Random()
+
+    return {
+        'Records': [
+            {
+                'messageId': str(uuid.UUID(int=rng.getrandbits(128))),
+                'body': json.dumps({
+                    'Records': [
+                        _s3_record(bucket, _pick_extension(rng, extensions, key_distribution), rng)
+                        for _ in range(records_per_message)
+                    ]
+                })
+            }
+            for _ in range(batch_size)
+        ]
+    }
+
+
+def _pick_extension(rng, extensions, key_distribution):
+    if key_distribution == 'single':
+        return extensions[0]
+    if key_distribution == 'skewed':
+        weights = [1 / (rank + 1) ** 1.2 for rank in range(len(extensions))]
+        return rng.choices(extensions, weights=weights)[0]
+    if key_distribution == 'uniform':
+        return rng.choice(extensions)
+    raise ValueError(f"Unknown key distribution: {key_distribution}")
+
+
+def _s3_record(bucket, extension, rng):
+    key = f"uploads/{rng.randrange(1000):03d}/{uuid.UUID(int=rng.getrandbits(128)).hex}.{extension}"
+    return {
+        'eventTime': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+        'eventName': 'ObjectCreated:Put',
+        's3': {
+            'bucket': {'name': bucket},
+            'object': {
+                'key': key,
+                'size': rng.randrange(1, 50 * 1024 * 1024),
+                'sequencer': f"{rng.getrandbits(64):016X}"
+            }
+        }
+    }
@@ -0,0 +1,40 @@
+"""The backend API app with Timestream replaced by a fixed-latency fake, for load tests.
+
+    gunicorn --config backend-api/gunicorn.conf.py tests.benchmark.fake_api:app
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / 'backend-api'
+
+# Every request has to wait on the fake query: no Redis, no query cache hits
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('QUERY_CACHE_TTL_SECONDS', '0')
+os.environ.setdefault('QUERY_CACHE_STALE_SECONDS', '0')
+os.environ.pop('REDIS_HOST', None)
+QUERY_LATENCY = float(os.environ.get('LOADTEST_QUERY_LATENCY_MS', '50')) / 1000
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app import app  # noqa: E402,F401
+from src import routes  # noqa: E402
+
+
+def get_recent_files(hours=1, since=None, limit=20, cursor=None):
+    # time.sleep yields to other greenlets under gevent, like a real socket wait would
+    time.sleep(QUERY_LATENCY)
+    items = [{'key': f'uploads/{i:05d}.csv', 'size': i, 'file_extension': 'csv',
+              'timestamp': '2024-01-01 00:00:00.000000000'} for i in range(min(limit, 20))]
+    return items, None
+
+
+def get_files_since(since, limit=1000, after_key=None):
+    time.sleep(QUERY_LATENCY)
+    return []
+
+
+routes.timestream_service.get_recent_files = get_recent_files
+routes.live_feed.fetch = get_files_since
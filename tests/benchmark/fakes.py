@@ -0,0 +1,79 @@
+"""In-process stand-ins for the S3 and Timestream write clients used by the file processor.
+
+Each fake sleeps for a configurable latency to mimic a network round trip and counts the
+calls it receives, so benchmark runs can report API usage next to timings.
+"""
+import io
+import mimetypes
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+
+class CallCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def record(self, operation, amount=1):
+        with self._lock:
+            self.calls[operation] += amount
+
+
+class FakeS3Client:
+    def __init__(self, latency_ms=20, content=b'', counter=None):
+        self.latency = latency_ms / 1000
+        self.content = content
+        self.counter = counter or CallCounter()
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self.counter.record('s3:HeadObject')
+        time.sleep(self.latency)
+        return self._metadata(Key)
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        self.counter.record('s3:GetObject')
+        time.sleep(self.latency)
+
+        body = self.content
+        if Range:
+            start, end = Range.replace('bytes=', '').split('-')
+            body = body[int(start):int(end) + 1 if end else None]
+
+        response = self._metadata(Key)
+        response['Body'] = _FakeBody(body)
+        response['ContentLength'] = len(body)
+        return response
+
+    @staticmethod
+    def _metadata(key):
+        content_type, _ = mimetypes.guess_type(key)
+        return {
+            'ContentType': content_type or 'application/octet-stream',
+            'LastModified': datetime.now(timezone.utc)
+        }
+
+
+class FakeTimestreamWriteClient:
+    def __init__(self, latency_ms=30, per_record_latency_ms=0.1, counter=None, keep_records=False):
+        self.latency = latency_ms / 1000
+        self.per_record_latency = per_record_latency_ms / 1000
+        self.counter = counter or CallCounter()
+        # (table name, record) of every accepted record, for tests that inspect what was written
+        self.records = [] if keep_records else None
+
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+        if len(Records) > 100:
+            raise ValueError(f"WriteRecords accepts at most 100 records, got {len(Records)}")
+
+        self.counter.record('timestream:WriteRecords')
+        self.counter.record('timestream:Records', len(Records))
+        if self.records is not None:
+            self.records.extend((TableName, record) for record in Records)
+        time.sleep(self.latency + self.per_record_latency * len(Records))
+        return {'RecordsIngested': {'Total': len(Records)}}
+
+
+class _FakeBody(io.BytesIO):
+    pass
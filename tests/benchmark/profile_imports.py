@@ -0,0 +1,52 @@
+"""Report where the file processor spends its import (cold start) time.
+
+Runs `python -X importtime -c "import index"` in the processor directory and prints the
+modules with the largest cumulative import time.
+
+    python -m tests.benchmark.profile_imports --top 15
+
+The same raw output is available in CloudWatch Logs by deploying ProcessingLambdaStack
+with profile_imports=True.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from tests.benchmark.run_benchmark import PROCESSOR_DIR
+
+
+def profile_imports(module='index'):
+    """Return [(module, self_us, cumulative_us)] for every import, in import order."""
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=PROCESSOR_DIR, env=env, capture_output=True, text=True, check=True)
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='index')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    timings = profile_imports(args.module)
+    total = next((cumulative for name, _, cumulative in timings if name.strip() == args.module), 0)
+
+    print(f"Total import time of {args.module}: {total / 1000:.1f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(timings, key=lambda t: t[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""End-to-end throughput benchmark for the file processor Lambda handler.
+
+Runs the real handler against latency-injecting fakes and reports records/sec,
+p50/p99 invocation duration and API call counts.
+
+    python -m tests.benchmark.run_benchmark --invocations 50 --batch-size 10 --records-per-message 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from tests.benchmark.events import generate_sqs_event
+from tests.benchmark.fakes import CallCounter, FakeS3Client, FakeTimestreamWriteClient
+
+PROCESSOR_DIR = Path(__file__).resolve().parents[2] / 'src' / 'lambda' / 'file_processor'
+
+# Sample content served by the fake S3 for ranged reads
+SAMPLE_CONTENT = b'\x89PNG\r\n\x1a\n' + bytes(8192)
+
+
+def load_processor():
+    # The clients are replaced by fakes, but boto3 still needs a region to build them
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('TIMESTREAM_DB_NAME', 'benchmark_db')
+    os.environ.setdefault('TIMESTREAM_TABLE_NAME', 'file_events')
+
+    if str(PROCESSOR_DIR) not in sys.path:
+        sys.path.insert(0, str(PROCESSOR_DIR))
+
+    import index
+    return index
+
+
+def run_benchmark(invocations=20, batch_size=10, records_per_message=1, key_distribution='uniform',
+                  head_latency_ms=20, write_latency_ms=30, processor_options=None, seed=42):
+    """Run the handler `invocations` times and return a report dict."""
+    processor = load_processor()
+    counter = CallCounter()
+
+    overrides = {
+        's3_client': FakeS3Client(latency_ms=head_latency_ms, content=SAMPLE_CONTENT, counter=counter),
+        'timestream_client': FakeTimestreamWriteClient(latency_ms=write_latency_ms, counter=counter),
+        # Every run starts cold so seeded events are not dropped as duplicates of a previous run
+        'deduplicator': processor.EventDeduplicator(),
+    }
+    overrides.update(processor_options or {})
+
+    rng = random.Random(seed)
+    events = [
+        generate_sqs_event(batch_size=batch_size, records_per_message=records_per_message,
+                           key_distribution=key_distribution, rng=rng)
+        for _ in range(invocations)
+    ]
+
+    # The processor module is shared with every other test in the process, so put it back afterwards
+    previous = {name: getattr(processor, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(processor, name, value)
+
+    durations = []
+    failures = 0
+    try:
+        started = time.perf_counter()
+        for event in events:
+            invocation_started = time.perf_counter()
+            response = processor.handler(event, None)
+            durations.append(time.perf_counter() - invocation_started)
+            failures += len(response.get('batchItemFailures', []))
+        elapsed = time.perf_counter() - started
+    finally:
+        for name, value in previous.items():
+            setattr(processor, name, value)
+
+    records = invocations * batch_size * records_per_message
+    return {
+        'invocations': invocations,
+        'records': records,
+        'failed_messages': failures,
+        'records_per_sec': round(records / elapsed, 1),
+        'p50_ms': round(percentile(durations, 50) * 1000, 2),
+        'p99_ms': round(percentile(durations, 99) * 1000, 2),
+        'api_calls': dict(sorted(counter.calls.items())),
+        'api_calls_per_invocation': {
+            operation: round(count / invocations, 2) for operation, count in sorted(counter.calls.items())
+        }
+    }
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--invocations', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--records-per-message', type=int, default=1)
+    parser.add_argument('--key-distribution', choices=['uniform', 'skewed', 'single'], default='uniform')
+    parser.add_argument('--head-latency-ms', type=float, default=20)
+    parser.add_argument('--write-latency-ms', type=float, default=30)
+    parser.add_argument('--head-concurrency', type=int)
+    parser.add_argument('--trust-event-metadata', action='store_true')
+    parser.add_argument('--sniff-content', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    options = {
+        'TRUST_EVENT_METADATA': args.trust_event_metadata,
+        'SNIFF_CONTENT': args.sniff_content,
+    }
+    if args.head_concurrency:
+        options['HEAD_CONCURRENCY'] = args.head_concurrency
+
+    report = run_benchmark(invocations=args.invocations, batch_size=args.batch_size,
+                           records_per_message=args.records_per_message, key_distribution=args.key_distribution,
+                           head_latency_ms=args.head_latency_ms, write_latency_ms=args.write_latency_ms,
+                           processor_options=options, seed=args.seed)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
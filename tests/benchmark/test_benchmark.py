@@ -0,0 +1,73 @@
+import pytest
+
+from tests.benchmark.run_benchmark import run_benchmark
+
+
+# Keeps the harness runnable; real measurements come from running the module directly
+def test_benchmark_smoke():
+    report = run_benchmark(invocations=2, batch_size=10, records_per_message=3,
+                           head_latency_ms=0, write_latency_ms=0)
+
+    assert report['records'] == 60
+    assert report['failed_messages'] == 0
+    assert report['api_calls']['s3:HeadObject'] == report['records']
+    # One file_size record per file; nothing else is written with analysis and inspection off
+    assert report['api_calls']['timestream:Records'] == report['records']
+    # The 30 records of an invocation fit in one WriteRecords call
+    assert report['api_calls']['timestream:WriteRecords'] == report['invocations']
+
+
+def test_benchmark_restores_the_processor_module():
+    from tests.benchmark.run_benchmark import load_processor
+
+    processor = load_processor()
+    before = (processor.s3_client, processor.timestream_client, processor.deduplicator, processor.SNIFF_CONTENT)
+
+    run_benchmark(invocations=1, batch_size=2, head_latency_ms=0, write_latency_ms=0,
+                  processor_options={'SNIFF_CONTENT': not processor.SNIFF_CONTENT})
+
+    assert (processor.s3_client, processor.timestream_client, processor.deduplicator,
+            processor.SNIFF_CONTENT) == before
+
+
+def test_api_loadtest_smoke():
+    pytest.importorskip('gunicorn')
+    from tests.benchmark.api_loadtest import free_port, run_loadtest
+
+    report, = run_loadtest(modes=['gthread'], clients=4, duration=1, query_latency_ms=0, port=free_port(),
+                           warmup=0.5)
+
+    assert report['requests'] > 0
+    assert report['errors'] == 0
+
+
+def test_live_streams_leave_threads_for_health_checks():
+    pytest.importorskip('gunicorn')
+    import http.client
+    from tests.benchmark.api_loadtest import free_port, start_server, stop_server
+
+    port = free_port()
+    process = start_server('gthread', port, query_latency_ms=0,
+                           overrides={'GUNICORN_WORKERS': '1', 'GUNICORN_THREADS': '4',
+                                      'GUNICORN_GRACEFUL_TIMEOUT': '1'})
+    streams = []
+    try:
+        # As many dashboards as the worker has threads; only a quarter of them may stream
+        statuses = []
+        for _ in range(4):
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/api/live-files')
+            response = connection.getresponse()
+            statuses.append(response.status)
+            if response.status == 200:
+                assert response.readline() == b'retry: 5000\n'
+            streams.append(connection)
+        assert statuses == [200, 503, 503, 503]
+
+        health = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+        health.request('GET', '/api/health')
+        assert health.getresponse().status == 200
+    finally:
+        for connection in streams:
+            connection.close()
+        stop_server(process)
@@ -0,0 +1,132 @@
+import importlib.util
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import boto3
+import fakeredis
+import pytest
+from moto import mock_aws
+
+from tests.benchmark.fakes import CallCounter, FakeTimestreamWriteClient
+from tests.benchmark.run_benchmark import load_processor
+
+processor = load_processor()
+
+import backfill  # noqa: E402  (importable once the processor directory is on sys.path)
+import redis_cache  # noqa: E402
+
+spec = importlib.util.spec_from_file_location(
+    "api_redis_cache", Path(__file__).resolve().parents[2] / "backend-api" / "src" / "redis_cache.py")
+api_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(api_cache)
+
+BUCKET = 'backfill-bucket'
+KEYS = ['root.txt'] + [f'{prefix}/{i:03d}.csv' for prefix in ('a', 'b', 'c') for i in range(25)]
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    with mock_aws():
+        s3_client = boto3.client('s3', region_name='us-east-1')
+        s3_client.create_bucket(Bucket=BUCKET)
+        for key in KEYS:
+            s3_client.put_object(Bucket=BUCKET, Key=key, Body=b'data')
+
+        counter = CallCounter()
+        monkeypatch.setattr(processor, 's3_client', s3_client)
+        monkeypatch.setattr(processor, 'timestream_client',
+                            FakeTimestreamWriteClient(latency_ms=0, per_record_latency_ms=0, counter=counter,
+                                                      keep_records=True))
+        yield s3_client, counter
+
+
+def written_keys():
+    """Keys of the file_size records written to the events table, in write order."""
+    return [
+        next(d['Value'] for d in record['Dimensions'] if d['Name'] == 'key')
+        for table, record in processor.timestream_client.records
+        if table == processor.TABLE_NAME and record['MeasureName'] == 'file_size'
+    ]
+
+
+def test_bucket_is_sharded_by_top_level_prefix(bucket):
+    s3_client, _ = bucket
+
+    shards = backfill.list_shards(s3_client, BUCKET)
+
+    assert sorted(shard.id for shard in shards) == ['direct:', 'tree:a/', 'tree:b/', 'tree:c/']
+
+
+def test_every_object_is_written_once(bucket, tmp_path):
+    s3_client, counter = bucket
+    checkpoint = backfill.Checkpoint(str(tmp_path / 'checkpoint.json'))
+
+    stats = backfill.Backfill(BUCKET, checkpoint=checkpoint, workers=4, records_per_second=100000,
+                              page_size=10).run(backfill.list_shards(s3_client, BUCKET))
+
+    assert stats == {'shards': 4, 'objects': len(KEYS), 'retried': 0, 'failed': 0}
+    assert sorted(written_keys()) == sorted(KEYS)
+    # Tagged so the throughput, recent files and live views leave the load-time records out
+    origins = {
+        d['Value'] for table, record in processor.timestream_client.records
+        if table == processor.TABLE_NAME for d in record['Dimensions'] if d['Name'] == 'origin'
+    }
+    assert origins == {'backfill'}
+
+    # A second run with the same checkpoint has nothing left to do
+    counter.calls.clear()
+    resumed = backfill.Backfill(BUCKET, checkpoint=backfill.Checkpoint(str(tmp_path / 'checkpoint.json')))
+    assert resumed.run(backfill.list_shards(s3_client, BUCKET))['objects'] == 0
+    assert counter.calls['timestream:WriteRecords'] == 0
+
+
+def test_interrupted_shard_resumes_after_last_checkpointed_key(bucket, tmp_path):
+    s3_client, counter = bucket
+    checkpoint = backfill.Checkpoint(str(tmp_path / 'checkpoint.json'))
+    checkpoint.advance('tree:a/', 'a/019.csv')
+
+    stats = backfill.Backfill(BUCKET, checkpoint=checkpoint, page_size=10).run([backfill.Shard('a/')])
+
+    assert stats['objects'] == 5
+    assert backfill.Checkpoint(str(tmp_path / 'checkpoint.json')).is_done('tree:a/')
+
+
+def test_failed_keys_are_retried_by_the_next_run(bucket, tmp_path, monkeypatch):
+    s3_client, _ = bucket
+    path = str(tmp_path / 'checkpoint.json')
+    process_s3_event = processor.process_s3_event
+    broken = {'a/003.csv'}
+
+    def flaky_process_s3_event(s3_record, writer, **kwargs):
+        if s3_record['s3']['object']['key'] in broken:
+            raise RuntimeError('write failed')
+        return process_s3_event(s3_record, writer, **kwargs)
+
+    monkeypatch.setattr(processor, 'process_s3_event', flaky_process_s3_event)
+
+    # The key fails during its shard and again in the retry pass at the end of the run
+    stats = backfill.Backfill(BUCKET, checkpoint=backfill.Checkpoint(path), page_size=10).run([backfill.Shard('a/')])
+    assert stats == {'shards': 1, 'objects': 25, 'retried': 1, 'failed': 1}
+    assert backfill.Checkpoint(path).failed_keys() == ['a/003.csv']
+
+    broken.clear()
+    stats = backfill.Backfill(BUCKET, checkpoint=backfill.Checkpoint(path), page_size=10).run([backfill.Shard('a/')])
+    assert stats == {'shards': 0, 'objects': 0, 'retried': 1, 'failed': 0}
+    assert backfill.Checkpoint(path).failed_keys() == []
+    assert sorted(written_keys()) == sorted(key for key in KEYS if key.startswith('a/'))
+
+
+def test_backfilled_objects_count_towards_file_types(bucket, monkeypatch):
+    s3_client, _ = bucket
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_cache, '_client', fakeredis.FakeRedis(server=server))
+    started = datetime.utcnow()
+
+    backfill.Backfill(BUCKET, records_per_second=100000).run(backfill.list_shards(s3_client, BUCKET))
+
+    # What /api/file-types serves once the counters cover the whole window
+    reader = api_cache.RedisCache(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    file_types = reader.get_file_types(now=started + timedelta(hours=api_cache.COUNT_WINDOW_HOURS - 1))
+    assert [(item['extension'], item['count']) for item in file_types] == [('csv', 75), ('txt', 1)]
+    # The objects were uploaded long ago, so they stay out of the recent files list
+    assert reader.get_recent_files() is None
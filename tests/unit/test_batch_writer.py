@@ -0,0 +1,118 @@
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from tests.benchmark.run_benchmark import load_processor
+
+load_processor()
+
+import batch_writer  # noqa: E402  (importable once the processor directory is on sys.path)
+import clients  # noqa: E402
+
+
+class ScriptedClient:
+    """Fails write_records with the queued errors, then accepts every call."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+        self.calls.append([record['MeasureValue'] for record in Records])
+        if self.errors:
+            raise self.errors.pop(0)
+        return {}
+
+
+def client_error(code, rejected=None):
+    response = {'Error': {'Code': code, 'Message': code}}
+    if rejected is not None:
+        response['RejectedRecords'] = rejected
+    return ClientError(response, 'WriteRecords')
+
+
+def record(value):
+    return {'Dimensions': [], 'MeasureName': 'file_size', 'MeasureValue': str(value),
+            'MeasureValueType': 'BIGINT', 'Time': '0'}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(batch_writer, 'BACKOFF_BASE_SECONDS', 0)
+
+
+def test_throttled_write_is_retried_and_halves_the_limit():
+    controller = batch_writer.WriteController(max_limit=4)
+    client = ScriptedClient([client_error('ThrottlingException')])
+    writer = batch_writer.TimestreamBatchWriter(client, 'db', controller=controller)
+    writer.add('events', record(1), source='m1')
+
+    assert writer.flush() == set()
+    assert len(client.calls) == 2
+    assert controller.limit == pytest.approx(2 + 1 / 2)
+
+
+def test_only_rejected_records_are_sent_again():
+    client = ScriptedClient([client_error('RejectedRecordsException', [
+        {'RecordIndex': 1, 'Reason': 'Internal server error. Please try again.'},
+        {'RecordIndex': 2, 'Reason': 'conflict', 'ExistingVersion': 1},
+    ])])
+    writer = batch_writer.TimestreamBatchWriter(client, 'db', controller=batch_writer.WriteController())
+    for value, source in ((1, 'm1'), (2, 'm2'), (3, 'm3')):
+        writer.add('events', record(value), source=source)
+
+    # The version conflict can't succeed on retry, so only its message is reported
+    assert writer.flush() == {'m3'}
+    assert client.calls == [['1', '2', '3'], ['2']]
+
+
+def test_permanent_rejections_fail_without_a_retry():
+    controller = batch_writer.WriteController(max_limit=4)
+    client = ScriptedClient([client_error('RejectedRecordsException', [
+        {'RecordIndex': 0, 'Reason': 'The record timestamp is outside the time range [2024-01-01T00:00:00Z, '
+                                     '2024-01-01T12:00:00Z) of the memory store.'},
+        {'RecordIndex': 1, 'Reason': 'The dimension value is invalid.'},
+    ])])
+    writer = batch_writer.TimestreamBatchWriter(client, 'db', controller=controller)
+    for value, source in ((1, 'm1'), (2, 'm2'), (3, 'm3')):
+        writer.add('events', record(value), source=source)
+
+    assert writer.flush() == {'m1', 'm2'}
+    assert client.calls == [['1', '2', '3']]
+    assert controller.limit == 4
+
+
+def test_persistent_throttling_fails_the_chunk_after_max_attempts():
+    errors = [client_error('ThrottlingException')] * batch_writer.MAX_WRITE_ATTEMPTS
+    client = ScriptedClient(errors)
+    writer = batch_writer.TimestreamBatchWriter(client, 'db', controller=batch_writer.WriteController())
+    writer.add('events', record(1), source='m1')
+
+    assert writer.flush() == {'m1'}
+    assert len(client.calls) == batch_writer.MAX_WRITE_ATTEMPTS
+
+
+def test_limit_recovers_additively():
+    controller = batch_writer.WriteController(max_limit=4)
+    controller.limit = 1.0
+    for _ in range(3):
+        controller.acquire()
+        controller.release()
+
+    assert 2 < controller.limit < 3
+
+
+def test_transient_errors_are_retried_without_lowering_the_limit():
+    controller = batch_writer.WriteController(max_limit=4)
+    client = ScriptedClient([client_error('InternalServerException'),
+                             EndpointConnectionError(endpoint_url='https://ingest.timestream')])
+    writer = batch_writer.TimestreamBatchWriter(client, 'db', controller=controller)
+    writer.add('events', record(1), source='m1')
+
+    assert writer.flush() == set()
+    assert len(client.calls) == 3
+    assert controller.limit == 4
+
+
+def test_write_client_leaves_retries_to_the_writer():
+    assert clients.client_config('timestream-write').retries['max_attempts'] == 1
+    assert clients.client_config('s3').retries['max_attempts'] == clients.MAX_ATTEMPTS
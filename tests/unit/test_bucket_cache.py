@@ -0,0 +1,67 @@
+import importlib.util
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+spec = importlib.util.spec_from_file_location("bucket_cache", ROOT / "backend-api" / "src" / "bucket_cache.py")
+bucket_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bucket_cache)
+
+MINUTE = 60
+NOW = 1_700_000_000 // MINUTE * MINUTE + 30  # half way through a minute
+
+
+def timestream_time(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S') + '.000000000'
+
+
+class FakeLoader:
+    """Returns one row per bucket, except for buckets listed in `empty`."""
+
+    def __init__(self, empty=()):
+        self.calls = []
+        self.empty = set(empty)
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        return [{'time': timestream_time(bucket), 'uploads': 1}
+                for bucket in range(start - start % MINUTE, int(end), MINUTE) if bucket not in self.empty]
+
+
+def test_closed_buckets_are_only_queried_once():
+    cache = bucket_cache.BucketCache(settle_seconds=90)
+    loader = FakeLoader()
+    start, end = NOW - 10 * MINUTE, NOW
+
+    first = cache.get('uploads', MINUTE, start, end, loader, now=NOW)
+    second = cache.get('uploads', MINUTE, start, end, loader, now=NOW)
+
+    assert first == second
+    assert len(first) == 11
+    closed_end = (NOW - 90) // MINUTE * MINUTE
+    assert loader.calls == [(start - start % MINUTE, end), (closed_end, end)]
+
+
+def test_empty_closed_buckets_are_cached():
+    start = NOW - 5 * MINUTE
+    loader = FakeLoader(empty={start - start % MINUTE})
+    cache = bucket_cache.BucketCache(settle_seconds=0)
+
+    cache.get('uploads', MINUTE, start, NOW, loader, now=NOW)
+    rows = cache.get('uploads', MINUTE, start, NOW, loader, now=NOW)
+
+    assert len(rows) == 5
+    assert loader.calls[1][0] == NOW - NOW % MINUTE
+
+
+def test_window_moving_forward_only_queries_new_buckets():
+    cache = bucket_cache.BucketCache(settle_seconds=0)
+    loader = FakeLoader()
+
+    cache.get('uploads', MINUTE, NOW - 10 * MINUTE, NOW, loader, now=NOW)
+    later = NOW + 3 * MINUTE
+    rows = cache.get('uploads', MINUTE, later - 10 * MINUTE, later, loader, now=later)
+
+    assert len(rows) == 11
+    assert loader.calls[-1][0] == NOW - NOW % MINUTE
@@ -0,0 +1,58 @@
+import io
+import zipfile
+
+import pytest
+
+from tests.benchmark.run_benchmark import load_processor
+
+load_processor()
+
+import content_sniffer  # noqa: E402  (importable once the processor directory is on sys.path)
+
+
+def build_zip(names):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w') as archive:
+        for name in names:
+            archive.writestr(name, b'content')
+    return data.getvalue()
+
+
+@pytest.mark.parametrize('data, expected', [
+    (b'\x89PNG\r\n\x1a\n' + b'\x00' * 16, 'png'),
+    (b'\xff\xd8\xff\xe0\x00\x10JFIF', 'jpeg'),
+    (b'%PDF-1.7\n', 'pdf'),
+    (b'\x1f\x8b\x08\x00', 'gzip'),
+    (b'\x00' * 257 + b'ustar\x0000', 'tar'),
+    (b'RIFF\x24\x00\x00\x00WEBPVP8 ', 'webp'),
+    (b'RIFF\x24\x00\x00\x00WAVEfmt ', 'wav'),
+    (b'\x00\x00\x00\x18ftypheic', 'heic'),
+    (b'\x00\x00\x00\x18ftypisom', 'mp4'),
+])
+def test_detects_binary_formats_by_magic_number(data, expected):
+    assert content_sniffer.detect_type(data) == expected
+
+
+def test_office_documents_are_told_apart_from_plain_zips():
+    assert content_sniffer.detect_type(build_zip(['a.txt'])) == 'zip'
+    assert content_sniffer.detect_type(build_zip(['[Content_Types].xml', 'word/document.xml'])) == 'ooxml'
+
+
+@pytest.mark.parametrize('data, expected', [
+    (b'', 'empty'),
+    (b'\xef\xbb\xbf  {"key": 1}', 'json'),
+    (b'<?xml version="1.0"?><svg xmlns="http://www.w3.org/2000/svg"/>', 'svg'),
+    (b'<?xml version="1.0"?><feed/>', 'xml'),
+    (b'<!DOCTYPE html><html></html>', 'html'),
+    (b'name,size\na.txt,3\n', 'text'),
+    (b'text\x00with a null byte', 'binary'),
+    (b'\xff\xfe\xfd invalid utf-8 at the start', 'binary'),
+])
+def test_falls_back_to_text_detection(data, expected):
+    assert content_sniffer.detect_type(data) == expected
+
+
+def test_multi_byte_character_cut_off_by_the_prefix_is_still_text():
+    data = 'café'.encode('utf-8')[:-1]
+
+    assert content_sniffer.detect_type(memoryview(data)) == 'text'
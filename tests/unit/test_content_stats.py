@@ -0,0 +1,122 @@
+import gzip
+import io
+import json
+import time
+
+import pytest
+
+from tests.benchmark.run_benchmark import load_processor
+
+processor = load_processor()
+
+import content_stats  # noqa: E402  (importable once the processor directory is on sys.path)
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_object(self, Bucket, Key, **kwargs):
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Force values, quoted fields and gzip members to straddle chunk boundaries
+    monkeypatch.setattr(content_stats, 'READ_CHUNK_BYTES', 7)
+
+
+def analyze(key, data):
+    return content_stats.analyze_object(FakeS3({key: data}), 'bkt', key)
+
+
+CSV = b'id,name,note\n1,alice,"multi\nline"\n2,,NA\n3,carol\n'
+
+
+def test_csv_rows_columns_and_nulls():
+    stats = analyze('data.csv', CSV)
+
+    assert stats['row_count'] == 3
+    assert stats['column_count'] == 3
+    # name is empty once, note is NA once and missing once
+    assert stats['columns_with_nulls'] == 2
+    assert stats['null_rate'] == pytest.approx(3 / 9, abs=1e-6)
+    assert stats['max_column_null_rate'] == pytest.approx(2 / 3, abs=1e-6)
+    assert stats['complete'] is True
+
+
+def test_gzipped_csv_matches_plain_csv():
+    compressed = gzip.compress(CSV[:20]) + gzip.compress(CSV[20:])
+
+    assert {k: v for k, v in analyze('data.csv.gz', compressed).items() if k != 'analyzed_bytes'} == \
+        {k: v for k, v in analyze('data.csv', CSV).items() if k != 'analyzed_bytes'}
+
+
+def test_jsonl_counts_missing_keys_as_nulls():
+    lines = [{'a': 1, 'b': None}, {'a': 2}, {'a': 3, 'b': 4, 'c': 5}]
+    stats = analyze('events.jsonl', b'\n'.join(json.dumps(line).encode() for line in lines))
+
+    assert stats['row_count'] == 3
+    assert stats['column_count'] == 3
+    assert stats['columns_with_nulls'] == 2
+    assert stats['null_rate'] == pytest.approx(4 / 9, abs=1e-6)
+
+
+def test_analysis_stops_at_byte_limit(monkeypatch):
+    monkeypatch.setattr(content_stats, 'MAX_ANALYZED_BYTES', 14)
+
+    stats = analyze('data.csv', CSV)
+
+    assert stats['complete'] is False
+    assert stats['truncated'] is True
+    assert stats['analyzed_bytes'] == 14
+
+
+class SlowBody(io.BytesIO):
+    """Sleeps past `deadline` while reading its second chunk."""
+
+    def __init__(self, data, deadline):
+        super().__init__(data)
+        self.deadline = deadline
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        if self.reads == 2:
+            time.sleep(max(0, self.deadline - time.monotonic()) + 0.01)
+        return super().read(size)
+
+
+def test_analysis_stops_at_the_deadline():
+    deadline = time.monotonic() + 0.2
+    s3_client = FakeS3({})
+    s3_client.get_object = lambda Bucket, Key, **kwargs: {'Body': SlowBody(CSV, deadline)}
+
+    stats = content_stats.analyze_object(s3_client, 'bkt', 'data.csv', deadline=deadline)
+
+    assert stats['truncated'] is True
+    assert stats['complete'] is False
+    assert stats['analyzed_bytes'] == 14
+
+
+def test_analysis_is_skipped_once_the_invocation_is_almost_over(monkeypatch):
+    class Context:
+        def get_remaining_time_in_millis(self):
+            return (processor.ANALYZE_TIME_MARGIN_SECONDS - 1) * 1000
+
+    s3_records = [{'s3': {'bucket': {'name': 'bkt'}, 'object': {'key': 'data.csv', 'size': len(CSV)}}}]
+    metadata = [{'content_type': 'text/csv', 'last_modified': None}]
+    monkeypatch.setattr(processor, 's3_client', FakeS3({'data.csv': CSV}))
+
+    processor.add_content_stats(s3_records, metadata, deadline=processor.analysis_deadline(Context()))
+    assert 'content_stats' not in metadata[0]
+
+    processor.add_content_stats(s3_records, metadata, deadline=processor.analysis_deadline(None))
+    assert metadata[0]['content_stats']['truncated'] is False
+
+
+def test_only_data_files_are_analyzed():
+    assert content_stats.content_format('a/b.CSV') == ('csv', False)
+    assert content_stats.content_format('a/b.ndjson.gz') == ('jsonl', True)
+    assert content_stats.content_format('a/b.png') is None
+    assert content_stats.content_format('a/b.gz') is None
@@ -0,0 +1,56 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from aws_file_processing.stacks.database_stack import DatabaseStack
+from aws_file_processing.stacks.networking_stack import NetworkingStack
+
+
+def test_rollup_table_is_maintained_by_scheduled_query():
+    app = core.App()
+    networking = NetworkingStack(app, "Network")
+    database = DatabaseStack(app, "Database", vpc=networking.vpc)
+    template = assertions.Template.from_stack(database)
+
+    template.has_resource_properties("AWS::Timestream::Table", {
+        "TableName": database.rollup_table_name
+    })
+    template.has_resource_properties("AWS::Timestream::ScheduledQuery", {
+        "ScheduleConfiguration": {"ScheduleExpression": "rate(15 minutes)"},
+        "TargetConfiguration": {
+            "TimestreamConfiguration": assertions.Match.object_like({
+                "TableName": database.rollup_table_name,
+                "TimeColumn": "bucket_time",
+                "MultiMeasureMappings": assertions.Match.object_like({
+                    "TargetMultiMeasureName": "rollup"
+                })
+            })
+        }
+    })
+
+
+def test_rollup_query_follows_schema_version():
+    app = core.App()
+    networking = NetworkingStack(app, "Network")
+    legacy = DatabaseStack(app, "Legacy", vpc=networking.vpc)
+    multi_measure = DatabaseStack(app, "MultiMeasure", vpc=networking.vpc, schema_version="2")
+
+    assert "measure_name = 'file_size'" in legacy.rollup_query_string()
+    assert "measure_name = 'file_event'" in multi_measure.rollup_query_string()
+    assert "SUM(size)" in multi_measure.rollup_query_string()
+    for stack in (legacy, multi_measure):
+        # Backfilled objects count towards the file type totals
+        assert "origin" not in stack.rollup_query_string()
+
+
+def test_rollup_reads_both_layouts_during_a_schema_switch():
+    app = core.App()
+    networking = NetworkingStack(app, "Network")
+    switching = DatabaseStack(app, "Switching", vpc=networking.vpc, schema_version="2", read_schema="both")
+    query = switching.rollup_query_string()
+
+    assert "measure_name IN ('file_size', 'file_event')" in query
+    assert "CASE WHEN measure_name = 'file_event' THEN size ELSE measure_value::bigint END" in query
+
+    with pytest.raises(ValueError):
+        DatabaseStack(app, "Invalid", vpc=networking.vpc, read_schema="3")
@@ -0,0 +1,86 @@
+import json
+import time
+
+import fakeredis
+
+from tests.benchmark.fakes import CallCounter, FakeS3Client, FakeTimestreamWriteClient
+from tests.benchmark.run_benchmark import load_processor
+
+processor = load_processor()
+
+import dedup  # noqa: E402  (importable once the processor directory is on sys.path)
+
+
+def s3_record(key, sequencer, version_id=None):
+    s3_object = {'key': key, 'size': 10, 'sequencer': sequencer}
+    if version_id:
+        s3_object['versionId'] = version_id
+    return {'eventTime': '2024-01-01T00:00:00.000Z', 's3': {'bucket': {'name': 'bkt'}, 'object': s3_object}}
+
+
+def sqs_event(*messages):
+    return {'Records': [
+        {'messageId': message_id, 'body': json.dumps({'Records': records})} for message_id, records in messages
+    ]}
+
+
+def test_event_key_distinguishes_versions_and_sequencers():
+    assert dedup.event_key(s3_record('a.csv', '01')) == dedup.event_key(s3_record('a.csv', '01'))
+    assert dedup.event_key(s3_record('a.csv', '01')) != dedup.event_key(s3_record('a.csv', '02'))
+    assert dedup.event_key(s3_record('a.csv', '01', 'v1')) != dedup.event_key(s3_record('a.csv', '01', 'v2'))
+    assert dedup.event_key({'s3': {'bucket': {'name': 'bkt'}, 'object': {'key': 'a.csv'}}}) is None
+
+
+def test_redelivered_events_are_written_once(monkeypatch):
+    counter = CallCounter()
+    monkeypatch.setattr(processor, 's3_client', FakeS3Client(latency_ms=0, counter=counter))
+    monkeypatch.setattr(processor, 'timestream_client', FakeTimestreamWriteClient(latency_ms=0, counter=counter))
+    monkeypatch.setattr(processor, 'deduplicator', dedup.EventDeduplicator(client_factory=lambda: None))
+    event = sqs_event(('m1', [s3_record('a.csv', '01')]), ('m2', [s3_record('a.csv', '01')]))
+
+    assert processor.process_batch(event) == {'batchItemFailures': []}
+    assert processor.process_batch(event) == {'batchItemFailures': []}
+
+    assert counter.calls['s3:HeadObject'] == 1
+    assert counter.calls['timestream:WriteRecords'] == 1  # the first copy's file_size record
+
+
+def test_claims_are_shared_and_released_on_failure():
+    client = fakeredis.FakeRedis()
+    first = dedup.EventDeduplicator(client_factory=lambda: client)
+    second = dedup.EventDeduplicator(client_factory=lambda: client)
+    records = [('m1', s3_record('a.csv', '01')), ('m2', s3_record('b.csv', '01'))]
+
+    kept, duplicates = first.claim(records)
+    assert (len(kept), duplicates) == (2, 0)
+
+    # Another container sees both events in flight
+    assert second.claim(records) == ([], 2)
+
+    first.release([records[0][1]])
+    first.commit([records[1][1]])
+    kept, duplicates = second.claim(records)
+    assert [message_id for message_id, _ in kept] == ['m1']
+    assert duplicates == 1
+
+
+def test_claim_of_a_crashed_invocation_expires_before_redelivery(monkeypatch):
+    client = fakeredis.FakeRedis()
+    event = sqs_event(('m1', [s3_record('a.csv', '01')]))
+    s3_records = [('m1', s3_record('a.csv', '01'))]
+
+    # The first invocation claims the event and times out before committing or releasing it
+    crashed = dedup.EventDeduplicator(client_factory=lambda: client, claim_seconds=1)
+    assert crashed.claim(s3_records) == (s3_records, 0)
+
+    counter = CallCounter()
+    monkeypatch.setattr(processor, 's3_client', FakeS3Client(latency_ms=0, counter=counter))
+    monkeypatch.setattr(processor, 'timestream_client', FakeTimestreamWriteClient(latency_ms=0, counter=counter))
+    monkeypatch.setattr(processor, 'deduplicator',
+                        dedup.EventDeduplicator(client_factory=lambda: client, claim_seconds=1))
+    time.sleep(1.1)
+
+    # SQS redelivers once the visibility timeout is over; the claim must be gone by then
+    assert processor.process_batch(event) == {'batchItemFailures': []}
+    assert counter.calls['s3:HeadObject'] == 1
+    assert client.get(f'{dedup.SEEN_KEY_PREFIX}:{dedup.event_key(s3_record("a.csv", "01"))}') == b'processed'
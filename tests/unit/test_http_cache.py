@@ -0,0 +1,79 @@
+import gzip
+import importlib.util
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[2]
+
+spec = importlib.util.spec_from_file_location("http_cache", ROOT / "backend-api" / "src" / "http_cache.py")
+http_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(http_cache)
+
+LARGE = [{'key': f'uploads/{i:05d}.csv', 'size': i, 'file_extension': 'csv'} for i in range(200)]
+
+
+def client():
+    app = Flask(__name__)
+    app.after_request(http_cache.compress_response)
+
+    @app.route('/items')
+    def items():
+        return http_cache.json_response(LARGE, max_age=15)
+
+    @app.route('/small')
+    def small():
+        return http_cache.json_response({'ok': True})
+
+    return app.test_client()
+
+
+def test_matching_etag_returns_empty_304():
+    api = client()
+    first = api.get('/items')
+    etag = first.headers['ETag']
+
+    second = api.get('/items', headers={'If-None-Match': etag})
+
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'max-age=15, must-revalidate'
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == etag
+
+
+def test_large_responses_are_gzipped_with_their_own_etag():
+    api = client()
+    plain = api.get('/items')
+    compressed = api.get('/items', headers={'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+
+    # The compressed variant's tag revalidates too, and the 304 confirms that same tag
+    revalidated = api.get('/items', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == compressed.headers['ETag']
+
+    # A tag of another representation doesn't validate this one
+    other = api.get('/items', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']})
+    assert other.status_code == 200
+    assert other.headers['ETag'] == compressed.headers['ETag']
+
+
+def test_small_responses_are_not_compressed():
+    response = client().get('/small', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_etag_matching():
+    assert http_cache.etag_matches('"abc"', '"abc"')
+    assert http_cache.etag_matches('W/"abc-br", "other"', '"abc-br"')
+    assert not http_cache.etag_matches('"abc-gzip"', '"abc"')
+    assert http_cache.etag_matches('*', '"abc"')
+    assert not http_cache.etag_matches('"abd"', '"abc"')
+    assert not http_cache.etag_matches(None, '"abc"')
@@ -0,0 +1,104 @@
+import importlib.util
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+spec = importlib.util.spec_from_file_location("live_feed", ROOT / "backend-api" / "src" / "live_feed.py")
+live_feed = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(live_feed)
+
+
+def timestamp(seconds_ago=0):
+    return live_feed._format_time(time.time() - seconds_ago)
+
+
+class FakeSource:
+    def __init__(self):
+        self.files = []
+        self.queries = []
+
+    def __call__(self, since, limit, after_key=None):
+        self.queries.append(since)
+        return sorted((item for item in self.files
+                       if item['timestamp'] > since
+                       or (item['timestamp'] == since and (after_key is None or item['key'] > after_key))),
+                      key=lambda item: (item['timestamp'], item['key']))[:limit]
+
+
+def drain(subscriber):
+    items = []
+    while True:
+        item = subscriber.get(timeout=0)
+        if item is None:
+            return items
+        items.append(item)
+
+
+def test_each_file_is_delivered_once_to_every_subscriber():
+    source = FakeSource()
+    feed = live_feed.LiveFeed(source, lag_seconds=30)
+    first, second = live_feed.Subscriber(10), live_feed.Subscriber(10)
+    feed._subscribers.update({first, second})
+
+    source.files.append({'key': 'a.csv', 'timestamp': timestamp(5)})
+    feed.poll()
+    # b.csv was flushed late: its timestamp is older than the previous poll
+    source.files.append({'key': 'b.csv', 'timestamp': timestamp(10)})
+    feed.poll()
+
+    assert [item['key'] for item in drain(first)] == ['a.csv', 'b.csv']
+    assert [item['key'] for item in drain(second)] == ['a.csv', 'b.csv']
+    # Every poll only asks for the recent window, never the full hour
+    assert all(since >= timestamp(31) for since in source.queries)
+
+
+def test_slow_consumers_are_dropped():
+    source = FakeSource()
+    feed = live_feed.LiveFeed(source)
+    slow = live_feed.Subscriber(2)
+    feed._subscribers.add(slow)
+
+    source.files.extend({'key': f'{i}.txt', 'timestamp': timestamp(1)} for i in range(3))
+    feed.poll()
+
+    assert slow.dropped
+    assert feed.stats()['clients'] == 0
+    assert feed.stats()['dropped_clients'] == 1
+
+
+def test_full_page_continues_from_its_last_timestamp():
+    source = FakeSource()
+    feed = live_feed.LiveFeed(source, fetch_limit=2)
+    subscriber = live_feed.Subscriber(10)
+    feed._subscribers.add(subscriber)
+    source.files.extend({'key': f'{i}.txt', 'timestamp': timestamp(3 - i)} for i in range(3))
+
+    feed.poll()
+    feed.poll()
+
+    assert [item['key'] for item in drain(subscriber)] == ['0.txt', '1.txt', '2.txt']
+    assert source.queries[1] == source.files[1]['timestamp']
+
+
+def test_full_page_of_one_timestamp_does_not_stall_the_feed():
+    source = FakeSource()
+    feed = live_feed.LiveFeed(source, fetch_limit=2)
+    subscriber = live_feed.Subscriber(10)
+    feed._subscribers.add(subscriber)
+    shared = timestamp(3)
+    source.files.extend({'key': f'{i}.txt', 'timestamp': shared} for i in range(5))
+
+    for _ in range(3):
+        feed.poll()
+
+    assert [item['key'] for item in drain(subscriber)] == [f'{i}.txt' for i in range(5)]
+
+
+def test_subscriptions_are_capped():
+    feed = live_feed.LiveFeed(lambda since, limit, after_key: [], interval=60, max_clients=1)
+
+    subscriber = feed.subscribe()
+    assert subscriber is not None
+    assert feed.subscribe() is None
+    feed.unsubscribe(subscriber)
@@ -0,0 +1,102 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from aws_file_processing.profiles import PROFILES, get_profile
+from aws_file_processing.stacks.backend_api_stack import BackendApiStack
+from aws_file_processing.stacks.networking_stack import NetworkingStack
+from aws_file_processing.stacks.processing_lambda_stack import ProcessingLambdaStack
+from aws_file_processing.stacks.storage_stack import StorageStack
+
+
+def synthesize(profile_name):
+    profile = get_profile(profile_name)
+    # Skip Docker bundling of the Lambda asset; only the templates are inspected
+    app = core.App(context={"aws:cdk:bundling-stacks": []})
+    networking = NetworkingStack(app, "Network")
+    storage = StorageStack(app, "Storage", profile=profile)
+    processing = ProcessingLambdaStack(app, "Compute",
+                                       bucket=storage.bucket,
+                                       queue=storage.queue,
+                                       vpc=networking.vpc,
+                                       lambda_sg=networking.lambda_sg,
+                                       timestream_db_name="db",
+                                       timestream_events_table_name="events",
+                                       profile=profile)
+    api = BackendApiStack(app, "Api",
+                          vpc=networking.vpc,
+                          timestream_db_name="db",
+                          timestream_events_table_name="events",
+                          timestream_rollup_table_name="file_type_rollups",
+                          profile=profile)
+
+    return (assertions.Template.from_stack(storage),
+            assertions.Template.from_stack(processing),
+            assertions.Template.from_stack(api))
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        get_profile("turbo")
+
+
+@pytest.mark.parametrize("profile_name", sorted(PROFILES))
+def test_profile_values_are_synthesized(profile_name):
+    profile = PROFILES[profile_name]
+    storage, processing, api = synthesize(profile_name)
+
+    storage.has_resource_properties("AWS::SQS::Queue", {
+        "VisibilityTimeout": profile.queue_visibility_timeout_seconds
+    })
+
+    processing.has_resource_properties("AWS::Lambda::Function", {
+        "MemorySize": profile.lambda_memory_mb,
+        "Timeout": profile.lambda_timeout_seconds,
+        "Runtime": profile.lambda_runtime,
+        "Architectures": [profile.lambda_architecture],
+        "Environment": {"Variables": assertions.Match.object_like({
+            "DEDUP_CLAIM_SECONDS": str(profile.dedup_claim_seconds),
+            "ANALYZE_MAX_BYTES": str(profile.analyze_max_mb * 1024 * 1024)
+        })},
+    })
+
+    event_source = {
+        "BatchSize": profile.sqs_batch_size,
+        "FunctionResponseTypes": ["ReportBatchItemFailures"],
+    }
+    if profile.sqs_max_batching_window_seconds:
+        event_source["MaximumBatchingWindowInSeconds"] = profile.sqs_max_batching_window_seconds
+    if profile.sqs_max_concurrency:
+        event_source["ScalingConfig"] = {"MaximumConcurrency": profile.sqs_max_concurrency}
+    processing.has_resource_properties("AWS::Lambda::EventSourceMapping", event_source)
+
+    api.has_resource_properties("AWS::ECS::TaskDefinition", {
+        "Cpu": str(profile.api_cpu),
+        "Memory": str(profile.api_memory_mib),
+    })
+    api.has_resource_properties("AWS::ApplicationAutoScaling::ScalableTarget", {
+        "MinCapacity": profile.api_min_capacity,
+        "MaxCapacity": profile.api_max_capacity,
+    })
+
+    request_scaling = api.find_resources("AWS::ApplicationAutoScaling::ScalingPolicy", {
+        "Properties": {
+            "TargetTrackingScalingPolicyConfiguration": {
+                "PredefinedMetricSpecification": {"PredefinedMetricType": "ALBRequestCountPerTarget"}
+            }
+        }
+    })
+    if profile.api_requests_per_target:
+        assert len(request_scaling) == 1
+        policy = next(iter(request_scaling.values()))
+        assert policy["Properties"]["TargetTrackingScalingPolicyConfiguration"]["TargetValue"] == \
+            profile.api_requests_per_target
+    else:
+        assert request_scaling == {}
+
+
+@pytest.mark.parametrize("profile_name", sorted(PROFILES))
+def test_dedup_claims_expire_before_redelivery(profile_name):
+    profile = PROFILES[profile_name]
+
+    assert profile.lambda_timeout_seconds < profile.dedup_claim_seconds < profile.queue_visibility_timeout_seconds
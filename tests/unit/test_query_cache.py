@@ -0,0 +1,97 @@
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+
+spec = importlib.util.spec_from_file_location("query_cache", ROOT / "backend-api" / "src" / "query_cache.py")
+query_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_cache)
+
+
+class BlockingLoader:
+    """Counts calls and holds each one until `release` is set."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        assert self.release.wait(5)
+        return self.value
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = query_cache.QueryCache(ttl=60)
+    loader = BlockingLoader(['row'])
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get('file_types', loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.stats()['coalesced'] == 7)
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == 1
+    assert results == [['row']] * 8
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['coalesced'] == 7
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = query_cache.QueryCache(ttl=0, stale_ttl=300)
+    cache.get('file_types', lambda: 'old')
+    loader = BlockingLoader('new')
+
+    # Past the TTL every caller gets the stale value at once, and only one refresh is started
+    assert [cache.get('file_types', loader) for _ in range(5)] == ['old'] * 5
+    wait_for(lambda: loader.calls == 1)
+    assert cache.stats()['refreshes'] == 1
+
+    loader.release.set()
+    wait_for(lambda: cache.get('file_types', loader) == 'new')
+    assert cache.stats()['stale_hits'] >= 6
+
+
+def test_counts_hits_and_misses():
+    cache = query_cache.QueryCache(ttl=60)
+
+    cache.get('file_types', lambda: 1)
+    cache.get('file_types', lambda: 2)
+    assert cache.get(('recent_files', 10), lambda: 3) == 3
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert stats['stale_hits'] == 0
+    assert stats['entries'] == 2
+
+
+def test_failed_loads_are_not_cached():
+    cache = query_cache.QueryCache(ttl=60)
+
+    def fail():
+        raise RuntimeError('throttled')
+
+    with pytest.raises(RuntimeError):
+        cache.get('file_types', fail)
+
+    assert cache.get('file_types', lambda: 'rows') == 'rows'
+    stats = cache.stats()
+    assert stats['errors'] == 1
+    assert stats['misses'] == 2
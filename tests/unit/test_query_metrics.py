@@ -0,0 +1,69 @@
+import importlib.util
+import multiprocessing
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+spec = importlib.util.spec_from_file_location("query_metrics", ROOT / "backend-api" / "src" / "query_metrics.py")
+query_metrics = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_metrics)
+
+
+def test_counts_errors_separately_from_empty_results():
+    metrics = query_metrics.QueryMetrics()
+
+    metrics.record('recent_files', 0.2, pages=2, rows=40, retries=1, bytes_scanned=1000, bytes_metered=10485760)
+    metrics.record('recent_files', 0.1, pages=1, rows=0)
+    metrics.record('recent_files', 0.05, error=True)
+
+    snapshot = metrics.snapshot()['recent_files']
+    assert snapshot['queries'] == 3
+    assert snapshot['errors'] == 1
+    assert snapshot['empty_results'] == 1
+    assert snapshot['rows'] == 40
+    assert snapshot['bytes_metered'] == 10485760
+
+
+def test_renders_prometheus_text():
+    metrics = query_metrics.QueryMetrics(buckets=(0.1, 1.0))
+    metrics.record('file_types', 0.1, pages=1, rows=3)
+    metrics.record('file_types', 0.5, pages=1, rows=3)
+    metrics.record('throughput', 2.0, error=True)
+
+    lines = metrics.render().splitlines()
+
+    assert '# TYPE timestream_query_errors_total counter' in lines
+    assert 'timestream_query_queries_total{query="file_types"} 2' in lines
+    assert 'timestream_query_errors_total{query="throughput"} 1' in lines
+    assert 'timestream_query_empty_results_total{query="throughput"} 0' in lines
+    assert '# TYPE timestream_query_duration_seconds histogram' in lines
+    # Bucket bounds are inclusive and cumulative
+    assert 'timestream_query_duration_seconds_bucket{query="file_types",le="0.1"} 1' in lines
+    assert 'timestream_query_duration_seconds_bucket{query="file_types",le="1.0"} 2' in lines
+    assert 'timestream_query_duration_seconds_bucket{query="throughput",le="1.0"} 0' in lines
+    assert 'timestream_query_duration_seconds_bucket{query="throughput",le="+Inf"} 1' in lines
+    assert 'timestream_query_duration_seconds_sum{query="file_types"} 0.6' in lines
+    assert 'timestream_query_duration_seconds_count{query="file_types"} 2' in lines
+
+
+def test_workers_sharing_a_directory_report_the_same_totals(tmp_path):
+    metrics = query_metrics.QueryMetrics(directory=str(tmp_path))
+    metrics.record('file_types', 0.2, pages=1, rows=3)
+
+    def worker(name, error):
+        metrics.record(name, 0.4, pages=1, error=error)
+
+    # Forked like gunicorn workers; each inherits the registry with the parent's totals in it
+    context = multiprocessing.get_context('fork')
+    for name, error in (('file_types', False), ('throughput', True)):
+        process = context.Process(target=worker, args=(name, error))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+
+    # The workers have exited, and their totals are still counted, each only once
+    totals = metrics.snapshot()
+    assert totals['file_types']['queries'] == 2
+    assert totals['file_types']['empty_results'] == 1
+    assert totals['throughput']['errors'] == 1
+    assert 'timestream_query_queries_total{query="file_types"} 2' in metrics.render().splitlines()
@@ -0,0 +1,180 @@
+import importlib.util
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import fakeredis
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+processor_cache = load_module("processor_redis_cache", ROOT / "src" / "lambda" / "file_processor" / "redis_cache.py")
+api_cache = load_module("api_redis_cache", ROOT / "backend-api" / "src" / "redis_cache.py")
+
+
+def timestamp(minutes_ago=0):
+    return (datetime.utcnow() - timedelta(minutes=minutes_ago)).strftime('%Y-%m-%d %H:%M:%S.%f') + '000'
+
+
+def test_processor_and_api_share_key_layout():
+    for name in ("EXTENSION_COUNTS_KEY", "EXTENSION_BYTES_KEY", "EXTENSION_LAST_UPDATE_KEY", "COUNTS_SINCE_KEY",
+                 "COUNT_WINDOW_HOURS", "RECENT_FILES_KEY", "RECENT_FILES_LIMIT"):
+        assert getattr(processor_cache, name) == getattr(api_cache, name)
+
+
+def test_recorded_files_are_served_by_the_api():
+    server = fakeredis.FakeServer()
+    writer = fakeredis.FakeRedis(server=server)
+    reader = api_cache.RedisCache(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    first_recorded = datetime.utcnow() - timedelta(minutes=90)
+
+    processor_cache.record_files([
+        {'key': 'a.csv', 'size': 10, 'file_extension': 'csv',
+         'timestamp': first_recorded.strftime('%Y-%m-%d %H:%M:%S.%f') + '000'},
+        {'key': 'b.csv', 'size': 20, 'file_extension': 'csv', 'timestamp': timestamp(2)},
+    ], client=writer)
+    processor_cache.record_files([
+        {'key': 'c.png', 'size': 30, 'file_extension': 'png', 'timestamp': timestamp(1)},
+    ], client=writer)
+
+    # The cache has only seen the last 90 minutes; Timestream must answer for the full window
+    assert reader.get_file_types() is None
+
+    # Once the first recorded hour is the oldest hour of the window, Redis covers all of it
+    file_types = reader.get_file_types(now=first_recorded + timedelta(hours=api_cache.COUNT_WINDOW_HOURS - 1))
+    assert [(item['extension'], item['count'], item['total_bytes']) for item in file_types] == [
+        ('csv', 2, 30), ('png', 1, 30)]
+
+    recent = reader.get_recent_files(limit=10)
+    assert [item['key'] for item in recent] == ['c.png', 'b.csv', 'a.csv']
+
+    recent = reader.get_recent_files(limit=10, since=datetime.utcnow() - timedelta(hours=1))
+    assert [item['key'] for item in recent] == ['c.png', 'b.csv']
+
+
+def test_recent_files_list_is_bounded():
+    client = fakeredis.FakeRedis()
+    files = [{'key': f'{i}.txt', 'size': i, 'file_extension': 'txt', 'timestamp': timestamp()}
+             for i in range(processor_cache.RECENT_FILES_LIMIT + 5)]
+
+    processor_cache.record_files(files, client=client)
+
+    assert client.llen(processor_cache.RECENT_FILES_KEY) == processor_cache.RECENT_FILES_LIMIT
+
+
+def test_api_falls_back_when_redis_is_empty():
+    reader = api_cache.RedisCache(client=fakeredis.FakeRedis(decode_responses=True))
+
+    assert reader.get_file_types() is None
+    assert reader.get_recent_files() is None
+
+
+def test_recent_files_are_ordered_like_timestream():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    reader = api_cache.RedisCache(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    tied = timestamp(3)
+    # A slower processor pushes its older files after a faster one pushed newer files
+    processor_cache.record_files([{'key': 'new.csv', 'size': 1, 'file_extension': 'csv', 'timestamp': timestamp(1)}],
+                                 client=client)
+    processor_cache.record_files([
+        {'key': 'a.csv', 'size': 1, 'file_extension': 'csv', 'timestamp': tied},
+        {'key': 'b.csv', 'size': 1, 'file_extension': 'csv', 'timestamp': tied},
+        {'key': 'old.csv', 'size': 1, 'file_extension': 'csv', 'timestamp': timestamp(5)},
+    ], client=client)
+
+    recent = reader.get_recent_files(limit=3)
+    assert [item['key'] for item in recent] == ['new.csv', 'b.csv', 'a.csv']
+
+
+def test_cached_files_carry_their_timestream_time(monkeypatch):
+    from tests.benchmark.events import generate_sqs_event
+    from tests.benchmark.fakes import FakeS3Client, FakeTimestreamWriteClient
+    from tests.benchmark.run_benchmark import load_processor
+
+    processor = load_processor()
+    import redis_cache  # noqa: E402  (the processor's module, importable once its directory is on sys.path)
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_cache, '_client', fakeredis.FakeRedis(server=server))
+    timestream_client = FakeTimestreamWriteClient(latency_ms=0, keep_records=True)
+    monkeypatch.setattr(processor, 'timestream_client', timestream_client)
+    monkeypatch.setattr(processor, 's3_client', FakeS3Client(latency_ms=0))
+    monkeypatch.setattr(processor, 'deduplicator', processor.EventDeduplicator(client_factory=lambda: None))
+
+    assert processor.process_batch(generate_sqs_event(batch_size=3)) == {'batchItemFailures': []}
+
+    written = {
+        next(d['Value'] for d in record['Dimensions'] if d['Name'] == 'key'): int(record['Time'])
+        for table, record in timestream_client.records if record.get('MeasureName') == 'file_size'
+    }
+    reader = api_cache.RedisCache(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    cached = reader.get_recent_files(limit=10)
+    assert len(cached) == 3
+    for item in cached:
+        epoch_ms = written[item['key']]
+        assert item['timestamp'] == datetime.utcfromtimestamp(epoch_ms / 1000).strftime('%Y-%m-%d %H:%M:%S.%f') + '000'
+
+
+def test_counts_expire_with_the_retention_window():
+    server = fakeredis.FakeServer()
+    writer = fakeredis.FakeRedis(server=server)
+    reader = api_cache.RedisCache(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    start = datetime(2024, 1, 1, 12, 30)
+
+    processor_cache.record_files([
+        {'key': 'a.csv', 'size': 1, 'file_extension': 'csv', 'timestamp': start.strftime('%Y-%m-%d %H:%M:%S.000000000')},
+    ], client=writer)
+    later = start + timedelta(hours=5)
+    processor_cache.record_files([
+        {'key': 'b.csv', 'size': 1, 'file_extension': 'csv', 'timestamp': later.strftime('%Y-%m-%d %H:%M:%S.000000000')},
+    ], client=writer)
+
+    ttl = writer.ttl(processor_cache.counts_key(start.strftime('%Y-%m-%d %H:%M:%S')))
+    assert 0 < ttl <= (processor_cache.COUNT_WINDOW_HOURS + 1) * 3600
+
+    window = timedelta(hours=api_cache.COUNT_WINDOW_HOURS)
+    assert reader.get_file_types(now=start + window - timedelta(hours=1))[0]['count'] == 2
+    # The first hour has left the window, as it has left Timestream's retention
+    assert reader.get_file_types(now=start + window + timedelta(hours=1))[0]['count'] == 1
+
+
+class RollupQueryClient:
+    """Answers the file types query the way Timestream returns the rollup table's sums."""
+
+    def query(self, QueryString, **kwargs):
+        columns = [('extension', 'VARCHAR'), ('count', 'BIGINT'), ('total_bytes', 'BIGINT'),
+                   ('last_update', 'TIMESTAMP')]
+        return {
+            'ColumnInfo': [{'Name': name, 'Type': {'ScalarType': scalar_type}} for name, scalar_type in columns],
+            'Rows': [{'Data': [{'ScalarValue': 'csv'}, {'ScalarValue': '2'}, {'ScalarValue': '30'},
+                               {'ScalarValue': '2024-01-01 12:00:00.000000000'}]}]
+        }
+
+
+def test_file_types_have_the_same_fields_from_redis_and_timestream(monkeypatch):
+    backend_dir = str(ROOT / "backend-api")
+    monkeypatch.syspath_prepend(backend_dir)
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    from src.timestream_service import TimestreamService
+
+    service = TimestreamService()
+    service.client = RollupQueryClient()
+    from_timestream, = service.get_file_types()
+
+    server = fakeredis.FakeServer()
+    start = datetime(2024, 1, 1, 12, 0)
+    processor_cache.record_files([
+        {'key': 'a.csv', 'size': 10, 'file_extension': 'csv', 'timestamp': start.strftime('%Y-%m-%d %H:%M:%S.000000000')},
+        {'key': 'b.csv', 'size': 20, 'file_extension': 'csv', 'timestamp': start.strftime('%Y-%m-%d %H:%M:%S.000000000')},
+    ], client=fakeredis.FakeRedis(server=server))
+    reader = api_cache.RedisCache(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    from_redis, = reader.get_file_types(now=start + timedelta(hours=api_cache.COUNT_WINDOW_HOURS - 1))
+
+    assert from_redis == from_timestream
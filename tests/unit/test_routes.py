@@ -0,0 +1,72 @@
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend-api"
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from src import routes  # noqa: E402
+
+
+def epoch(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def throughput(monkeypatch):
+    """Returns (client, calls); calls holds the (bucket_seconds, start, end, group_by) of every throughput load."""
+    calls = []
+
+    def load_throughput(bucket_seconds, start, end, group_by):
+        calls.append((bucket_seconds, start, end, group_by))
+        return []
+
+    monkeypatch.setattr(routes, 'load_throughput', load_throughput)
+    app = Flask(__name__)
+    routes.register_routes(app)
+    return app.test_client(), calls
+
+
+def test_offsets_are_converted_to_utc(throughput):
+    client, calls = throughput
+
+    response = client.get('/api/throughput?from=2024-01-01T02:00:00%2B02:00&to=2024-01-01T01:00:00Z')
+
+    assert response.status_code == 200
+    assert calls == [(60, epoch(2024, 1, 1, 0), epoch(2024, 1, 1, 1), None)]
+
+
+def test_naive_and_offset_values_can_be_mixed(throughput):
+    client, calls = throughput
+
+    response = client.get('/api/throughput?from=2024-01-01T00:00:00&to=2024-01-01T03:00:00%2B02:00')
+    assert response.status_code == 200
+    assert calls == [(60, epoch(2024, 1, 1, 0), epoch(2024, 1, 1, 1), None)]
+
+    # Only an offset tells these apart: 00:30 UTC is before midnight at -01:00
+    response = client.get('/api/throughput?from=2024-01-01T00:30:00&to=2024-01-01T00:00:00-01:00')
+    assert response.status_code == 200
+    assert calls[-1][1:3] == (epoch(2024, 1, 1, 0, 30), epoch(2024, 1, 1, 1))
+
+
+def test_errors_name_the_invalid_parameter(throughput):
+    client, calls = throughput
+
+    response = client.get('/api/throughput?from=yesterday')
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid 'from' timestamp: yesterday"}
+
+    response = client.get('/api/throughput?to=2024-13-01T00:00:00%2B00:00')
+    assert response.status_code == 400
+    assert "'to'" in response.get_json()['error']
+
+    response = client.get('/api/throughput?from=2024-01-01T01:00:00%2B00:00&to=2024-01-01T02:00:00%2B02:00')
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "'from' must be before 'to'"}
+    assert calls == []
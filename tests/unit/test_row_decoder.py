@@ -0,0 +1,63 @@
+import importlib.util
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+spec = importlib.util.spec_from_file_location("row_decoder", ROOT / "backend-api" / "src" / "row_decoder.py")
+row_decoder = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(row_decoder)
+
+
+def scalar(name, scalar_type):
+    return {'Name': name, 'Type': {'ScalarType': scalar_type}}
+
+
+def test_scalars_are_parsed_by_column_type():
+    decoder = row_decoder.RowDecoder([scalar('key', 'VARCHAR'), scalar('size', 'BIGINT'),
+                                      scalar('ratio', 'DOUBLE'), scalar('ok', 'BOOLEAN'),
+                                      scalar('time', 'TIMESTAMP')])
+
+    row = decoder.decode({'Data': [{'ScalarValue': 'a.txt'}, {'ScalarValue': '1024'}, {'ScalarValue': '0.5'},
+                                   {'ScalarValue': 'true'}, {'ScalarValue': '2024-01-01 00:00:00.000000000'}]})
+
+    assert row == {'key': 'a.txt', 'size': 1024, 'ratio': 0.5, 'ok': True, 'time': '2024-01-01 00:00:00.000000000'}
+
+
+def test_null_and_missing_values_decode_to_none():
+    decoder = row_decoder.RowDecoder([scalar('size', 'BIGINT'), scalar('key', 'VARCHAR'),
+                                      {'Name': 'tags', 'Type': {'ArrayColumnInfo': {'Type': {'ScalarType': 'VARCHAR'}}}},
+                                      {'Name': 'owner', 'Type': {'RowColumnInfo': [scalar('name', 'VARCHAR')]}}])
+
+    row = decoder.decode({'Data': [{'NullValue': True}, {}, {'NullValue': True}, {}]})
+
+    # Every column is kept, so rows from the same query always have the same keys
+    assert row == {'size': None, 'key': None, 'tags': None, 'owner': None}
+
+
+def test_nested_types_are_decoded_recursively():
+    decoder = row_decoder.RowDecoder([
+        {'Name': 'sizes', 'Type': {'ArrayColumnInfo': {'Type': {'ScalarType': 'BIGINT'}}}},
+        {'Name': 'owner', 'Type': {'RowColumnInfo': [scalar('name', 'VARCHAR'), scalar('files', 'INTEGER')]}},
+        {'Name': 'series', 'Type': {'TimeSeriesMeasureValueColumnInfo': {'Type': {'ScalarType': 'DOUBLE'}}}},
+    ])
+
+    row = decoder.decode({'Data': [
+        {'ArrayValue': [{'ScalarValue': '1'}, {'NullValue': True}, {'ScalarValue': '3'}]},
+        {'RowValue': {'Data': [{'ScalarValue': 'alice'}, {'ScalarValue': '2'}]}},
+        {'TimeSeriesValue': [{'Time': '2024-01-01 00:00:00.000000000', 'Value': {'ScalarValue': '1.5'}}]},
+    ]})
+
+    assert row == {
+        'sizes': [1, None, 3],
+        'owner': {'name': 'alice', 'files': 2},
+        'series': [{'time': '2024-01-01 00:00:00.000000000', 'value': 1.5}],
+    }
+
+
+def test_columns_are_appended_across_pages():
+    decoder = row_decoder.RowDecoder([scalar('extension', 'VARCHAR'), scalar('count', 'BIGINT')])
+
+    columns = decoder.to_columns([{'Data': [{'ScalarValue': 'txt'}, {'ScalarValue': '3'}]}])
+    decoder.to_columns([{'Data': [{'ScalarValue': 'pdf'}, {'NullValue': True}]}], columns)
+
+    assert columns == {'extension': ['txt', 'pdf'], 'count': [3, None]}
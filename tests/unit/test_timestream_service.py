@@ -0,0 +1,97 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend-api"
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from src.timestream_service import TimestreamService  # noqa: E402
+
+
+class RecordingClient:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, QueryString, **kwargs):
+        self.queries.append(QueryString)
+        return {'Rows': [], 'ColumnInfo': []}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    def create(read_schema):
+        monkeypatch.setenv('TIMESTREAM_SCHEMA_VERSION', '2')
+        monkeypatch.setenv('TIMESTREAM_READ_SCHEMA', read_schema)
+        service = TimestreamService()
+        service.client = RecordingClient()
+        return service
+    return create
+
+
+def run_file_queries(service):
+    list(service.iter_recent_files(limit=10))
+    service.get_files_since('2024-01-01 00:00:00.000000000')
+    list(service.iter_throughput(60, 0, 3600))
+    return service.client.queries
+
+
+def test_both_layouts_are_read_during_a_schema_switch(service):
+    recent_files, files_since, throughput = run_file_queries(service('both'))
+    for query in (recent_files, files_since, throughput):
+        assert "measure_name IN ('file_size', 'file_event')" in query
+        assert "CASE WHEN measure_name = 'file_event' THEN size ELSE measure_value::bigint END" in query
+        assert "origin <> 'backfill'" in query
+    for query in (recent_files, files_since):
+        assert "SELECT COALESCE(key, object_key) AS key" in query
+
+
+def test_only_the_new_layout_is_read_after_the_switch(service):
+    recent_files, files_since, throughput = run_file_queries(service('2'))
+    for query in (recent_files, files_since, throughput):
+        assert "measure_name = 'file_event'" in query
+        assert "measure_value" not in query
+    for query in (recent_files, files_since):
+        # A measure can't share the name of the schema 1 key dimension in the same table
+        assert "SELECT object_key AS key" in query
+
+
+def test_files_since_continues_after_a_key_within_the_same_timestamp(service):
+    timestream = service('2')
+
+    timestream.get_files_since('2024-01-01 00:00:00.000000000', after_key="it's.txt")
+
+    query = timestream.client.queries[0]
+    assert ("(time > '2024-01-01 00:00:00.000000000' OR (time = '2024-01-01 00:00:00.000000000' "
+            "AND object_key > 'it''s.txt'))") in query
+    assert "time >= " not in query
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.records = []
+
+    def add(self, table, record, source=None):
+        self.records.append(record)
+
+
+def test_file_event_measures_do_not_reuse_dimension_names(monkeypatch):
+    from tests.benchmark.run_benchmark import load_processor
+
+    processor = load_processor()
+    writer = RecordingWriter()
+    for schema_version in ('1', '2'):
+        monkeypatch.setattr(processor, 'SCHEMA_VERSION', schema_version)
+        processor.write_to_timestream(writer, 'bucket', 'a.csv', 10, 'text/csv', 'csv', None,
+                                      detected_type='text', content_stats={
+                                          'row_count': 1, 'column_count': 2, 'null_rate': 0.0,
+                                          'max_column_null_rate': 0.0, 'columns_with_nulls': 0, 'complete': True})
+
+    # Timestream rejects a measure named like a dimension of the same table
+    dimensions = {d['Name'] for record in writer.records for d in record['Dimensions']}
+    measures = {m['Name'] for record in writer.records for m in record.get('MeasureValues', [])}
+    assert 'key' in dimensions and 'object_key' in measures
+    assert not dimensions & measures
@@ -0,0 +1,131 @@
+import io
+import json
+import threading
+import zipfile
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from tests.benchmark.fakes import FakeS3Client, FakeTimestreamWriteClient
+from tests.benchmark.run_benchmark import load_processor
+
+load_processor()
+
+import zip_inspector  # noqa: E402  (importable once the processor directory is on sys.path)
+
+BUCKET = 'archive-bucket'
+
+
+def build_zip(members, comment=b''):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+        archive.comment = comment
+    return data.getvalue()
+
+
+class RangeRecorder:
+    """Passes calls through to S3 and remembers the byte ranges requested."""
+
+    def __init__(self, client):
+        self.client = client
+        self.ranges = []
+
+    def get_object(self, **kwargs):
+        self.ranges.append(kwargs.get('Range'))
+        return self.client.get_object(**kwargs)
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def upload(s3_client, key, data):
+    s3_client.put_object(Bucket=BUCKET, Key=key, Body=data)
+    return len(data)
+
+
+def test_members_are_counted_by_extension(s3_client):
+    members = [('data/a.csv', b'x' * 100), ('data/b.CSV', b'y' * 50), ('img/c.png', b'z' * 10),
+               ('README', b'readme'), ('empty-dir/', b'')]
+    size = upload(s3_client, 'bundle.zip', build_zip(members, comment=b'built by tests'))
+    recorder = RangeRecorder(s3_client)
+
+    summary = zip_inspector.inspect_zip(recorder, BUCKET, 'bundle.zip', size)
+
+    assert summary['members'] == 4
+    assert summary['uncompressed_bytes'] == 166
+    assert summary['extensions'] == {
+        'csv': {'count': 2, 'uncompressed_bytes': 150},
+        'png': {'count': 1, 'uncompressed_bytes': 10},
+        'unknown': {'count': 1, 'uncompressed_bytes': 6},
+    }
+    # Only the tail and the central directory are read, never the whole object
+    assert len(recorder.ranges) == 2 and all(recorder.ranges)
+
+
+def test_central_directory_is_parsed_in_small_chunks(s3_client, monkeypatch):
+    monkeypatch.setattr(zip_inspector, 'READ_CHUNK_BYTES', 64)
+    members = [(f'files/{i:04d}.{("txt", "json", "bin")[i % 3]}', b'content') for i in range(300)]
+    size = upload(s3_client, 'many.zip', build_zip(members))
+
+    summary = zip_inspector.inspect_zip(s3_client, BUCKET, 'many.zip', size)
+
+    assert summary['members'] == 300
+    assert {ext: stats['count'] for ext, stats in summary['extensions'].items()} == \
+        {'txt': 100, 'json': 100, 'bin': 100}
+
+
+def test_non_zip_objects_are_rejected(s3_client):
+    size = upload(s3_client, 'fake.zip', b'not a zip file at all')
+
+    with pytest.raises(zip_inspector.ArchiveError):
+        zip_inspector.inspect_zip(s3_client, BUCKET, 'fake.zip', size)
+
+
+class ConcurrencyTrackingS3(FakeS3Client):
+    """Serves one archive for every key and remembers how many reads overlapped at most."""
+
+    def __init__(self, content):
+        super().__init__(latency_ms=20, content=content)
+        self._lock = threading.Lock()
+        self._active = 0
+        self.max_active = 0
+
+    def get_object(self, **kwargs):
+        with self._lock:
+            self._active += 1
+            self.max_active = max(self.max_active, self._active)
+        try:
+            return super().get_object(**kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+def test_archives_of_a_batch_are_inspected_in_parallel(monkeypatch):
+    processor = load_processor()
+    archive = build_zip([('data/a.csv', b'x' * 100), ('img/b.png', b'y' * 10)])
+    s3_client = ConcurrencyTrackingS3(archive)
+    timestream_client = FakeTimestreamWriteClient(latency_ms=0, keep_records=True)
+    monkeypatch.setattr(processor, 'INSPECT_ARCHIVES', True)
+    monkeypatch.setattr(processor, 'TRUST_EVENT_METADATA', True)
+    monkeypatch.setattr(processor, 's3_client', s3_client)
+    monkeypatch.setattr(processor, 'timestream_client', timestream_client)
+    monkeypatch.setattr(processor, 'deduplicator', processor.EventDeduplicator(client_factory=lambda: None))
+    s3_records = [{'s3': {'bucket': {'name': BUCKET}, 'object': {'key': f'{i}.zip', 'size': len(archive)}}}
+                  for i in range(4)]
+    event = {'Records': [{'messageId': f'm{i}', 'body': json.dumps({'Records': [s3_record]})}
+                         for i, s3_record in enumerate(s3_records)]}
+
+    assert processor.process_batch(event) == {'batchItemFailures': []}
+
+    members = [record for _, record in timestream_client.records if record['MeasureName'] == 'archive_members']
+    assert len(members) == 4 * 2
+    assert s3_client.max_active > 1